@@ -7,13 +7,17 @@ from enum import Enum, StrEnum
 from pathlib import Path
 from typing import cast
 
+import docker
 import requests
 from dotenv import load_dotenv, set_key
 
 from payload_generator import PayloadGenerator
 from webhook_handler import BotRunner
+from webhook_handler.helper.custom_errors import ExecutionError
 from webhook_handler.models import LLM, GitHubEvent
 from webhook_handler.services import Config
+from webhook_handler.services.toolchain_image import (TOOLCHAINS,
+                                                      ensure_toolchain_image)
 
 # List of allowed repositories (or patterns)
 ALLOWED_REPOS = ["grcov", "glean", "rust-code-analysis"]
@@ -37,6 +41,7 @@ class Commands(StrEnum):
     CONFIGURE = "configure"
     DELETE = "delete"
     CLEAR = "clear"
+    BUILD_TOOLCHAIN = "build-toolchain"
 
 
 class RunFlags(Enum):
@@ -44,6 +49,9 @@ class RunFlags(Enum):
     ISSUE = ["-i", "--issue"]
     LLMS_USED = ["--llms"]
     NUMBER_INVOCATIONS = ["-n", "--num-invocations"]
+    RACE = ["--race"]
+    PIPELINED = ["--pipelined"]
+    TOOLCHAIN = ["--toolchain"]
 
 
 class TestGenCLI:
@@ -90,6 +98,23 @@ class TestGenCLI:
             default=3,
             help="Number of invocations per LLM model",
         )
+        parser.add_argument(
+            RunFlags.RACE.value[0],
+            action="store_true",
+            help="Run all LLMs in parallel, the first fail-to-pass test wins",
+        )
+        parser.add_argument(
+            RunFlags.PIPELINED.value[0],
+            action="store_true",
+            help="Query the next candidate test while the current one is verified",
+        )
+        parser.add_argument(
+            RunFlags.TOOLCHAIN.value[0],
+            nargs=1,
+            type=str,
+            choices=list(TOOLCHAINS),
+            help="Toolchain version to build with 'build-toolchain' (default: all)",
+        )
         return parser
 
     def _get_git_remote(self) -> str | None:
@@ -236,13 +261,7 @@ class TestGenCLI:
         pr_id = bot_runner._pr_data.id
         config.setup_pr_related_dirs(pr_id, pr_payload)
 
-        generation_completed = False
-        for model in llms:
-            if generation_completed:
-                break
-            model = cast(LLM, model)
-            config.setup_output_dir(0, model)
-            generation_completed = bot_runner.execute_runner(0, model)
+        generation_completed = self._run_models(bot_runner, config, llms)
 
         bot_runner.teardown()
         if generation_completed:
@@ -298,13 +317,7 @@ class TestGenCLI:
         pr_id = bot_runner._pr_data.id
         config.setup_pr_related_dirs(pr_id, issue_payload)
 
-        generation_completed = False
-        for model in llms:
-            if generation_completed:
-                break
-            model = cast(LLM, model)
-            config.setup_output_dir(0, model)
-            generation_completed = bot_runner.execute_runner(0, model)
+        generation_completed = self._run_models(bot_runner, config, llms)
 
         bot_runner.teardown()
         if generation_completed:
@@ -319,6 +332,23 @@ class TestGenCLI:
             print("❌ No test was generated.")
         sys.exit(0)
 
+    def _run_models(self, bot_runner: BotRunner, config: Config, llms: list) -> bool:
+        """Runs the models one after the other, or all at once if --race is set"""
+        if self.args.pipelined:
+            config.pipelined_generation = True
+        if self.args.race:
+            print(f"🏁 Racing models: {', '.join(llms)}")
+            return bot_runner.race_models([cast(LLM, model) for model in llms])
+
+        generation_completed = False
+        for model in llms:
+            if generation_completed:
+                break
+            model = cast(LLM, model)
+            config.setup_output_dir(0, model)
+            generation_completed = bot_runner.execute_runner(0, model)
+        return generation_completed
+
     def handle_delete(self):
         print("🗑️  Deleting CLI tool...")
         confirmation = (
@@ -368,6 +398,20 @@ class TestGenCLI:
         print("✅ Successfully cleared cached data")
         sys.exit(0)
 
+    def handle_build_toolchain(self):
+        """Builds the toolchain images the repository Dockerfiles build from."""
+        versions = self.args.toolchain or list(TOOLCHAINS)
+        client = docker.from_env()
+        for version in versions:
+            print(f"🔧 Building toolchain image for Rust {version}...")
+            try:
+                tag = ensure_toolchain_image(client, self.repo_path, version, rebuild=True)
+            except ExecutionError as e:
+                print(f"❌ Error building toolchain image: {e}")
+                sys.exit(1)
+            print(f"✅ Successfully built toolchain image {tag}")
+        sys.exit(0)
+
     def run(self):
         self.args = self.parser.parse_args()
         if self.args.command == Commands.RUN:
@@ -391,6 +435,8 @@ class TestGenCLI:
             self.handle_delete()
         elif self.args.command == Commands.CLEAR:
             self.handle_clear()
+        elif self.args.command == Commands.BUILD_TOOLCHAIN:
+            self.handle_build_toolchain()
         else:
             print("❌ Unrecognized command.")
             self.parser.print_help()
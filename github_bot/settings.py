@@ -77,6 +77,8 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # bot workers write job progress concurrently
+        "OPTIONS": {"timeout": 20},
     }
 }
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "github_bot.settings")
 
 application = get_wsgi_application()
+
+# Start the bot workers and resume jobs interrupted by a restart
+from webhook_handler.webhook import start_job_workers  # noqa: E402
+
+start_job_workers()
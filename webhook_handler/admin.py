@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from webhook_handler.jobs.job_store import BotJob
+
+
+@admin.register(BotJob)
+class BotJobAdmin(admin.ModelAdmin):
+    list_display = ("execution_id", "kind", "head_sha", "status", "stage", "model", "llm_call", "updated_at")
+    list_filter = ("kind", "status", "stage", "repo")
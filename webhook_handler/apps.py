@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WebhookHandlerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "webhook_handler"
+
+    def ready(self) -> None:
+        # The app's models package holds plain dataclasses, register the job model explicitly
+        from webhook_handler.jobs import job_store  # noqa: F401
@@ -1,31 +1,45 @@
+import copy
 import logging
+import queue
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-
-import docker
-from docker.errors import ImageNotFound
+from typing import Callable
 
 from webhook_handler.helper import logger
 from webhook_handler.helper.custom_errors import *
 from webhook_handler.models import (LLM, GitHubEvent, PipelineInputs,
-                                    PullRequestData)
+                                    PipelineStage, PullRequestData, RunBudget)
 from webhook_handler.services import (Config, CSTBuilder, DockerService,
                                       GitHubService, LLMHandler,
-                                      LocalDiffService, PullRequestDiffContext,
-                                      TestGenerator)
+                                      LocalDiffService, ModelRace,
+                                      PullRequestDiffContext, TestGenerator)
+from webhook_handler.constants import RACE_STAGE_POLL_SECONDS
 
 
 class BotRunner:
     """Handles running the bot"""
 
     def __init__(
-        self, payload: dict, config: Config, post_comment: bool = False
+        self,
+        payload: dict,
+        config: Config,
+        post_comment: bool = False,
+        on_stage: Callable[..., None] | None = None,
     ) -> None:
         self._pr_data = PullRequestData.from_payload(payload)
         self._execution_id = f"{self._pr_data.repo}_{self._pr_data.number}"
         self._config = config
         self._post_comment = post_comment
+        self._on_stage = on_stage
+        self._logger = logging.getLogger()
+        self._logging_configured = False
         self._generation_completed = False
         self._environment_prepared = False
+        self._budget = RunBudget(
+            max_seconds=config.max_run_seconds,
+            max_tokens=config.max_run_tokens,
+            max_container_seconds=config.max_container_seconds,
+        )
 
         self._gh_service = GitHubService(config, self._pr_data)
         self._issue_statement = None
@@ -37,13 +51,15 @@ class BotRunner:
 
     def is_valid_pr(self) -> tuple[str, bool]:
         """
-        PR must have linked issue and source code changes.
+        PR must have linked issue and source code changes. Once the linked issue is found,
+        the image build starts in the background, so that it overlaps with the diff fetching.
 
         Returns:
             str: Message to deliver to client
             bool: True if PR is valid, False otherwise
         """
 
+        self._setup_logging()
         self._logger.marker(  # type: ignore[attr-defined]
             f"=============== Running Payload #{self._pr_data.number} ==============="
         )
@@ -55,6 +71,12 @@ class BotRunner:
             self._pdf_candidate = None
             return "No linked issue found", False
 
+        try:
+            self._start_image_build()
+        except Exception as e:
+            # validation does not need Docker, preparing the environment retries the build
+            self._logger.warning(f"Could not start image build, deferring it: {e}")
+
         self._pr_diff_ctx = PullRequestDiffContext(
             self._pr_data.base_commit, self._pr_data.head_commit, self._gh_service
         )
@@ -67,6 +89,71 @@ class BotRunner:
 
         return "Payload is being processed...", True
 
+    def race_models(self, models: list[LLM], curr_attempt: int = 0) -> bool:
+        """
+        Runs the pipelines of all models in parallel, each in its own output directory.
+        The first model generating a fail-to-pass test wins, all other pipelines are cancelled.
+        Each pipeline has its own config and LLM handler, the stages they reach are reported
+        from the calling thread, so that the stage callback is never called concurrently.
+
+        Parameters:
+            models (list[LLM]): The models to race
+            curr_attempt (int, optional): The current attempt number
+
+        Returns:
+            bool: True if a model generated a test, False otherwise
+        """
+
+        if not models:
+            return False
+
+        self.prepare_environment()
+        output_dirs = {
+            model: self._config.setup_output_dir(curr_attempt, model)
+            for model in models
+        }
+        configs: dict[LLM, Config] = {}
+        for model in models:
+            configs[model] = copy.copy(self._config)
+            configs[model].output_dir = output_dirs[model]
+        race = ModelRace()
+        stage_updates: queue.SimpleQueue[tuple[PipelineStage, dict]] = queue.SimpleQueue()
+
+        def report_stage(stage: PipelineStage, **fields) -> None:
+            stage_updates.put((stage, fields))
+
+        self._logger.marker(f"Racing models {', '.join(models)}")  # type: ignore[attr-defined]
+        with ThreadPoolExecutor(
+            max_workers=len(models), thread_name_prefix="model-race"
+        ) as executor:
+            futures = {
+                model: executor.submit(
+                    self._run_generator,
+                    curr_attempt,
+                    model,
+                    output_dirs[model],
+                    configs[model],
+                    LLMHandler(configs[model], self._pipeline_inputs, self._budget),
+                    report_stage,
+                    race,
+                )
+                for model in models
+            }
+            pending = set(futures.values())
+            while pending:
+                _, pending = wait(
+                    pending, timeout=RACE_STAGE_POLL_SECONDS, return_when=FIRST_COMPLETED
+                )
+                self._report_stage_updates(stage_updates)
+        self._report_stage_updates(stage_updates)
+
+        if race.winner is None:
+            self._logger.info("No model generated a fail-to-pass test")
+            return False
+        self._config.output_dir = configs[race.winner].output_dir
+        self._config.pass_generation_dir = configs[race.winner].pass_generation_dir
+        return futures[race.winner].result()
+
     def execute_runner(self, curr_attempt: int, model: LLM) -> bool:
         """
         Execute the bot runner once with the current attempt and provided model.
@@ -79,16 +166,46 @@ class BotRunner:
             bool: True if the generation was successful, False otherwise
         """
         # setup the output directory
-        self._config.setup_output_dir(curr_attempt, model)
+        output_dir = self._config.setup_output_dir(curr_attempt, model)
 
         # Prepare environment
         self.prepare_environment()
+        return self._run_generator(
+            curr_attempt, model, output_dir, self._config, self._llm_handler, self._on_stage
+        )
+
+    def _run_generator(
+        self,
+        curr_attempt: int,
+        model: LLM,
+        output_dir: Path,
+        config: Config,
+        llm_handler: LLMHandler | None,
+        on_stage: Callable[..., None] | None,
+        race: ModelRace | None = None,
+    ) -> bool:
+        """
+        Runs the test generation of one model in a prepared environment.
+
+        Parameters:
+            curr_attempt (int): The current attempt number
+            model (LLM): The model to be queried
+            output_dir (Path): Output directory of the run
+            config (Config): The config of the run, written to by the run
+            llm_handler (LLMHandler | None): The LLM handler of the run
+            on_stage (Callable | None): Callback notified of the stages reached by the run
+            race (ModelRace, optional): The race the run takes part in, if models are raced
+
+        Returns:
+            bool: True if the generation was successful, False otherwise
+        """
+
         if self._pipeline_inputs is None:
             raise DataMissingError(
                 "pipeline_inputs", "None", "Pipeline inputs not prepared"
             )
 
-        if self._llm_handler is None:
+        if llm_handler is None:
             raise DataMissingError("llm_handler", "None", "LLM Handler not prepared")
 
         if self._cst_builder is None:
@@ -99,10 +216,6 @@ class BotRunner:
                 "docker_service", "None", "Docker Service not prepared"
             )
 
-        if self._config.output_dir is None:
-            raise DataMissingError("output_dir", "None", "Output directory not set")
-
-
         if self._gh_service is None and self._config._gh_event == GitHubEvent.PULL_REQUEST:
             raise DataMissingError(
                 "gh_service", "None", "GitHub Service not prepared"
@@ -114,17 +227,30 @@ class BotRunner:
             )
         
         
+        cst_builder, docker_service = self._cst_builder, self._docker_service
+        if race is not None:
+            # racing pipelines must not share containers or parsers
+            cst_builder = CSTBuilder(self._config.parsing_language, self._pr_diff_ctx)
+            docker_service = self._create_docker_service()
+            # joins the build started while preparing the environment
+            docker_service.build_image_in_background()
+            race.register(model, docker_service)
+
         generator = TestGenerator(
-            self._config,
+            config,
             self._pipeline_inputs,
             self._post_comment,
             self._gh_service,
-            self._cst_builder,
-            self._docker_service,
-            self._llm_handler,
+            cst_builder,
+            docker_service,
+            llm_handler,
             i_attempt=curr_attempt,
             model=model,
             gh_event=self._config._gh_event,
+            on_stage=on_stage,
+            output_dir=output_dir,
+            race=race,
+            budget=self._budget,
         )
 
         try:
@@ -132,13 +258,11 @@ class BotRunner:
             self._logger.success(f"Attempt %d with model %s finished successfully" % (curr_attempt + 1, model))  # type: ignore[attr-defined]
             if result is True:
                 assert path is not None
-                self._config.pass_generation_dir = path
+                config.pass_generation_dir = path
                 generated_test: str = Path(
                     path, "augmented_test.txt"
                 ).read_text(encoding="utf-8")
-                new_filename = (
-                    f"{self._execution_id}_{self._config.output_dir.name}.txt"
-                )
+                new_filename = f"{self._execution_id}_{output_dir.name}.txt"
                 Path(self._config.gen_test_dir, new_filename).write_text(
                     generated_test, encoding="utf-8"
                 )
@@ -152,6 +276,9 @@ class BotRunner:
                 f"Data missing error occurred during runner execution: {e}"
             )
             return False
+        except RunCancelledError as e:
+            self._logger.info(f"Attempt %d with model %s cancelled: {e}" % (curr_attempt + 1, model))
+            return False
         except ExecutionError as e:
             self._logger.critical(
                 f"Execution error occurred during runner execution: {e}"
@@ -173,7 +300,10 @@ class BotRunner:
             return
 
         self._setup_logging()
-        
+
+        # Build docker image if not exists, the first container stage waits for it
+        self._start_image_build()
+
         if self._config._gh_event == GitHubEvent.ISSUE:
             # For issues, fetch the issue description directly
             self._issue_statement = self._gh_service.fetch_issue_description(
@@ -185,8 +315,9 @@ class BotRunner:
                 self._logger.critical("Failed to fetch issue description")
                 raise ExecutionError("Could not fetch issue description")
         else:
-            # For PRs, check for linked issue (and verify that it is a bug)
-            self._issue_statement = self._gh_service.get_linked_data()
+            # For PRs, check for linked issue (and verify that it is a bug), unless validation already found it
+            if not self._issue_statement:
+                self._issue_statement = self._gh_service.get_linked_data()
             if self._issue_statement:
                 self._logger.info("Linked issue found")
             else:
@@ -236,10 +367,6 @@ class BotRunner:
 
         self._cst_builder = CSTBuilder(self._config.parsing_language, self._pr_diff_ctx)
 
-        # Build docker image if not exists
-        self._docker_service = DockerService(self._config.root_dir, self._pr_data, self._config.local_repo_path)
-        self._docker_service.check_and_build_image()
-
         # Gather Pipeline data
         self._pipeline_inputs = PipelineInputs(
             pr_data=self._pr_data,
@@ -249,12 +376,75 @@ class BotRunner:
         )
 
         # Setup LLM handler
-        self._llm_handler = LLMHandler(self._config, self._pipeline_inputs)
+        self._llm_handler = LLMHandler(self._config, self._pipeline_inputs, self._budget)
         self._environment_prepared = True
+        self._report_stage(PipelineStage.ENVIRONMENT_PREPARED)
+
+    def _start_image_build(self) -> None:
+        """Creates the Docker service of the run and starts building its image in the background"""
+
+        if self._docker_service is None:
+            self._docker_service = self._create_docker_service()
+            self._docker_service.build_image_in_background()
+
+    def _create_docker_service(self) -> DockerService:
+        """
+        Creates a Docker service for the PR with the configured budgets and caches.
+
+        Returns:
+            DockerService: The Docker service
+        """
+
+        return DockerService(
+            self._config.root_dir,
+            self._pr_data,
+            self._config.local_repo_path,
+            self._budget,
+            self._config.container_pool_size,
+            self._config.compiler_cache_dir,
+            self._config.compiler_cache_size,
+            self._config.image_cache_bytes,
+            self._config.seed_local_target,
+        )
+
+    def _report_stage(self, stage: PipelineStage, **fields) -> None:
+        """
+        Notifies the stage callback, if any, that a stage has been reached.
+
+        Parameters:
+            stage (PipelineStage): The stage that has been reached
+            **fields: Further details about the stage
+        """
+
+        if self._on_stage is None:
+            return
+        try:
+            self._on_stage(stage, **fields)
+        except Exception as e:
+            self._logger.error(f"Failed to report stage {stage}: {e}")
+
+    def _report_stage_updates(
+        self, stage_updates: queue.SimpleQueue[tuple[PipelineStage, dict]]
+    ) -> None:
+        """
+        Reports the stages queued by pipelines running in other threads.
+
+        Parameters:
+            stage_updates (queue.SimpleQueue): The queued stages with their details
+        """
+
+        while True:
+            try:
+                stage, fields = stage_updates.get_nowait()
+            except queue.Empty:
+                return
+            self._report_stage(stage, **fields)
 
     def _setup_logging(self) -> None:
         """Sets up logging for the current PR run"""
 
+        if self._logging_configured:
+            return
         if self._config.pr_log_dir is None:
             raise DataMissingError(
                 "pr_log_dir", "None", "Pull Request logging directory not set"
@@ -262,6 +452,7 @@ class BotRunner:
         assert self._config.pr_log_dir
         logger.configure_logger(self._config.pr_log_dir, self._execution_id)
         self._logger = logging.getLogger()
+        self._logging_configured = True
 
     def _create_model_attempt_dir(self, curr_attempt: int, model: LLM) -> None:
         """Creates a directory for the current attempt with the current model"""
@@ -281,21 +472,16 @@ class BotRunner:
 
     def teardown(self) -> None:
         """
-        Remove all temporary created directories, files, and data
+        Remove all temporary created directories, files, and data.
+        The Docker image is kept for later runs, unless the image cache exceeds its disk budget.
         """
         self._config._teardown()
-        image_tag = f"{self._pr_data.image_tag}:latest"
-        try:
-            client = docker.from_env()
-            client.images.remove(image=image_tag, force=True)
-            self._logger.success(f"Removed Docker image {image_tag}")  # type: ignore[attr-defined]
-            pass
-        except ImageNotFound:
-            self._logger.error(f"Docker image {image_tag} not found, skipping removal")  # type: ignore[attr-defined]
-        except Exception as e:
-            self._logger.error(f"Failed to remove Docker image '{image_tag}': {e}")
-        
-        
+        if self._docker_service is not None:
+            try:
+                self._docker_service.evict_images()
+            except Exception as e:
+                self._logger.error(f"Failed to evict cached Docker images: {e}")
+
         self._gh_api = None
         self._issue_statement = None
         self._pdf_candidate = None
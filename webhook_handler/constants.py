@@ -1,3 +1,24 @@
 from webhook_handler.models import LLM
 
 USED_MODELS = [LLM.GPT4o, LLM.LLAMA, LLM.QWEN3]
+
+# Pull request actions which trigger a bot run
+ACCEPTED_PR_ACTIONS = ["opened", "reopened", "synchronize"]
+
+# Temperature of the speculative second sample of the initial prompt in pipelined generation
+SPECULATIVE_TEMPERATURE = 0.7
+
+# Image builds running in the background at once, across all runs of the process
+IMAGE_BUILD_WORKERS = 2
+
+# Seconds a failed image build is not retried by later runs needing the same image
+IMAGE_BUILD_FAILURE_TTL = 600
+
+# Seconds after which image builds clone the repository again instead of fetching into the cached clone
+MIRROR_REFRESH_SECONDS = 7 * 24 * 60 * 60
+
+# Lines of command output kept in memory, the full output of a stage is written to disk
+EXEC_OUTPUT_TAIL_LINES = 2000
+
+# Seconds between reports of the stages reached by raced models
+RACE_STAGE_POLL_SECONDS = 0.5
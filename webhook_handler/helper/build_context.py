@@ -0,0 +1,261 @@
+import io
+import logging
+import math
+import subprocess
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import IO
+
+from webhook_handler.helper.custom_errors import *
+
+logger = logging.getLogger(__name__)
+
+# Directories of the build context copied by the local Dockerfiles
+REPOSITORY_DIR = "repo"
+TARGET_SEED_DIR = "target-seed"
+
+# Subdirectories of target/debug which are not worth uploading
+_SEED_EXCLUDES = {"incremental"}
+
+# Rust names of the Docker architectures, the toolchain images are Debian based
+_RUST_ARCHS = {"amd64": "x86_64", "arm64": "aarch64", "386": "i686"}
+
+
+def dockerfile_context(dockerfile_path: Path) -> io.BytesIO:
+    """
+    Creates an in-memory build context holding only the Dockerfile.
+
+    Parameters:
+        dockerfile_path (Path): Path of the Dockerfile
+
+    Returns:
+        io.BytesIO: The build context as tar archive
+    """
+
+    context = io.BytesIO()
+    with tarfile.open(fileobj=context, mode="w") as tar:
+        _add_bytes(tar, "Dockerfile", dockerfile_path.read_bytes())
+    context.seek(0)
+    return context
+
+
+def local_repository_context(
+    repo_path: Path,
+    dockerfile_path: Path,
+    base_commit: str,
+    rust_version: str | None = None,
+    target_triple: str | None = None,
+) -> IO[bytes]:
+    """
+    Creates the build context of a local repository: the tree of the HEAD commit
+    (including submodules) instead of the working directory. If HEAD is the base commit
+    and the repository's target/debug was built by the Rust version and for the target of
+    the image, it is added as cache seed.
+
+    target/debug was built from the working tree, so the archived files carry the mtimes
+    cargo compares the seed with: files unchanged in the working tree keep their local
+    mtime, files with uncommitted changes are newer than the seed. Cargo then rebuilds
+    the packages whose seeded artifacts do not match the HEAD tree.
+
+    Parameters:
+        repo_path (Path): Path of the local repository
+        dockerfile_path (Path): Path of the Dockerfile
+        base_commit (str): The commit the image is built at
+        rust_version (str | None): Rust version of the image, None disables the cache seed
+        target_triple (str | None): Target triple of the image, None disables the cache seed
+
+    Returns:
+        IO[bytes]: The build context as tar archive, spooled to disk
+
+    Raises:
+        ExecutionError: If the HEAD tree cannot be archived
+    """
+
+    target_debug = Path(repo_path, "target", "debug")
+    seed = (
+        rust_version is not None
+        and target_triple is not None
+        and target_debug.is_dir()
+        and _head_is(repo_path, base_commit)
+        and _host_rust_matches(repo_path, rust_version, target_triple)
+    )
+
+    context = tempfile.TemporaryFile()
+    with tarfile.open(fileobj=context, mode="w") as tar:
+        _add_bytes(tar, "Dockerfile", dockerfile_path.read_bytes())
+        _add_git_tree(tar, repo_path, REPOSITORY_DIR, seed)
+        for submodule in _submodule_paths(repo_path):
+            _add_git_tree(tar, Path(repo_path, submodule), f"{REPOSITORY_DIR}/{submodule}", seed)
+
+        # the local Dockerfiles copy the seed directory, so it must exist even if empty
+        seed_dir = tarfile.TarInfo(TARGET_SEED_DIR)
+        seed_dir.type = tarfile.DIRTYPE
+        seed_dir.mode = 0o755
+        tar.addfile(seed_dir)
+        if seed:
+            logger.info(f"Seeding image build with {target_debug}")
+            for entry in target_debug.iterdir():
+                if entry.name not in _SEED_EXCLUDES:
+                    tar.add(entry, arcname=f"{TARGET_SEED_DIR}/debug/{entry.name}")
+    context.seek(0)
+    return context
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    tar_info = tarfile.TarInfo(name=name)
+    tar_info.size = len(data)
+    tar_info.mode = 0o644
+    tar.addfile(tar_info, io.BytesIO(data))
+
+
+def _add_git_tree(
+    tar: tarfile.TarFile, repo_path: Path, prefix: str, local_mtimes: bool = False
+) -> None:
+    """
+    Adds the tree of the HEAD commit of a repository to a tar archive.
+
+    Parameters:
+        tar (tarfile.TarFile): The archive to add to
+        repo_path (Path): Path of the repository
+        prefix (str): Directory of the tree in the archive
+        local_mtimes (bool): Whether files get the mtimes of the working tree instead of the commit time
+    """
+
+    changed = _changed_files(repo_path) if local_mtimes else set()
+    # newer than any local build, so that cargo rebuilds what was built from other sources
+    now = int(time.time()) + 1
+    with tempfile.TemporaryFile() as archive:
+        result = subprocess.run(
+            ["git", "archive", "--format=tar", "HEAD"],
+            cwd=repo_path,
+            stdout=archive,
+            stderr=subprocess.PIPE,
+        )
+        if result.returncode != 0:
+            raise ExecutionError(f"Could not archive {repo_path}: {result.stderr.decode()}")
+        archive.seek(0)
+        with tarfile.open(fileobj=archive, mode="r") as tree:
+            for member in tree:
+                if member.type == tarfile.XGLTYPE or member.type == tarfile.XHDTYPE:
+                    continue
+                content = tree.extractfile(member) if member.isfile() else None
+                if local_mtimes and member.isfile():
+                    member.mtime = now if member.name in changed else _local_mtime(repo_path, member.name, now)
+                member.name = f"{prefix}/{member.name}"
+                tar.addfile(member, content)
+
+
+def _changed_files(repo_path: Path) -> set[str]:
+    """
+    Lists the tracked files whose working tree content differs from the HEAD commit.
+
+    Parameters:
+        repo_path (Path): Path of the repository
+
+    Returns:
+        set[str]: Paths relative to the repository
+
+    Raises:
+        ExecutionError: If the changes cannot be listed
+    """
+
+    result = subprocess.run(
+        ["git", "diff", "--name-only", "-z", "HEAD"],
+        cwd=repo_path,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise ExecutionError(f"Could not list changes of {repo_path}: {result.stderr}")
+    return {path for path in result.stdout.split("\0") if path}
+
+
+def _local_mtime(repo_path: Path, path: str, default: int) -> int:
+    try:
+        # rounded up, a source must not appear older than an artifact built from an earlier version
+        return math.ceil(Path(repo_path, path).lstat().st_mtime)
+    except OSError:
+        return default
+
+
+def _head_is(repo_path: Path, commit: str) -> bool:
+    """
+    Checks whether HEAD is the commit the image is built at. The seed is built from the
+    working tree, it must not be cached under the key of another commit.
+
+    Parameters:
+        repo_path (Path): Path of the local repository
+        commit (str): The commit the image is built at
+
+    Returns:
+        bool: True if HEAD is the commit, False otherwise
+    """
+
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=repo_path, capture_output=True, text=True
+    )
+    matches = result.returncode == 0 and result.stdout.strip() == commit
+    if not matches:
+        logger.info(f"HEAD of {repo_path} is not {commit[:12]}, building image without cache seed")
+    return matches
+
+
+def _submodule_paths(repo_path: Path) -> list[str]:
+    result = subprocess.run(
+        ["git", "submodule", "--quiet", "foreach", "--recursive", "echo $displaypath"],
+        cwd=repo_path,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        logger.warning(f"Could not list submodules of {repo_path}: {result.stderr}")
+        return []
+    return result.stdout.splitlines()
+
+
+def image_target_triple(docker_arch: str) -> str:
+    """
+    Derives the target triple of the images built by a Docker daemon.
+
+    Parameters:
+        docker_arch (str): Architecture reported by the Docker daemon, e.g. 'amd64'
+
+    Returns:
+        str: The target triple, e.g. 'x86_64-unknown-linux-gnu'
+    """
+
+    return f"{_RUST_ARCHS.get(docker_arch, docker_arch)}-unknown-linux-gnu"
+
+
+def _host_rust_matches(repo_path: Path, rust_version: str, target_triple: str) -> bool:
+    """
+    Checks whether the local rustc has the Rust version and the host target of the image,
+    cargo rebuilds everything built by another compiler version, and artifacts of another
+    target (e.g. macOS or a remote Docker daemon) cannot be used by the image at all.
+
+    Parameters:
+        repo_path (Path): Path of the local repository, which may pin a toolchain
+        rust_version (str): Rust version of the image, e.g. '1.89'
+        target_triple (str): Target triple of the image, e.g. 'x86_64-unknown-linux-gnu'
+
+    Returns:
+        bool: True if the local build artifacts can be reused, False otherwise
+    """
+
+    try:
+        result = subprocess.run(
+            ["rustc", "-vV"], cwd=repo_path, capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return False
+    if result.returncode != 0:
+        return False
+    if not result.stdout.startswith(f"rustc {rust_version}."):
+        logger.info(f"Local rustc is not Rust {rust_version}, building image without cache seed")
+        return False
+    if f"host: {target_triple}" not in result.stdout.splitlines():
+        logger.info(f"Local rustc does not target {target_triple}, building image without cache seed")
+        return False
+    return True
@@ -0,0 +1,179 @@
+import difflib
+import json
+
+from webhook_handler.helper import general
+from webhook_handler.models import DiagnosticSpan, RustDiagnostic
+
+# Argument making cargo report diagnostics as JSON messages, one per line
+MESSAGE_FORMAT_ARG = "--message-format=json"
+
+# cargo's JSON messages are objects whose first key is the message kind
+_MESSAGE_PREFIX = '{"reason":'
+
+
+class DiagnosticCollector:
+    """
+    Line transform for streamed cargo output in JSON message format. Compiler messages
+    are collected as diagnostics and replaced by the human readable output of rustc,
+    the other cargo messages (artifacts, build scripts) are dropped.
+    """
+
+    def __init__(self) -> None:
+        self.diagnostics: list[RustDiagnostic] = []
+
+    def __call__(self, line: str) -> list[str]:
+        if not line.startswith(_MESSAGE_PREFIX):
+            return [line]
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return [line]
+        if message.get("reason") != "compiler-message":
+            return []
+
+        diagnostic = parse_diagnostic(message["message"])
+        if diagnostic.is_error:
+            self.diagnostics.append(diagnostic)
+        # rustc separates diagnostics by an empty line
+        return diagnostic.rendered.rstrip("\n").split("\n") + [""]
+
+
+def parse_diagnostic(message: dict) -> RustDiagnostic:
+    """
+    Parses the diagnostic of a cargo compiler message.
+
+    Parameters:
+        message (dict): The 'message' field of the compiler message
+
+    Returns:
+        RustDiagnostic: The parsed diagnostic
+    """
+
+    notes: list[str] = []
+    for child in message.get("children", []):
+        note = f"{child['level']}: {child['message']}"
+        replacements = [
+            span["suggested_replacement"]
+            for span in child.get("spans", [])
+            if span.get("suggested_replacement")
+        ]
+        if replacements:
+            note += ": " + ", ".join(f"`{replacement}`" for replacement in replacements)
+        notes.append(note)
+
+    code = message.get("code")
+    return RustDiagnostic(
+        level=message["level"],
+        message=message["message"],
+        code=code["code"] if code else None,
+        spans=tuple(_parse_span(span) for span in message.get("spans", [])),
+        notes=tuple(notes),
+        rendered=message.get("rendered") or f"{message['level']}: {message['message']}\n",
+    )
+
+
+def _parse_span(span: dict) -> DiagnosticSpan:
+    is_primary = span["is_primary"]
+    label = span.get("label")
+    # errors in macro expansions are reported where the macro is called, e.g. in assert_eq!
+    while span.get("expansion"):
+        span = span["expansion"]["span"]
+    text = span.get("text") or []
+    return DiagnosticSpan(
+        file_name=span["file_name"],
+        line_start=span["line_start"],
+        line_end=span["line_end"],
+        column_start=span["column_start"],
+        is_primary=is_primary,
+        label=label,
+        text=text[0]["text"].strip() if text else None,
+    )
+
+
+def render_diagnostic(diagnostic: RustDiagnostic) -> str:
+    """
+    Renders a diagnostic compactly: the message, each location with the source line
+    and label, and the notes.
+
+    Parameters:
+        diagnostic (RustDiagnostic): The diagnostic to render
+
+    Returns:
+        str: The rendered diagnostic
+    """
+
+    header = diagnostic.level
+    if diagnostic.code:
+        header += f"[{diagnostic.code}]"
+    lines = [f"{header}: {diagnostic.message}"]
+    shown_text = None
+    for span in sorted(diagnostic.spans, key=lambda span: not span.is_primary):
+        location = f"  --> {span.file_name}:{span.line_start}:{span.column_start}"
+        # spans on the same source line show it once
+        if span.text and span.text != shown_text:
+            location += f" `{span.text}`"
+            shown_text = span.text
+        if span.label:
+            location += f": {span.label}"
+        lines.append(location)
+    lines.extend(f"  = {note}" for note in diagnostic.notes)
+    return "\n".join(lines)
+
+
+def summarize_errors(
+    diagnostics: list[RustDiagnostic],
+    output: str,
+    filename: str,
+    line_ranges: list[tuple[int, int]] | None = None,
+) -> str:
+    """
+    Renders the errors relevant to an injected test. Only errors within the changed
+    lines are kept; if there are none, the errors in its file. Without structured
+    errors in the file, the errors are extracted from the human readable output.
+
+    Parameters:
+        diagnostics (list[RustDiagnostic]): The diagnostics reported by cargo
+        output (str): The output of the cargo command
+        filename (str): Path of the file containing the test, relative to the workspace root
+        line_ranges (list[tuple[int, int]] | None, optional): First and last line of each hunk changed in the file
+
+    Returns:
+        str: The rendered errors
+    """
+
+    errors = [diagnostic for diagnostic in diagnostics if diagnostic.is_error]
+    if line_ranges:
+        relevant = [
+            error
+            for error in errors
+            if any(error.located_in(filename, line_range) for line_range in line_ranges)
+        ]
+        if relevant:
+            return "\n\n".join(render_diagnostic(error) for error in relevant)
+    relevant = [error for error in errors if error.located_in(filename)]
+    if relevant:
+        return "\n\n".join(render_diagnostic(error) for error in relevant)
+    return general.retrieve_output_errors(output)
+
+
+def changed_line_ranges(original_content: str, new_content: str) -> list[tuple[int, int]]:
+    """
+    Finds the hunks of a file which differ from its original content, e.g. the imports
+    added at the top and the test injected at the bottom.
+
+    Parameters:
+        original_content (str): The original content of the file
+        new_content (str): The new content of the file
+
+    Returns:
+        list[tuple[int, int]]: First and last line of each changed hunk of the new content (1-based), empty if unchanged
+    """
+
+    matcher = difflib.SequenceMatcher(
+        None, original_content.splitlines(), new_content.splitlines(), autojunk=False
+    )
+    return [
+        (start + 1, end)
+        for tag, _, _, start, end in matcher.get_opcodes()
+        if tag != "equal" and end > start
+    ]
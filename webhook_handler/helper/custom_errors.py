@@ -15,3 +15,10 @@ class ExecutionError(Exception):
 
     def __init__(self, message: str = "An error occurred during execution") -> None:
         super().__init__(message)
+
+
+class RunCancelledError(ExecutionError):
+    """Raised whenever a run is cancelled, e.g. because another model won the race"""
+
+    def __init__(self, message: str = "Run cancelled") -> None:
+        super().__init__(message)
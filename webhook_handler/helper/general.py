@@ -4,6 +4,7 @@ import re
 import shutil
 import stat
 import subprocess
+import threading
 import time
 from pathlib import Path
 
@@ -11,6 +12,8 @@ from webhook_handler.models import GitHubEvent, LLMResponse
 
 logger = logging.getLogger(__name__)
 
+_checkout_lock = threading.Lock()
+
 
 def get_changed_files_from_git(
     repo_path: Path | str
@@ -132,17 +135,19 @@ def get_candidate_file(commit_hash: str, filename: str, tmp_repo_dir: str, gh_ev
             logger.marker(f"File {filename} does not exist in commit {commit_hash}")  # type: ignore[attr-defined]
     else:
         # For PRs, checkout the commit (original behavior)
-        current_branch = run_command("git rev-parse --abbrev-ref HEAD", cwd=tmp_repo_dir)
-        run_command(f"git checkout {commit_hash}", cwd=tmp_repo_dir)
-        
-        file_path = Path(tmp_repo_dir, filename)
-        if file_path.exists():
-            logger.marker(f"File {filename} exists in commit {commit_hash}")  # type: ignore[attr-defined]
-            file_content = file_path.read_text(encoding="utf-8")
-        else:
-            logger.marker(f"File {filename} does not exist in commit {commit_hash}")  # type: ignore[attr-defined]
-        
-        run_command(f"git checkout {current_branch}", cwd=tmp_repo_dir)
+        # Pipelines racing on the same clone must not check out concurrently
+        with _checkout_lock:
+            current_branch = run_command("git rev-parse --abbrev-ref HEAD", cwd=tmp_repo_dir)
+            run_command(f"git checkout {commit_hash}", cwd=tmp_repo_dir)
+
+            file_path = Path(tmp_repo_dir, filename)
+            if file_path.exists():
+                logger.marker(f"File {filename} exists in commit {commit_hash}")  # type: ignore[attr-defined]
+                file_content = file_path.read_text(encoding="utf-8")
+            else:
+                logger.marker(f"File {filename} does not exist in commit {commit_hash}")  # type: ignore[attr-defined]
+
+            run_command(f"git checkout {current_branch}", cwd=tmp_repo_dir)
 
     return file_content
 
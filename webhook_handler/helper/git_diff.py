@@ -2,6 +2,7 @@ import logging
 import os
 import re
 import subprocess
+import tempfile
 from pathlib import Path
 
 from webhook_handler.helper import general
@@ -108,19 +109,20 @@ def unified_diff_with_function_context(
     - A string containing the Git-formatted diff.
     """
 
-    temp_dir = "./tmp_diff/"
-    Path(temp_dir).mkdir(parents=True, exist_ok=True)
+    # a unique directory per call, so that concurrent pipelines do not share files
+    temp_dir = tempfile.mkdtemp(prefix="tmp_diff_")
     try:
         file_dir = "/".join(fname.split("/")[:-1])
         Path(temp_dir, file_dir).mkdir(parents=True, exist_ok=True)
 
-        original_file = os.path.join(temp_dir, f"{fname}.oldfordiffonly")
-        modified_file = os.path.join(temp_dir, f"{fname}.newfordiffonly")
+        # paths relative to temp_dir, so that they are relative to the target repo in the diff
+        original_file = f"{fname}.oldfordiffonly"
+        modified_file = f"{fname}.newfordiffonly"
 
-        with open(original_file, "w", encoding="utf-8", newline="\n") as f:
+        with open(Path(temp_dir, original_file), "w", encoding="utf-8", newline="\n") as f:
             f.write(original)
 
-        with open(modified_file, "w", encoding="utf-8", newline="\n") as f:
+        with open(Path(temp_dir, modified_file), "w", encoding="utf-8", newline="\n") as f:
             f.write(modified)
 
         # Run `git diff --no-index`
@@ -134,12 +136,12 @@ def unified_diff_with_function_context(
                 original_file,
                 modified_file,
             ],
+            cwd=temp_dir,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
         )
         diff = result.stdout.strip()
-        diff = diff.replace(temp_dir, "")  # make paths relative to target repo again
         diff = diff.replace(f"{fname}.oldfordiffonly", fname)  # >>
         diff = diff.replace(f"{fname}.newfordiffonly", fname)  # >>
         diff_lines = diff.splitlines()
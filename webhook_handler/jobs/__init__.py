@@ -0,0 +1,3 @@
+from .job_queue import PRIORITY_LOW, PRIORITY_NORMAL, Job, JobQueue
+
+__all__ = ["Job", "JobQueue", "PRIORITY_NORMAL", "PRIORITY_LOW"]
@@ -0,0 +1,129 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger("bootstrap")
+
+# Job priorities, lower values are run first
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = 10  # background work such as warming images, run when no PR is waiting
+
+_job_sequence = itertools.count()
+
+
+@dataclass(order=True)
+class Job:
+    """
+    A unit of work processed by the worker pool. Jobs are ordered by priority,
+    jobs of the same priority in the order they were enqueued.
+    """
+
+    priority: int
+    sequence: int = field(default_factory=lambda: next(_job_sequence), init=False)
+    job_id: str = field(default="", compare=False)
+    target: Callable[[], None] = field(default=lambda: None, compare=False)
+    enqueued_at: float = field(default_factory=time.time, compare=False)
+
+
+class JobQueue:
+    """
+    Bounded queue of bot runs, processed by a fixed number of worker threads.
+    """
+
+    def __init__(self, worker_count: int, max_queue_size: int) -> None:
+        self._worker_count = max(1, worker_count)
+        self._max_queue_size = max(1, max_queue_size)
+        self._queue: queue.PriorityQueue[Job] = queue.PriorityQueue(maxsize=self._max_queue_size)
+        self._in_flight: dict[str, float] = {}
+        self._processed = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+        self._workers: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Starts the worker threads, if not already running"""
+
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self._worker_count):
+                worker = threading.Thread(
+                    target=self._work, name=f"bot-worker-{i + 1}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Started {self._worker_count} bot worker(s)")
+
+    def submit(
+        self, job_id: str, target: Callable[[], None], priority: int = PRIORITY_NORMAL
+    ) -> bool:
+        """
+        Enqueues a job without blocking.
+
+        Parameters:
+            job_id (str): Identifier of the job (used for logging and stats)
+            target (Callable): The function executed by a worker
+            priority (int, optional): Priority of the job, lower values are run first
+
+        Returns:
+            bool: True if the job was enqueued, False if the queue is full
+        """
+
+        try:
+            self._queue.put_nowait(Job(priority, job_id=job_id, target=target))
+        except queue.Full:
+            logger.critical(f"[{job_id}] Job queue is full, rejecting job")
+            return False
+        logger.info(f"[{job_id}] Job enqueued ({self._queue.qsize()} queued)")
+        return True
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the queue state.
+
+        Returns:
+            dict: Queue depth, in-flight jobs and worker counters
+        """
+
+        now = time.time()
+        with self._lock:
+            in_flight = {
+                job_id: round(now - started_at, 1)
+                for job_id, started_at in self._in_flight.items()
+            }
+            return {
+                "workers": self._worker_count,
+                "max_queue_size": self._max_queue_size,
+                "queued": self._queue.qsize(),
+                "in_flight": len(in_flight),
+                "in_flight_jobs": in_flight,
+                "processed": self._processed,
+                "failed": self._failed,
+            }
+
+    def _work(self) -> None:
+        """Worker loop: takes jobs from the queue and runs them one at a time"""
+
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self._in_flight[job.job_id] = time.time()
+            logger.info(
+                f"[{job.job_id}] Job started after {time.time() - job.enqueued_at:.1f}s in queue"
+            )
+            failed = False
+            try:
+                job.target()
+            except Exception as e:
+                failed = True
+                logger.critical(f"[{job.job_id}] Job failed: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.pop(job.job_id, None)
+                    self._processed += 1
+                    self._failed += int(failed)
+                self._queue.task_done()
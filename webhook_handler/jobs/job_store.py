@@ -0,0 +1,191 @@
+import os
+import socket
+import time
+
+from django.db import models
+
+from webhook_handler.models import PipelineStage
+
+# Identifies this process incarnation, so that jobs claimed by a previous
+# process with the same PID are still recognised as orphaned
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{int(time.time())}"
+
+
+class BotJob(models.Model):
+    """
+    Durable record of one bot run, updated as the run progresses through its stages.
+    Image warming jobs for pushes to the default branch are recorded as well, they
+    have no PR number.
+    """
+
+    class Kind(models.TextChoices):
+        PULL_REQUEST = "PULL_REQUEST"
+        WARM_IMAGE = "WARM_IMAGE"
+
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED"
+        RUNNING = "RUNNING"
+        COMPLETED = "COMPLETED"
+        FAILED = "FAILED"
+        REJECTED = "REJECTED"
+        SUPERSEDED = "SUPERSEDED"
+
+    UNFINISHED_STATUSES = (Status.QUEUED, Status.RUNNING)
+    # A new delivery for the same PR head is dropped while a job in one of these states exists
+    COALESCED_STATUSES = (Status.QUEUED, Status.RUNNING, Status.COMPLETED)
+
+    kind = models.CharField(max_length=16, choices=Kind.choices, default=Kind.PULL_REQUEST)
+    delivery_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    execution_id = models.CharField(max_length=255)
+    owner = models.CharField(max_length=255)
+    repo = models.CharField(max_length=255)
+    pr_number = models.PositiveIntegerField()  # 0 for image warming jobs
+    head_sha = models.CharField(max_length=64)
+    payload = models.JSONField()
+
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED
+    )
+    stage = models.CharField(
+        max_length=32,
+        choices=[(stage.value, stage.value) for stage in PipelineStage],
+        default=PipelineStage.RECEIVED.value,
+    )
+    model = models.CharField(max_length=64, blank=True, default="")
+    llm_call = models.PositiveIntegerField(default=0)
+    models_tried = models.JSONField(default=list)
+    message = models.TextField(blank=True, default="")
+    run_count = models.PositiveIntegerField(default=0)
+    claimed_by = models.CharField(max_length=255, blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "webhook_handler"
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status"]),
+            models.Index(fields=["owner", "repo", "pr_number"]),
+        ]
+        constraints = [
+            # backs the coalescing of deliveries for the same PR head against concurrent requests,
+            # the condition lists the COALESCED_STATUSES
+            models.UniqueConstraint(
+                fields=["owner", "repo", "pr_number", "head_sha"],
+                condition=models.Q(status__in=["QUEUED", "RUNNING", "COMPLETED"]),
+                name="unique_coalesced_job_per_head",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.execution_id} [{self.status}/{self.stage}]"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status not in self.UNFINISHED_STATUSES
+
+    def record_stage(self, stage: PipelineStage, **fields) -> None:
+        """
+        Persists the stage reached by the run.
+
+        Parameters:
+            stage (PipelineStage): The stage that has been reached
+            **fields: Further job fields to update (e.g. model, llm_call)
+        """
+
+        self.stage = stage
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.save(update_fields=["stage", "updated_at", *fields.keys()])
+
+    def finish(self, status: "BotJob.Status", message: str = "") -> None:
+        """
+        Marks the job as finished.
+
+        Parameters:
+            status (BotJob.Status): The final status
+            message (str, optional): Outcome message
+        """
+
+        self.status = status
+        self.message = message
+        self.save(update_fields=["status", "message", "updated_at"])
+
+    def start(self) -> bool:
+        """
+        Atomically moves the job into the RUNNING state. Fails if the job has
+        been finished or superseded in the meantime.
+
+        Returns:
+            bool: True if the job may run, False otherwise
+        """
+
+        started = BotJob.objects.filter(
+            pk=self.pk, status__in=self.UNFINISHED_STATUSES
+        ).update(status=self.Status.RUNNING, run_count=models.F("run_count") + 1)
+        if started:
+            self.refresh_from_db()
+        return bool(started)
+
+    def claim(self) -> bool:
+        """
+        Atomically claims the job for this process. A job can only be claimed
+        if it is unfinished and not held by another live process.
+
+        Returns:
+            bool: True if this process now owns the job, False otherwise
+        """
+
+        if self.claimed_by and self.claimed_by != WORKER_ID and _is_alive(self.claimed_by):
+            return False
+        claimed = BotJob.objects.filter(
+            pk=self.pk,
+            claimed_by=self.claimed_by,
+            status__in=self.UNFINISHED_STATUSES,
+        ).update(claimed_by=WORKER_ID)
+        if claimed:
+            self.claimed_by = WORKER_ID
+        return bool(claimed)
+
+    @classmethod
+    def orphaned(cls) -> list["BotJob"]:
+        """
+        Returns all unfinished jobs whose owning process is gone.
+
+        Returns:
+            list[BotJob]: Jobs which can be resumed by this process
+        """
+
+        return [
+            job
+            for job in cls.objects.filter(status__in=cls.UNFINISHED_STATUSES)
+            if not job.claimed_by or not _is_alive(job.claimed_by)
+        ]
+
+
+def _is_alive(worker_id: str) -> bool:
+    """
+    Checks whether the process which claimed a job is still running.
+
+    Parameters:
+        worker_id (str): The worker ID in the form '<hostname>:<pid>:<start>'
+
+    Returns:
+        bool: True if the process is (possibly) alive, False if it is known to be gone
+    """
+
+    if worker_id == WORKER_ID:
+        return True
+    hostname, pid, _ = worker_id.rsplit(":", 2)
+    if hostname != socket.gethostname():
+        return True  # cannot tell for other hosts, assume alive
+    if int(pid) == os.getpid():
+        return False  # previous incarnation of this process
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('execution_id', models.CharField(max_length=255)),
+                ('owner', models.CharField(max_length=255)),
+                ('repo', models.CharField(max_length=255)),
+                ('pr_number', models.PositiveIntegerField()),
+                ('head_sha', models.CharField(max_length=64)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('REJECTED', 'Rejected')], default='QUEUED', max_length=16)),
+                ('stage', models.CharField(choices=[('RECEIVED', 'RECEIVED'), ('VALIDATED', 'VALIDATED'), ('ENVIRONMENT_PREPARED', 'ENVIRONMENT_PREPARED'), ('LLM_CALL', 'LLM_CALL'), ('LINT', 'LINT'), ('PRE_PR', 'PRE_PR'), ('POST_PR', 'POST_PR'), ('COVERAGE', 'COVERAGE'), ('FINISHED', 'FINISHED')], default='RECEIVED', max_length=32)),
+                ('model', models.CharField(blank=True, default='', max_length=64)),
+                ('llm_call', models.PositiveIntegerField(default=0)),
+                ('models_tried', models.JSONField(default=list)),
+                ('message', models.TextField(blank=True, default='')),
+                ('run_count', models.PositiveIntegerField(default=0)),
+                ('claimed_by', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status'], name='webhook_han_status_b755ef_idx'), models.Index(fields=['owner', 'repo', 'pr_number'], name='webhook_han_owner_f5b4f4_idx')],
+            },
+        ),
+    ]
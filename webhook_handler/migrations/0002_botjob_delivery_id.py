@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-16 20:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='botjob',
+            name='delivery_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='botjob',
+            name='status',
+            field=models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed'), ('REJECTED', 'Rejected'), ('SUPERSEDED', 'Superseded')], default='QUEUED', max_length=16),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0002_botjob_delivery_id'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='botjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['QUEUED', 'RUNNING', 'COMPLETED'])), fields=('owner', 'repo', 'pr_number', 'head_sha'), name='unique_coalesced_job_per_head'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 21:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhook_handler', '0003_botjob_unique_coalesced_head'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='botjob',
+            name='kind',
+            field=models.CharField(choices=[('PULL_REQUEST', 'Pull Request'), ('WARM_IMAGE', 'Warm Image')], default='PULL_REQUEST', max_length=16),
+        ),
+    ]
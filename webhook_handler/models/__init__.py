@@ -1,11 +1,20 @@
+from .build_flavour_enum import BuildFlavour
+from .cargo_target import CargoTarget
+from .exec_output import ExecOutput
 from .gh_events import GitHubEvent
 from .llm_enum import LLM
 from .llm_response import LLMResponse
 from .pipeline_inputs import PipelineInputs
+from .pipeline_stage_enum import PipelineStage
 from .pr_data import PullRequestData
 from .pr_file_diff import PullRequestFileDiff
 from .prompt_type_enum import PromptType
+from .run_budget import RunBudget
+from .rust_diagnostic import DiagnosticSpan, RustDiagnostic
 from .test_coverage import TestCoverage
+from .verification_outcome_enum import VerificationOutcome
 
 __all__ = ["LLM", "PullRequestData", "PullRequestFileDiff", "PipelineInputs", 
-           "PromptType", "LLMResponse", "TestCoverage", "GitHubEvent"]
+           "PromptType", "LLMResponse", "TestCoverage", "GitHubEvent", "PipelineStage",
+           "RunBudget", "VerificationOutcome", "BuildFlavour", "CargoTarget", "ExecOutput",
+           "RustDiagnostic", "DiagnosticSpan"]
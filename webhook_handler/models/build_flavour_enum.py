@@ -0,0 +1,19 @@
+from enum import StrEnum
+
+
+class BuildFlavour(StrEnum):
+    """
+    Determines how a container stage compiles the code. Each flavour builds into its own target directory.
+    The environments must match the prebuilds of the Dockerfiles, so that the prebuilt artifacts are reused.
+    """
+
+    PLAIN = "PLAIN"
+    INSTRUMENTED = "INSTRUMENTED"
+
+    @property
+    def exec_environment(self) -> dict[str, str]:
+        if self is BuildFlavour.INSTRUMENTED:
+            # cargo llvm-cov sets up the instrumentation itself
+            return {"CARGO_LLVM_COV_TARGET_DIR": "/app/testbed/target/llvm-cov-target"}
+        # RUSTFLAGS stays unset, an empty value would override the rustflags of the repository's cargo config
+        return {"CARGO_TARGET_DIR": "/app/testbed/target"}
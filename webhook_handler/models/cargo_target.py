@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+
+# Target kinds of a library, all built by `cargo test --lib`
+LIB_KINDS = {"lib", "rlib", "dylib", "cdylib", "staticlib", "proc-macro"}
+
+
+@dataclass(frozen=True)
+class CargoTarget:
+    """
+    A cargo target a source file is compiled into. The target name is None if only
+    the package is known, e.g. for files shared by several integration tests.
+    """
+
+    package: str
+    kind: str | None = None
+    name: str | None = None
+
+    @property
+    def cargo_args(self) -> list[str]:
+        """
+        Returns:
+            list[str]: The cargo arguments selecting the target
+        """
+
+        args = ["-p", self.package]
+        if self.kind in LIB_KINDS:
+            args.append("--lib")
+        elif self.kind in ("bin", "test") and self.name:
+            args.extend([f"--{self.kind}", self.name])
+        return args
@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ExecOutput:
+    """
+    Result of a command streamed from a container. Only the tail of the output is
+    kept in memory, the full output is written to disk while the command runs.
+    """
+
+    exit_code: int
+    output: str
+    aborted: bool = False
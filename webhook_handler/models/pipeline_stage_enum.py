@@ -0,0 +1,17 @@
+from enum import StrEnum
+
+
+class PipelineStage(StrEnum):
+    """
+    Determines the stage a bot run has reached.
+    """
+
+    RECEIVED = "RECEIVED"
+    VALIDATED = "VALIDATED"
+    ENVIRONMENT_PREPARED = "ENVIRONMENT_PREPARED"
+    LLM_CALL = "LLM_CALL"
+    LINT = "LINT"
+    PRE_PR = "PRE_PR"
+    POST_PR = "POST_PR"
+    COVERAGE = "COVERAGE"
+    FINISHED = "FINISHED"
@@ -59,3 +59,32 @@ class PullRequestData:
             owner=repo["owner"]["login"],
             repo=repo["name"],
         )
+
+    @classmethod
+    def from_push_payload(cls, payload: dict) -> "PullRequestData":
+        """
+        Extracts the pushed commit of a push payload. The data has no PR number,
+        base and head commit are both the pushed commit.
+
+        Parameters:
+            payload (dict): A push payload
+
+        Returns:
+            PullRequestData: The data extracted from the payload
+        """
+
+        repo = payload["repository"]
+        branch = payload["ref"].removeprefix("refs/heads/")
+        return cls(
+            number="",
+            title=f"Push to {branch}",
+            description="",
+            url=repo["url"],
+            diff_url="",
+            base_branch=branch,
+            base_commit=payload["after"],
+            head_branch=branch,
+            head_commit=payload["after"],
+            owner=repo["owner"]["login"],
+            repo=repo["name"],
+        )
@@ -2,6 +2,14 @@ from dataclasses import dataclass
 
 from webhook_handler.helper import git_diff
 
+# Files configuring the build, changes to them may add or bump crates
+CONFIG_FILE_NAMES = [
+    "Cargo.toml",
+    "Cargo.lock",
+    ".cargo/config",
+    ".cargo/config.toml",
+]
+
 
 @dataclass
 class PullRequestFileDiff:
@@ -12,6 +20,7 @@ class PullRequestFileDiff:
     name: str
     before: str
     after: str
+    removed: bool = False  # the PR deletes the file, after is empty then
 
     @property
     def is_test_file(self) -> bool:
@@ -77,13 +86,7 @@ class PullRequestFileDiff:
             bool: True if this PR changed config file is config file, False otherwise
         """
 
-        config_file_names = [
-            "Cargo.toml",
-            "Cargo.lock",
-            ".cargo/config",
-            ".cargo/config.toml",
-        ]
-        return any(self.name.endswith(cfg_name) for cfg_name in config_file_names)
+        return any(self.name.endswith(cfg_name) for cfg_name in CONFIG_FILE_NAMES)
 
     def unified_code_diff(self) -> str:
         """
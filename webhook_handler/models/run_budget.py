@@ -0,0 +1,57 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class RunBudget:
+    """
+    Holds the resource limits of a PR run together with the resources used so far.
+    A limit of None means unlimited.
+    """
+
+    max_seconds: float | None = None
+    max_tokens: int | None = None
+    max_container_seconds: float | None = None
+
+    tokens_used: int = 0
+    container_seconds_used: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def add_tokens(self, tokens: int) -> None:
+        with self._lock:
+            self.tokens_used += tokens
+
+    def add_container_seconds(self, seconds: float) -> None:
+        with self._lock:
+            self.container_seconds_used += seconds
+
+    def exhausted_by(self) -> str | None:
+        """
+        Returns the first limit which has been reached, if any.
+
+        Returns:
+            str | None: Description of the exhausted limit, None if the budget is left
+        """
+
+        if self.max_seconds is not None and self.elapsed_seconds >= self.max_seconds:
+            return f"time budget of {self.max_seconds:.0f}s"
+        if self.max_tokens is not None and self.tokens_used >= self.max_tokens:
+            return f"token budget of {self.max_tokens} tokens"
+        if (
+            self.max_container_seconds is not None
+            and self.container_seconds_used >= self.max_container_seconds
+        ):
+            return f"container budget of {self.max_container_seconds:.0f}s"
+        return None
+
+    def summary(self) -> str:
+        return (
+            f"{self.elapsed_seconds:.0f}s elapsed, {self.tokens_used} tokens, "
+            f"{self.container_seconds_used:.0f} container seconds"
+        )
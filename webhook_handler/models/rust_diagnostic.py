@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DiagnosticSpan:
+    """
+    A source location of a rustc diagnostic. Spans inside macro expansions are
+    resolved to the call site of the macro.
+    """
+
+    file_name: str
+    line_start: int
+    line_end: int
+    column_start: int
+    is_primary: bool
+    label: str | None = None
+    text: str | None = None
+
+
+@dataclass(frozen=True)
+class RustDiagnostic:
+    """
+    A diagnostic reported by rustc through cargo's JSON message format.
+    """
+
+    level: str
+    message: str
+    code: str | None
+    spans: tuple[DiagnosticSpan, ...]
+    notes: tuple[str, ...]
+    rendered: str
+
+    @property
+    def is_error(self) -> bool:
+        return self.level.startswith("error")
+
+    def located_in(self, filename: str, line_range: tuple[int, int] | None = None) -> bool:
+        """
+        Checks whether one of the diagnostic's spans lies in a file.
+
+        Parameters:
+            filename (str): Path of the file, relative to the workspace root
+            line_range (tuple[int, int] | None, optional): First and last line the span must overlap
+
+        Returns:
+            bool: True if the diagnostic is located in the file (and line range), False otherwise
+        """
+
+        for span in self.spans:
+            if span.file_name != filename and not span.file_name.endswith("/" + filename):
+                continue
+            if line_range is None or (
+                span.line_start <= line_range[1] and span.line_end >= line_range[0]
+            ):
+                return True
+        return False
@@ -0,0 +1,13 @@
+from enum import StrEnum
+
+
+class VerificationOutcome(StrEnum):
+    """
+    Result of verifying a candidate test, determines the prompt of the next LLM call.
+    """
+
+    LINT_FAILED = "LINT_FAILED"
+    PASSED_BEFORE = "PASSED_BEFORE"
+    ASSERTION_FAILED = "ASSERTION_FAILED"
+    COMPILATION_FAILED = "COMPILATION_FAILED"
+    FAIL_TO_PASS = "FAIL_TO_PASS"
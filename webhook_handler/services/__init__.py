@@ -1,11 +1,17 @@
+from .build_coordinator import BuildCoordinator
 from .config import Config
+from .container_pool import ContainerPool
 from .cst_builder import CSTBuilder
 from .docker_service import DockerService
 from .gh_service import GitHubService
+from .image_cache import ImageCache
 from .llm_handler import LLMHandler
 from .local_diff_service import LocalDiffService
+from .model_race import ModelRace
 from .pr_diff_context import PullRequestDiffContext
+from .streaming_exec import CompileErrorMatcher, StreamingExec
 from .test_generator import TestGenerator
+from .workspace_index import WorkspaceIndex
 
 __all__ = [
     "Config",
@@ -16,4 +22,11 @@ __all__ = [
     "DockerService",
     "TestGenerator",
     "LocalDiffService",
+    "ModelRace",
+    "ContainerPool",
+    "ImageCache",
+    "BuildCoordinator",
+    "WorkspaceIndex",
+    "StreamingExec",
+    "CompileErrorMatcher",
 ]
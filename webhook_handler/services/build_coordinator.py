@@ -0,0 +1,73 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from webhook_handler.helper.custom_errors import *
+
+logger = logging.getLogger(__name__)
+
+
+class BuildCoordinator:
+    """
+    Makes sure each image is built at most once at a time. The first run needing an
+    image builds it, concurrent runs wait for that build and share its result. Failed
+    builds are remembered for a while, so that a broken commit is not rebuilt by every run.
+    """
+
+    _lock = threading.Lock()
+    _builds: dict[str, Future[None]] = {}
+    _failures: dict[str, float] = {}  # image tag -> time of the failed build
+
+    @classmethod
+    def build_once(cls, tag: str, build: Callable[[], None], failure_ttl: float) -> None:
+        """
+        Builds an image unless a build of it is already running, in which case the running build is awaited.
+
+        Parameters:
+            tag (str): The image tag
+            build (Callable[[], None]): Builds the image, raising an exception on failure
+            failure_ttl (float): Seconds a failed build is not retried
+
+        Raises:
+            ExecutionError: If the build failed, now or within the last failure_ttl seconds
+        """
+
+        with cls._lock:
+            failed_at = cls._failures.get(tag)
+            if failed_at is not None and time.monotonic() - failed_at < failure_ttl:
+                raise ExecutionError(f"Docker build of {tag} failed recently, not retrying")
+            future = cls._builds.get(tag)
+            is_owner = future is None
+            if future is None:
+                future = Future()
+                cls._builds[tag] = future
+
+        if not is_owner:
+            logger.marker(f"Waiting for running build of image {tag}...")  # type: ignore[attr-defined]
+            future.result()
+            return
+
+        try:
+            build()
+        except Exception as e:
+            with cls._lock:
+                cls._failures[tag] = time.monotonic()
+                del cls._builds[tag]
+            future.set_exception(e)
+            raise
+        with cls._lock:
+            cls._failures.pop(tag, None)
+            del cls._builds[tag]
+        future.set_result(None)
+
+    @classmethod
+    def builds_in_flight(cls) -> int:
+        """
+        Returns:
+            int: Number of image builds currently running
+        """
+
+        with cls._lock:
+            return len(cls._builds)
@@ -34,6 +34,30 @@ class Config:
 
         self.parsing_language = Language(tree_sitter_rust.language())
 
+        # Webhook job queue
+        self.worker_count = int(os.getenv("BOT_WORKER_COUNT", "2"))
+        self.max_queued_jobs = int(os.getenv("BOT_MAX_QUEUED_JOBS", "50"))
+        # Run all models in parallel, the first fail-to-pass test wins
+        self.race_models = os.getenv("BOT_RACE_MODELS", "false").lower() == "true"
+        # Query the next candidate test while the current one is verified
+        self.pipelined_generation = os.getenv("BOT_PIPELINED_GENERATION", "false").lower() == "true"
+
+        # Started containers kept ready per image, 0 disables the pool
+        self.container_pool_size = int(os.getenv("BOT_CONTAINER_POOL_SIZE", "2"))
+        # Host directory of the compiler cache shared by all containers, empty disables it
+        compiler_cache_dir = os.getenv("BOT_COMPILER_CACHE_DIR", Path(self.root_dir, "compiler_cache").as_posix())
+        self.compiler_cache_dir = Path(compiler_cache_dir) if compiler_cache_dir else None
+        self.compiler_cache_size = os.getenv("BOT_COMPILER_CACHE_SIZE", "10G")
+        # Send the local target/debug with issue-mode image builds when the local rustc matches the image
+        self.seed_local_target = os.getenv("BOT_SEED_LOCAL_TARGET", "true").lower() == "true"
+        # Disk budget of the built images kept for reuse, least recently used images are removed first
+        self.image_cache_bytes = int(float(os.getenv("BOT_IMAGE_CACHE_GB", "50")) * 1024**3)
+
+        # Per-PR run budgets, unset means unlimited
+        self.max_run_seconds = _optional_float(os.getenv("BOT_MAX_RUN_SECONDS"))
+        self.max_run_tokens = _optional_int(os.getenv("BOT_MAX_RUN_TOKENS"))
+        self.max_container_seconds = _optional_float(os.getenv("BOT_MAX_CONTAINER_SECONDS"))
+
         if self.is_server:
             self.webhook_raw_log_dir = Path("home", "ubuntu", "logs", "raw")
             self.bot_log_dir = Path("home", "ubuntu", "logs")
@@ -107,13 +131,16 @@ class Config:
                 encoding="utf-8",
             )
 
-    def setup_output_dir(self, i_attempt: int, model: LLM) -> None:
+    def setup_output_dir(self, i_attempt: int, model: LLM) -> Path:
         """
         Sets up directory for generated runner files (one directory per run)
 
         Parameters:
             i_attempt (int): Attempt number
             model (LLM): Model name
+
+        Returns:
+            Path: The output directory
         """
         # Assert setup_pr_log_dir has been called
         assert (
@@ -122,6 +149,7 @@ class Config:
         self.output_dir = Path(self.pr_log_dir, "i%s" % (i_attempt + 1) + "_%s" % model)
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
         self.curr_attempt += 1
+        return self.output_dir
 
     def _teardown(self) -> None:
         """
@@ -132,3 +160,11 @@ class Config:
             cloned_repo_dir = Path(Path.cwd(), self.cloned_repo_dir)
             if cloned_repo_dir.exists():
                 general.remove_dir(cloned_repo_dir)
+
+
+def _optional_int(value: str | None) -> int | None:
+    return int(value) if value else None
+
+
+def _optional_float(value: str | None) -> float | None:
+    return float(value) if value else None
@@ -0,0 +1,323 @@
+import atexit
+import logging
+import threading
+from pathlib import Path
+
+from docker import DockerClient
+from docker.errors import APIError, ContainerError, NotFound
+from docker.models.containers import Container
+
+from webhook_handler.helper.custom_errors import *
+
+logger = logging.getLogger(__name__)
+
+# Restores the checkout of the image, ignored files such as target/ are kept to reuse build artifacts.
+# A Cargo.lock generated by the image build is kept as well, since containers resolve crates offline
+RESET_COMMAND = "/bin/sh -c 'cd /app/testbed && git checkout -q . && git clean -fdq -e Cargo.lock'"
+
+# Crates are fetched during the image build, stages must not access the network.
+# Only containers with manifests changed by a PR fetch the new crates, see DockerService
+CONTAINER_ENVIRONMENT = {"CARGO_NET_OFFLINE": "true"}
+
+# Mount point of the host-side compiler cache
+COMPILER_CACHE_MOUNT = "/sccache"
+
+
+class ContainerPool:
+    """
+    Keeps started containers of an image ready for use, so that container start and
+    stop latency is not paid for every stage. Containers are reset to the checkout
+    of the image before they are reused. Pools live across runs, they are drained
+    when their image is evicted and when the process exits.
+    """
+
+    _pools: dict[str, "ContainerPool"] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(
+        self,
+        client: DockerClient,
+        image_tag: str,
+        size: int,
+        compiler_cache_dir: Path | None = None,
+        compiler_cache_size: str = "10G",
+    ) -> None:
+        self._client = client
+        self._image_tag = image_tag
+        self._size = size
+        self._compiler_cache_dir = compiler_cache_dir
+        self._compiler_cache_size = compiler_cache_size
+        self._uses_compiler_cache: bool | None = None  # checked on first container
+        self._idle: list[Container] = []
+        self._leased = 0  # containers taken from the pool and not yet returned
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_image(
+        cls,
+        client: DockerClient,
+        image_tag: str,
+        size: int,
+        compiler_cache_dir: Path | None = None,
+        compiler_cache_size: str = "10G",
+    ) -> "ContainerPool":
+        """
+        Returns the process-wide pool of an image, creating it on first use or if it
+        has been drained. The pool grows to the largest size requested.
+
+        Parameters:
+            client (DockerClient): The Docker client
+            image_tag (str): The image of the pooled containers
+            size (int): Maximum number of idle containers kept
+            compiler_cache_dir (Path | None): Host directory of the compiler cache, None disables it
+            compiler_cache_size (str): Size cap of the compiler cache, e.g. '10G'
+
+        Returns:
+            ContainerPool: The pool of the image
+        """
+
+        with cls._pools_lock:
+            pool = cls._pools.get(image_tag)
+            if pool is None or pool._closed:
+                pool = cls(client, image_tag, size, compiler_cache_dir, compiler_cache_size)
+                cls._pools[image_tag] = pool
+            with pool._lock:
+                pool._size = max(pool._size, size)
+            return pool
+
+    @classmethod
+    def drain_image(cls, image_tag: str) -> None:
+        """
+        Removes the pool of an image together with its idle containers.
+
+        Parameters:
+            image_tag (str): The image of the pool
+        """
+
+        with cls._pools_lock:
+            pool = cls._pools.pop(image_tag, None)
+        if pool is not None:
+            pool.drain()
+
+    @classmethod
+    def has_leased(cls, image_tag: str) -> bool:
+        """
+        Checks whether a run is using a container of the pool of an image.
+
+        Parameters:
+            image_tag (str): The image of the pool
+
+        Returns:
+            bool: True if a container of the pool is in use, False otherwise
+        """
+
+        with cls._pools_lock:
+            pool = cls._pools.get(image_tag)
+        if pool is None:
+            return False
+        with pool._lock:
+            return pool._leased > 0
+
+    @classmethod
+    def drain_idle(cls, image_tag: str) -> None:
+        """
+        Removes the idle containers of the pool of an image. The pool stays open,
+        so that runs can still take containers from it.
+
+        Parameters:
+            image_tag (str): The image of the pool
+        """
+
+        with cls._pools_lock:
+            pool = cls._pools.get(image_tag)
+        if pool is None:
+            return
+        with pool._lock:
+            idle, pool._idle = pool._idle, []
+        for container in idle:
+            pool._remove(container)
+
+    @classmethod
+    def drain_all(cls) -> None:
+        """Removes all pools together with their idle containers"""
+
+        with cls._pools_lock:
+            pools, cls._pools = list(cls._pools.values()), {}
+        for pool in pools:
+            pool.drain()
+
+    def warm(self) -> None:
+        """Starts containers in the background until the pool is full"""
+
+        def fill() -> None:
+            while True:
+                with self._lock:
+                    if self._closed or len(self._idle) >= self._size:
+                        return
+                try:
+                    container = self._create()
+                except APIError as e:
+                    logger.warning(f"Could not warm container pool of {self._image_tag}: {e}")
+                    return
+                if not self._put(container):
+                    self._remove(container)
+                    return
+
+        if self._size > 0:
+            threading.Thread(target=fill, name=f"pool-{self._image_tag}", daemon=True).start()
+
+    def acquire(self) -> Container:
+        """
+        Takes an idle container from the pool, or starts a new one if none is idle.
+
+        Returns:
+            Container: A running container with a clean checkout
+
+        Raises:
+            ExecutionError: If the pool has been drained
+        """
+
+        with self._lock:
+            if self._closed:
+                raise ExecutionError(f"Container pool of {self._image_tag} has been drained")
+            container = self._idle.pop() if self._idle else None
+            self._leased += 1
+        if container is not None:
+            logger.marker(f"Container {container.short_id} taken from pool")  # type: ignore[attr-defined]
+            return container
+        try:
+            container = self._create()
+        except Exception:
+            self._return_lease()
+            raise
+        logger.marker(f"Container {container.short_id} started")  # type: ignore[attr-defined]
+        return container
+
+    def release(self, container: Container) -> None:
+        """
+        Resets a container and returns it to the pool. The container is removed
+        instead if it cannot be reset or the pool is full.
+
+        Parameters:
+            container (Container): The container to return
+        """
+
+        try:
+            if self._size > 0 and self._reset(container) and self._put(container):
+                logger.info(f"[*] Container {container.short_id} reset and returned to pool.")
+                return
+            self._remove(container)
+        finally:
+            self._return_lease()
+
+    def discard(self, container: Container) -> None:
+        """
+        Removes a container which cannot be reset to the checkout of the image, e.g.
+        because crates have been fetched into it.
+
+        Parameters:
+            container (Container): The container to remove
+        """
+
+        try:
+            self._remove(container)
+        finally:
+            self._return_lease()
+
+    def _return_lease(self) -> None:
+        # containers of a drained pool may be returned to the pool replacing it
+        with self._lock:
+            self._leased = max(self._leased - 1, 0)
+
+    def drain(self) -> None:
+        """Removes all idle containers, containers released later are removed as well"""
+
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for container in idle:
+            self._remove(container)
+
+    def _create(self) -> Container:
+        environment = dict(CONTAINER_ENVIRONMENT)
+        volumes: dict[str, dict[str, str]] = {}
+        if self._compiler_cache_dir is not None and self._image_has_compiler_cache():
+            # sccache writes cache entries atomically, so that containers can share the directory
+            self._compiler_cache_dir.mkdir(parents=True, exist_ok=True)
+            environment.update(
+                RUSTC_WRAPPER="sccache",
+                SCCACHE_DIR=COMPILER_CACHE_MOUNT,
+                SCCACHE_CACHE_SIZE=self._compiler_cache_size,
+            )
+            volumes[self._compiler_cache_dir.resolve().as_posix()] = {
+                "bind": COMPILER_CACHE_MOUNT,
+                "mode": "rw",
+            }
+
+        container = self._client.containers.create(
+            image=self._image_tag,
+            command="/bin/sh -c 'sleep infinity'",  # keep the container running
+            tty=True,  # allocate a TTY for interactive use
+            detach=True,
+            environment=environment,
+            volumes=volumes,
+        )
+        container.start()
+        return container
+
+    def _image_has_compiler_cache(self) -> bool:
+        """
+        Checks once per image whether sccache is installed, images built before it was added lack it.
+
+        Returns:
+            bool: True if the containers can use the compiler cache, False otherwise
+        """
+
+        with self._lock:
+            if self._uses_compiler_cache is not None:
+                return self._uses_compiler_cache
+        try:
+            self._client.containers.run(
+                self._image_tag, "/bin/sh -c 'command -v sccache'", remove=True
+            )
+            uses_compiler_cache = True
+        except (ContainerError, APIError):
+            uses_compiler_cache = False
+        if not uses_compiler_cache:
+            logger.info(f"sccache not installed in {self._image_tag}, compiling without cache")
+        with self._lock:
+            self._uses_compiler_cache = uses_compiler_cache
+        return uses_compiler_cache
+
+    def _put(self, container: Container) -> bool:
+        with self._lock:
+            if self._closed or len(self._idle) >= self._size:
+                return False
+            self._idle.append(container)
+            return True
+
+    @staticmethod
+    def _reset(container: Container) -> bool:
+        try:
+            exec_result = container.exec_run(RESET_COMMAND, stdout=True, stderr=True)
+        except APIError:
+            return False  # e.g. container has been killed
+        if exec_result.exit_code != 0:
+            logger.warning(f"[!] Failed to reset container: {exec_result.output.decode()}")
+            return False
+        return True
+
+    @staticmethod
+    def _remove(container: Container) -> None:
+        try:
+            container.remove(force=True)
+            logger.info("[*] Container stopped and removed.")
+        except NotFound:
+            pass
+        except APIError as e:
+            logger.error(f"Failed to remove container {container.short_id}: {e}")
+
+
+# idle containers would otherwise outlive the process
+atexit.register(ContainerPool.drain_all)
@@ -1,9 +1,12 @@
+import hashlib
 import io
+import json
 import logging
-import os
 import re
 import tarfile
-import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import docker
@@ -11,12 +14,50 @@ from docker.errors import APIError, BuildError, ImageNotFound
 from docker.models.containers import Container
 from docker.models.images import Image
 
+from webhook_handler.constants import (IMAGE_BUILD_FAILURE_TTL,
+                                       IMAGE_BUILD_WORKERS,
+                                       MIRROR_REFRESH_SECONDS)
+from webhook_handler.helper import build_context
+from webhook_handler.helper.compiler_messages import (MESSAGE_FORMAT_ARG,
+                                                      DiagnosticCollector)
 from webhook_handler.helper.custom_errors import *
-from webhook_handler.models import LLMResponse, PullRequestData
+from webhook_handler.models import (BuildFlavour, CargoTarget, ExecOutput,
+                                    PullRequestData, RunBudget, RustDiagnostic)
+from webhook_handler.models.pr_file_diff import CONFIG_FILE_NAMES
+from webhook_handler.services.build_coordinator import BuildCoordinator
+from webhook_handler.services.container_pool import ContainerPool
+from webhook_handler.services.image_cache import (CACHE_LABEL,
+                                                  INCREMENTAL_DOCKERFILE,
+                                                  ImageCache,
+                                                  default_branch_tag_for,
+                                                  image_tag_for)
+from webhook_handler.services.streaming_exec import (AbortMatcher,
+                                                     CompileErrorMatcher,
+                                                     LineTransform,
+                                                     StreamingExec)
+from webhook_handler.services.toolchain_image import (ensure_toolchain_image,
+                                                      supports_coverage,
+                                                      toolchain_tag_for,
+                                                      toolchain_version_of)
+from webhook_handler.services.workspace_index import WorkspaceIndex
 
 logger = logging.getLogger(__name__)
 
-type TestResult = tuple[bool, str]  # (test_passed, output)
+type SandboxResult = tuple[bool, str, list[RustDiagnostic]]  # (passed, output, errors)
+
+# cargo errors of target selections which do not exist, e.g. in a package added by the PR
+_SCOPE_ERRORS = (
+    "did not match any packages",
+    "no library targets found",
+    "no bin target named",
+    "no test target named",
+)
+
+# Fetches the crates of manifests changed by a PR, the image only holds the crates of the base commit
+FETCH_COMMAND = "/bin/sh -c 'cd /app/testbed && cargo fetch'"
+
+# Incremental images add layers on top of their base, overlay2 supports at most 128 layers
+MAX_INCREMENTAL_IMAGE_LAYERS = 100
 
 
 class DockerService:
@@ -24,22 +65,187 @@ class DockerService:
     Used for Docker operations.
     """
 
-    def __init__(self, project_root: Path, pr_data: PullRequestData, local_repo_path: Path | None = None) -> None:
+    # Shared by all runs, so that the number of concurrent background builds is bounded
+    _build_executor = ThreadPoolExecutor(
+        max_workers=IMAGE_BUILD_WORKERS, thread_name_prefix="image-build"
+    )
+
+    def __init__(
+        self,
+        project_root: Path,
+        pr_data: PullRequestData,
+        local_repo_path: Path | None = None,
+        budget: RunBudget | None = None,
+        container_pool_size: int = 0,
+        compiler_cache_dir: Path | None = None,
+        compiler_cache_size: str = "10G",
+        image_cache_bytes: int | None = None,
+        seed_local_target: bool = False,
+    ) -> None:
         self._project_root = project_root
         self._pr_data = pr_data
         self._local_repo_path = local_repo_path
+        self._budget = budget
+        self._seed_local_target = seed_local_target
         self._client = docker.from_env()
+        self._dockerfile_path = Path(self._project_root, "dockerfiles", self._get_docker_image())
+        self._toolchain_version = toolchain_version_of(self._dockerfile_path)
+        self._toolchain_tag = (
+            toolchain_tag_for(project_root, self._toolchain_version) if self._toolchain_version else ""
+        )
+        # images are shared by all runs building the same Dockerfile at the same commit
+        self._image_tag = image_tag_for(
+            pr_data.repo, self._dockerfile_path, pr_data.base_commit, self._toolchain_tag
+        )
+        self._image_cache = (
+            ImageCache(self._client, image_cache_bytes) if image_cache_bytes is not None else None
+        )
+        self._container_pool_size = container_pool_size
+        # one cache per repository, sccache keys entries by compiler and flags
+        self._compiler_cache_dir = (
+            Path(compiler_cache_dir, pr_data.repo) if compiler_cache_dir else None
+        )
+        self._compiler_cache_size = compiler_cache_size
+        self._containers: dict[Container, float] = {}  # container -> time charged to the budget up to
+        self._dirty_containers: set[Container] = set()  # cannot be reset, removed instead of pooled
+        self._containers_lock = threading.Lock()
+        self._cancelled = threading.Event()
+        # Sandboxes kept alive for all LLM calls of a run, keyed by whether the golden patch is applied
+        self._sandboxes: dict[bool, Container] = {}
+        self._golden_files: dict[str, str | None] | None = None
+        self._image_build: Future[None] | None = None
+
+    @property
+    def image_tag(self) -> str:
+        return self._image_tag
+
+    @property
+    def toolchain_version(self) -> str | None:
+        return self._toolchain_version
+
+    @property
+    def supports_coverage(self) -> bool:
+        return supports_coverage(self._toolchain_version)
+
+    @property
+    def _pool(self) -> ContainerPool:
+        # looked up on every use, the pool is replaced once its image has been evicted
+        return ContainerPool.for_image(
+            self._client,
+            self._image_tag,
+            self._container_pool_size,
+            self._compiler_cache_dir,
+            self._compiler_cache_size,
+        )
+
+    def cancel(self) -> None:
+        """Cancels all running and future container stages of this service"""
+
+        self._cancelled.set()
+        with self._containers_lock:
+            containers = list(self._containers)
+        for container in containers:
+            try:
+                container.kill()
+                logger.info(f"[*] Container {container.short_id} killed")
+            except APIError:
+                pass  # already stopped
+
+    def _start_container(self) -> Container:
+        """
+        Takes a running container of the image from the container pool.
+
+        Returns:
+            Container: The running container
+        """
+
+        if self._cancelled.is_set():
+            raise RunCancelledError()
+        self.wait_for_image()
+        container = self._pool.acquire()
+        with self._containers_lock:
+            self._containers[container] = time.monotonic()
+        if self._cancelled.is_set():
+            # cancelled while the container was starting
+            self._stop_container(container)
+            raise RunCancelledError()
+        return container
+
+    def _stop_container(self, container: Container) -> None:
+        """
+        Returns a container to the container pool.
+
+        Parameters:
+            container (Container): The container to return
+        """
+
+        self._charge_container_seconds(container)
+        with self._containers_lock:
+            self._containers.pop(container, None)
+            dirty = container in self._dirty_containers
+            self._dirty_containers.discard(container)
+        if dirty:
+            self._pool.discard(container)
+        else:
+            self._pool.release(container)
+
+    def _charge_container_seconds(self, container: Container) -> None:
+        """
+        Charges the time a container has been running since it was last charged to the budget.
+        Long-lived sandboxes are charged after every command, so that the budget is checked
+        against their usage between attempts and not only once they are released.
+
+        Parameters:
+            container (Container): A container started by this service
+        """
+
+        now = time.monotonic()
+        with self._containers_lock:
+            charged_until = self._containers.get(container)
+            if charged_until is None:
+                return
+            self._containers[container] = now
+        if self._budget is not None:
+            self._budget.add_container_seconds(now - charged_until)
+
+    def build_image_in_background(self) -> None:
+        """
+        Starts checking and building the image on the shared build executor, so that the build
+        overlaps with the work not needing containers. Container stages wait for it.
+        """
+
+        if self._image_build is not None:
+            return
+        self._image_build = self._build_executor.submit(self.check_and_build_image)
+
+    def wait_for_image(self) -> None:
+        """
+        Waits for the background image build, if any.
+
+        Raises:
+            ExecutionError: If the image build failed
+        """
+
+        if self._image_build is None:
+            return
+        if not self._image_build.done():
+            logger.marker("Waiting for Docker image build...")  # type: ignore[attr-defined]
+        self._image_build.result()
 
     def check_and_build_image(self) -> None:
         """Check if the Docker image exists, and if not, build it from the Dockerfiles in the dockerfile directory"""
 
         logger.marker("Checking Docker image...")  # type: ignore[attr-defined]
 
-        tag = f"{self._pr_data.image_tag}:latest"
+        tag = self._image_tag
         docker_image: Image | None = None
 
         try:
             docker_image = self._client.images.get(tag)
+            logger.marker(f"Reusing cached Docker image {tag}")  # type: ignore[attr-defined]
+            if self._image_cache is not None:
+                self._image_cache.touch(tag)
+            self._pool.warm()
             return
         except ImageNotFound:
             logger.marker("Image not found. Building image...")  # type: ignore[attr-defined]
@@ -51,26 +257,139 @@ class DockerService:
             logger.marker("Docker image already exists, skipping build")  # type: ignore[attr-defined]
             return
 
-        self._build_image(tag)
+        if self._image_cache is not None:
+            # make room before the build adds another image
+            self._image_cache.evict()
+        # concurrent runs needing the same image wait for a single build
+        BuildCoordinator.build_once(tag, self._build_image_if_missing, IMAGE_BUILD_FAILURE_TTL)
+        self._pool.warm()
+
+    def build_default_branch_image(self) -> None:
+        """
+        Builds the image of a commit pushed to the default branch, so that PRs branching
+        from it find a prebuilt image. The image is built on top of the image of the
+        previous default branch commit if there is one, which only fetches the new commits
+        and recompiles the crates they touch.
+        """
 
-    def _build_image(self, tag: str) -> None:
-        """Builds the Docker image from the Dockerfiles in the dockerfile directory"""
-        dockerfile_name = self._get_docker_image()
-        dockerfile_path = Path(self._project_root, "dockerfiles", dockerfile_name)
+        tag = self._image_tag
+        default_branch_tag = default_branch_tag_for(
+            self._pr_data.repo, self._dockerfile_path, self._toolchain_tag
+        )
+        if self._image_cache is not None:
+            self._image_cache.evict()
+        BuildCoordinator.build_once(
+            tag,
+            lambda: self._build_default_branch_image_if_missing(default_branch_tag),
+            IMAGE_BUILD_FAILURE_TTL,
+        )
+        repository, _, version = default_branch_tag.rpartition(":")
+        try:
+            self._client.images.get(tag).tag(repository, version)
+        except APIError as e:
+            logger.error(f"Failed to tag {tag} as latest default branch image: {e}")
+            return
+        logger.success(f"Image {tag} is the latest default branch image")  # type: ignore[attr-defined]
+
+    def _build_default_branch_image_if_missing(self, default_branch_tag: str) -> None:
+        """
+        Builds the image of a default branch commit, incrementally if possible.
+
+        Parameters:
+            default_branch_tag (str): Tag of the image of the previous default branch commit
+        """
+
+        try:
+            self._client.images.get(self._image_tag)
+            logger.marker("Default branch image already exists, skipping build")  # type: ignore[attr-defined]
+            return
+        except ImageNotFound:
+            pass
+
+        try:
+            base_image = self._client.images.get(default_branch_tag)
+        except ImageNotFound:
+            logger.marker("No previous default branch image, building from scratch...")  # type: ignore[attr-defined]
+            self._build_image(self._image_tag)
+            return
+
+        if len(base_image.attrs.get("RootFS", {}).get("Layers", [])) > MAX_INCREMENTAL_IMAGE_LAYERS:
+            logger.marker("Previous default branch image has too many layers, building from scratch...")  # type: ignore[attr-defined]
+            self._build_image(self._image_tag)
+            return
+
+        logger.marker(f"Building incrementally on top of {default_branch_tag}...")  # type: ignore[attr-defined]
+        self._build_image(
+            self._image_tag,
+            Path(self._project_root, "dockerfiles", INCREMENTAL_DOCKERFILE),
+            {"base_image": default_branch_tag, "commit_hash": self._pr_data.base_commit},
+        )
+
+    def evict_images(self) -> None:
+        """Removes the least recently used cached images exceeding the disk budget"""
+
+        if self._image_cache is not None:
+            self._image_cache.evict()
+
+    def _build_image_if_missing(self) -> None:
+        """Builds the image unless a build finished since the image was looked up"""
+
+        try:
+            self._client.images.get(self._image_tag)
+            logger.marker("Docker image built by another run, skipping build")  # type: ignore[attr-defined]
+        except ImageNotFound:
+            self._build_image(self._image_tag)
+
+    def _build_image(
+        self,
+        tag: str,
+        dockerfile_path: Path | None = None,
+        build_args: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Builds the Docker image from the Dockerfiles in the dockerfile directory.
+
+        Parameters:
+            tag (str): Tag of the built image
+            dockerfile_path (Path, optional): Dockerfile to build instead of the repository's Dockerfile
+            build_args (dict[str, str], optional): Build arguments to use instead of the commit hash
+        """
+        dockerfile_path = dockerfile_path or self._dockerfile_path
         build_succeeded = False
         
-        # issues build local repository, PRs build from project root
-        build_path = str(self._local_repo_path) if self._local_repo_path else self._project_root.as_posix()
+        # issues build from the HEAD tree of the local repository, PR Dockerfiles copy nothing
+        # and build from the Dockerfile alone
+        if self._local_repo_path:
+            context = build_context.local_repository_context(
+                self._local_repo_path,
+                dockerfile_path,
+                self._pr_data.base_commit,
+                self._toolchain_version if self._seed_local_target else None,
+                self._image_target_triple() if self._seed_local_target else None,
+            )
+        else:
+            context = build_context.dockerfile_context(dockerfile_path)
         
         # Only pass commit_hash for PR-based Test Generation
-        build_args = {} if self._local_repo_path else {"commit_hash": self._pr_data.base_commit}
+        if build_args is None:
+            build_args = {} if self._local_repo_path else {
+                "commit_hash": self._pr_data.base_commit,
+                # the cached clone layer is reused until the epoch changes, later commits are fetched into it
+                "mirror_epoch": str(int(time.time() // MIRROR_REFRESH_SECONDS)),
+            }
+            if self._toolchain_version:
+                build_args["toolchain_image"] = ensure_toolchain_image(
+                    self._client, self._project_root, self._toolchain_version
+                )
         
         try:
             self._client.images.build(
-                path=build_path,
+                fileobj=context,
+                custom_context=True,
+                dockerfile="Dockerfile",
                 tag=tag,
-                dockerfile=dockerfile_path.as_posix(),
                 buildargs=build_args,
+                labels={CACHE_LABEL: self._pr_data.repo.lower()},
                 network_mode="host",
                 rm=True,
             )
@@ -95,7 +414,9 @@ class DockerService:
                 "Docker Type error: Check if path or fileobj is specified as args"
             )
         finally:
-            if not build_succeeded:
+            context.close()
+            # the sweep would remove the intermediate containers and images of concurrent builds
+            if not build_succeeded and BuildCoordinator.builds_in_flight() <= 1:
                 logger.marker("Cleaning up leftover containers and dangling images...")  # type: ignore[attr-defined]
                 for container in self._client.containers.list(all=True):
                     img_str: str = container.image.tags or container.image.id
@@ -120,6 +441,21 @@ class DockerService:
                 except APIError as list_err:
                     logger.error(f"Error listing dangling images: {list_err}")
 
+    def _image_target_triple(self) -> str | None:
+        """
+        Returns the target triple of the images built by the Docker daemon, which may run on
+        another machine than the local repository.
+
+        Returns:
+            str | None: The target triple, None if the daemon cannot be queried
+        """
+
+        try:
+            return build_context.image_target_triple(self._client.version()["Arch"])
+        except (APIError, KeyError) as e:
+            logger.warning(f"Could not query the Docker architecture, building image without cache seed: {e}")
+            return None
+
     def _get_docker_image(self) -> str:
         """Returns the Docker image"""
         repo = self._pr_data.repo.lower()
@@ -129,247 +465,396 @@ class DockerService:
             logger.info(f"Using local Dockerfile for {repo} (issue mode)")
             return f"Dockerfile_{repo}_local"
         
-        if repo == "grcov" and int(self._pr_data.number) < 700:
+        # commits pushed to the default branch have no PR number and use the standard Dockerfile
+        if repo == "grcov" and pr_number and int(pr_number) < 700:
             logger.info("Using old Dockerfile for grcov")  
             return "Dockerfile_grcov_old"
-        elif repo == "rust-code-analysis" and int(pr_number) <699:
+        elif repo == "rust-code-analysis" and pr_number and int(pr_number) <699:
             logger.info("Using old Dockerfile for rust-code-analysis")
             return "Dockerfile_rust-code-analysis_old"
         else:
             logger.marker(f"Using standard Dockerfile for {repo}")  # type: ignore[attr-defined]
             return f"Dockerfile_{repo}"
 
-    def run_test_in_container(
+    def open_sandboxes(self, golden_files: dict[str, str | None]) -> None:
+        """
+        Prepares the sandboxes of a run. The pre-PR sandbox is at the base commit, the
+        post-PR sandbox has the files changed by the PR overlaid. Both are started on
+        first use and kept alive until they are closed, so that cargo reuses its
+        incremental build across candidates.
+
+        Parameters:
+            golden_files (dict[str, str | None]): Contents of the files changed by the PR, None if deleted
+        """
+
+        self.close_sandboxes()
+        self._golden_files = golden_files
+
+    def close_sandboxes(self) -> None:
+        """Returns the sandboxes of the run to the container pool"""
+
+        sandboxes, self._sandboxes = list(self._sandboxes.values()), {}
+        for container in sandboxes:
+            self._stop_container(container)
+        self._golden_files = None
+
+    def run_test_in_sandbox(
         self,
-        patch: str,
+        filename: str,
+        new_file_content: str,
+        original_file_content: str,
         tests_to_run: list,
         is_golden_patch: bool,
-    ) -> TestResult:
+        output_path: Path | None = None,
+    ) -> SandboxResult:
         """
-        Creates a container, applies the patch, runs the test, and returns the result.
+        Swaps the file containing the test into the sandbox, runs the test and restores the file.
+        The run is aborted as soon as the file containing the test fails to compile.
 
         Parameters:
-            patch (str): Patch to apply
+            filename (str): Path of the file containing the test, relative to the repository
+            new_file_content (str): Content of the file including the test
+            original_file_content (str): Content of the file in the sandbox
             tests_to_run (list): List of tests to run
-            is_test_patch (bool): Flag indicating if the patch is a test patch or a golden code patch
+            is_golden_patch (bool): Whether to run in the post-PR sandbox
+            output_path (Path | None, optional): File to write the full output to
 
         Returns:
             bool: True if the test has passed, False otherwise
             str: The output from running the test
+            list[RustDiagnostic]: The compiler errors
         """
-        container: Container | None = None
-        try:
-            logger.marker("Creating container...")  # type: ignore[attr-defined]
-            container = self._client.containers.create(
-                image=self._pr_data.image_tag,
-                command="/bin/sh -c 'sleep infinity'",  # keep the container running
-                tty=True,  # allocate a TTY for interactive use
-                detach=True,
+
+        logger.marker("Tests to run: %s" % ", ".join(tests_to_run))  # type: ignore[attr-defined]
+        target = self._cargo_target(filename, is_golden_patch)
+        collector = DiagnosticCollector()
+        exec_result = self._exec_in_sandbox(
+            is_golden_patch, filename, new_file_content, original_file_content,
+            self._test_command(target, tests_to_run), output_path,
+            CompileErrorMatcher(filename), collector,
+        )
+        if target is not None and (
+            _is_scope_error(exec_result.exit_code, exec_result.output)
+            or exec_result.exit_code == 0 and not _ran_tests(exec_result.output, tests_to_run)
+        ):
+            logger.info("Scoped test run did not run the test, running it in the whole workspace")
+            collector = DiagnosticCollector()
+            exec_result = self._exec_in_sandbox(
+                is_golden_patch, filename, new_file_content, original_file_content,
+                self._test_command(None, tests_to_run), output_path,
+                CompileErrorMatcher(filename), collector,
             )
-            container.start()
-            logger.marker(f"Container {container.short_id} started")  # type: ignore[attr-defined]
+        stdout: str = exec_result.output
+        if exec_result.aborted:
+            stdout = f"error[aborted]: Test execution was aborted because {filename} does not compile.\n" + stdout
+        test_result: bool = exec_result.exit_code == 0
+        if exec_result.exit_code == 124:
+            stdout = "error[timeout]: Test execution exceeded the time limit of 300 seconds.\n" + stdout
+        stdout = "Exit Code:" + str(exec_result.exit_code) + "\n" + stdout
+        logger.info(f"[+] Test result: {test_result}")
+        return test_result, stdout, collector.diagnostics
+
+    def run_linter_in_sandbox(
+        self,
+        filename: str,
+        new_file_content: str,
+        original_file_content: str,
+        output_path: Path | None = None,
+    ) -> SandboxResult:
+        """
+        Swaps the file containing the test into the post-PR sandbox, runs the linter and restores the file.
 
-            # Create placeholder empty files for PRs that add new files
-            self._handle_newly_added_files(patch, container)
+        Parameters:
+            filename (str): Path of the file containing the test, relative to the repository
+            new_file_content (str): Content of the file including the test
+            original_file_content (str): Content of the file in the sandbox
+            output_path (Path | None, optional): File to write the full output to
 
-            # Add the patch file to the container and apply it
-            self._add_file_and_apply_patch_in_container(
-                container, patch, is_golden_patch
-            )
-            
-            # Add retrieve_line_coverage.py to the container
-            self._add_file_to_container( 
-                container,
-                Path(self._project_root, "retrieve_line_coverage.py"),
-                Path("/app", "retrieve_line_coverage.py")
+        Returns:
+            bool: True if the linter passed, False otherwise
+            str: The output from running the linter
+            list[RustDiagnostic]: The compiler errors
+        """
+
+        logger.marker("Running linter")  # type: ignore[attr-defined]
+        target = self._cargo_target(filename, True)
+        # the linter is not aborted early, all errors of the file are reported to the LLM
+        collector = DiagnosticCollector()
+        exec_result = self._exec_in_sandbox(
+            True, filename, new_file_content, original_file_content,
+            self._lint_command(target), output_path, transform=collector,
+        )
+        if target is not None and _is_scope_error(exec_result.exit_code, exec_result.output):
+            logger.info("Scoped linter run failed to select the target, checking the whole workspace")
+            collector = DiagnosticCollector()
+            exec_result = self._exec_in_sandbox(
+                True, filename, new_file_content, original_file_content,
+                self._lint_command(None), output_path, transform=collector,
             )
+        stdout: str = exec_result.output
+        lint_passed: bool = exec_result.exit_code == 0
+        stdout = "Exit Code: " + str(exec_result.exit_code) + "\n" + stdout
+        logger.info(f"[+] Linter result: {lint_passed}")
+        return lint_passed, stdout, collector.diagnostics
 
-            logger.marker("Tests to run: %s" % ", ".join(tests_to_run))  # type: ignore[attr-defined]
-            if is_golden_patch:
-                test_command: str = (
-                "/bin/sh -c 'cd /app/testbed && "
-                "timeout 300s cargo test -- --nocapture " + " ".join(tests_to_run) + "'"
-                )
-            else:
-                test_command = (
-                    "/bin/sh -c 'cd /app/testbed && "
-                    "timeout 300s cargo test -- --nocapture " + " ".join(tests_to_run) + "'"
-                )
-            exec_result = container.exec_run(test_command, stdout=True, stderr=True)
-            stdout: str = exec_result.output.decode()
-            test_result: bool = exec_result.exit_code == 0
-            if exec_result.exit_code == 124:
-                stdout = "error[timeout]: Test execution exceeded the time limit of 300 seconds.\n" + stdout
-            stdout = "Exit Code:" + str(exec_result.exit_code) + "\n" + stdout
-            logger.info(f"[+] Test result: {test_result}")
-            return test_result, stdout
+    def _cargo_target(self, filename: str, is_golden_patch: bool) -> CargoTarget | None:
+        """
+        Looks up the cargo target a file is compiled into.
+
+        Parameters:
+            filename (str): Path of the file, relative to the repository
+            is_golden_patch (bool): Whether to index the post-PR sandbox
+
+        Returns:
+            CargoTarget | None: The target, or None if cargo commands cannot be scoped
+        """
+
+        try:
+            container = self._get_sandbox(is_golden_patch)
+            target = WorkspaceIndex.for_image(
+                self._image_tag, container, self._overlay_key(is_golden_patch)
+            ).target_of(filename)
+        except RunCancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not index cargo workspace, running unscoped: {e}")
+            return None
+        if target is not None:
+            logger.info(f"Scoping cargo to {' '.join(target.cargo_args)}")
+        return target
+
+    def _overlay_key(self, is_golden_patch: bool) -> str:
+        """
+        Identifies the golden overlay of a sandbox as far as it can change the workspace layout:
+        the files added or deleted, cargo discovers targets by path, and the config files.
+
+        Parameters:
+            is_golden_patch (bool): Whether the key of the post-PR sandbox is requested
+
+        Returns:
+            str: Hash of the overlay, empty for the pre-PR sandbox
+        """
+
+        if not is_golden_patch or not self._golden_files:
+            return ""
+        overlay = sorted(
+            (path, content if _is_config_file(path) else content is not None)
+            for path, content in self._golden_files.items()
+        )
+        return hashlib.sha256(json.dumps(overlay).encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def _test_command(target: CargoTarget | None, tests_to_run: list[str]) -> str:
+        scope = " ".join(target.cargo_args) + " " if target else ""
+        return (
+            "/bin/sh -c 'cd /app/testbed && "
+            f"timeout 300s cargo test {scope}{MESSAGE_FORMAT_ARG} -- --nocapture "
+            + " ".join(tests_to_run) + "'"
+        )
+
+    @staticmethod
+    def _lint_command(target: CargoTarget | None) -> str:
+        # the test profile compiles #[cfg(test)] code, which holds the generated test
+        scope = " ".join(target.cargo_args) + " " if target else ""
+        return f"/bin/sh -c 'cd /app/testbed && cargo check {scope}--profile test {MESSAGE_FORMAT_ARG}'"
+
+    def _exec_in_sandbox(
+        self,
+        is_golden_patch: bool,
+        filename: str,
+        new_file_content: str,
+        original_file_content: str,
+        command: str,
+        output_path: Path | None = None,
+        abort_on: AbortMatcher | None = None,
+        transform: LineTransform | None = None,
+    ) -> ExecOutput:
+        """
+        Runs a command in a sandbox while the file contains the new content.
+
+        Parameters:
+            is_golden_patch (bool): Whether to run in the post-PR sandbox
+            filename (str): Path of the file to swap, relative to the repository
+            new_file_content (str): Content of the file while the command runs
+            original_file_content (str): Content of the file to restore afterwards
+            command (str): The command to run
+            output_path (Path | None, optional): File to write the full output to
+            abort_on (AbortMatcher | None, optional): Matcher aborting the command on an output line
+            transform (LineTransform | None, optional): Transform of the output lines
 
+        Returns:
+            ExecOutput: The result of the command
+        """
+
+        try:
+            container = self._get_sandbox(is_golden_patch)
+            self._put_files(container, {filename: new_file_content})
+            try:
+                exec_result = StreamingExec(
+                    container,
+                    command,
+                    BuildFlavour.PLAIN.exec_environment,
+                    output_path,
+                    abort_on,
+                    transform,
+                ).run()
+                self._raise_if_cancelled()
+            finally:
+                self._charge_container_seconds(container)
+                if not self._cancelled.is_set():
+                    self._put_files(container, {filename: original_file_content})
+            return exec_result
+
+        except RunCancelledError:
+            raise
         except ImageNotFound as e:
             logger.critical(f"Docker image not found: {e}")
             raise ExecutionError("Docker image not found")
         except APIError as e:
+            self._raise_if_cancelled()
+            self._discard_sandbox(is_golden_patch)
             logger.critical(f"Docker API error: {e}")
             raise ExecutionError("Docker API error")
+        except ExecutionError:
+            raise
         except Exception as e:
+            self._raise_if_cancelled()
+            self._discard_sandbox(is_golden_patch)
             logger.critical(f"Unexpected error: {e}")
             raise ExecutionError("Unexpected Docker error")
-        finally:
-            # Cleanup
-            if container is not None:
-                container.stop()
-                container.remove()
-                logger.info("[*] Container stopped and removed.")
-
-    def _handle_newly_added_files(self, patch: str, container: Container) -> set[str]:
-        """Finds and creates files only if their patch chunk starts with '@@ -0,0 +'."""
-        new_files: set[str] = set()
-        current_file = None
-        create_file = False
-
-        for line in patch.splitlines():
-            # Detect file changes
-            match = re.match(r"^diff --git a/(.+) b/(.+)", line)
-            if match:
-                current_file = match.group(2)  # Get file path after 'b/'
-                create_file = False  # Reset flag for each new file
-
-            # Detect start of a new file
-            if line.startswith("@@ -0,0 +"):
-                create_file = True  # Mark this file for creation
-
-            # If the file should be created, ensure it exists
-            if current_file and create_file:
-                new_files.add(current_file)
-                logger.marker(f"Creating empty file in Docker: {current_file}")  # type: ignore[attr-defined]
-
-                # Ensure parent directory exists inside the container
-                parent_dir = os.path.dirname(current_file)
-                if parent_dir:
-                    exec_result = container.exec_run(
-                        f"mkdir -p {parent_dir}", stdout=True, stderr=True
-                    )
-                    if exec_result.exit_code != 0:
-                        logger.warning(
-                            f"Error creating directory: {exec_result.stderr.decode()}" # type: ignore[attr-defined]
-                        )
-
-                # Create the empty file inside the Docker container
-                exec_result = container.exec_run(
-                    f"touch {current_file}", stdout=True, stderr=True
-                )
-                if exec_result.exit_code != 0:
-                    logger.warning(
-                        f"Error creating file: {exec_result.stderr.decode()}" # type: ignore[attr-defined]
-                    )
 
-                logger.marker(f"Created empty file in Docker: {current_file}")  # type: ignore[attr-defined]
-                create_file = False  # Reset flag after creating
+    def _get_sandbox(self, is_golden_patch: bool) -> Container:
+        """
+        Returns the sandbox of the run, starting it on first use.
 
-        return new_files
+        Parameters:
+            is_golden_patch (bool): Whether to return the post-PR sandbox
 
-    @staticmethod
-    def _add_file_and_apply_patch_in_container(
-        container: Container,
-        patch: str,
-        is_golden_patch: bool = False,
-    ) -> None:
+        Returns:
+            Container: The sandbox
         """
-        Adds file to Docker container.
 
-        Parameters:
-            container (Container): Container to add file to
-            patch (str): Patch to add to the container and apply
-            is_golden_patch (bool): Flag to indicate if the patch is a golden code patch or not
-        """
-        # Create a temporary patch file
-        with tempfile.NamedTemporaryFile(delete=False, mode="w") as patch_file:
-            patch_file.write(patch)
-            patch_file_path: str = patch_file.name
-
-        patch_fname: str = ""
-        if is_golden_patch:
-            patch_fname = "golden_code_patch.diff"
-            logger.marker("[+] Applying golden code patch")  # type: ignore[attr-defined]
-        else:
-            patch_fname: str = "test_patch.diff"
-        
-        DockerService._add_file_to_container(
-            container,
-            Path(patch_file_path),
-            Path("/app/testbed", patch_fname), # I think
+        container = self._sandboxes.get(is_golden_patch)
+        if container is not None:
+            return container
+
+        logger.marker(  # type: ignore[attr-defined]
+            f"Creating {'post-PR' if is_golden_patch else 'pre-PR'} sandbox..."
         )
+        container = self._start_container()
+        try:
+            if is_golden_patch:
+                if self._golden_files is None:
+                    raise DataMissingError(
+                        "golden_files", "None", "Sandboxes have not been opened"
+                    )
+                self._overlay_golden_files(container, self._golden_files)
+        except Exception:
+            self._stop_container(container)
+            raise
+        self._sandboxes[is_golden_patch] = container
+        return container
 
-        DockerService._apply_patch_in_container(container, patch_fname)
+    def _discard_sandbox(self, is_golden_patch: bool) -> None:
+        """Drops a sandbox in an unknown state, it is recreated on next use"""
 
-    @staticmethod
-    def _apply_patch_in_container(container: Container, patch_fname: str) -> None:
+        container = self._sandboxes.pop(is_golden_patch, None)
+        if container is not None:
+            self._stop_container(container)
+
+    def _overlay_golden_files(self, container: Container, files: dict[str, str | None]) -> None:
         """
-        Applies a patch file inside the Docker container.
+        Overlays the files changed by the PR. If the PR changes a manifest, the crates it adds
+        or bumps are fetched with network access, containers otherwise resolve crates offline.
+        The container is removed instead of returned to the pool afterwards, since its crate
+        registry and Cargo.lock no longer match the image.
 
         Parameters:
-            container (Container): Container to apply the patch in
-            patch_fname (str): Name of the patch file inside the container
+            container (Container): Container to write the files to
+            files (dict[str, str | None]): Contents by path relative to the repository, None deletes the file
+
+        Raises:
+            ExecutionError: If the crates of the changed manifests cannot be fetched
         """
-        logger.marker("[+] Applying patch")  # type: ignore[attr-defined]
-        apply_patch_cmd = f"/bin/sh -c 'cd /app/testbed && git apply {patch_fname}'"
 
-        exec_result = container.exec_run(apply_patch_cmd)
+        self._put_files(container, files)
+        manifests = [path for path in files if _is_config_file(path)]
+        if not manifests:
+            return
 
+        with self._containers_lock:
+            self._dirty_containers.add(container)
+        logger.marker(f"Fetching crates of changed {', '.join(manifests)}...")  # type: ignore[attr-defined]
+        exec_result = container.exec_run(
+            FETCH_COMMAND, stdout=True, stderr=True, environment={"CARGO_NET_OFFLINE": "false"}
+        )
         if exec_result.exit_code != 0:
-            logger.warning(f"[!] Failed to apply patch: {exec_result.output.decode()}")
-            raise ExecutionError()
-
-        logger.info("[+] Patch applied successfully.")
+            output = exec_result.output.decode(errors="replace").strip()
+            logger.critical(f"cargo fetch failed for the manifests changed by the PR:\n{output}")
+            raise ExecutionError("Could not fetch the crates of the manifests changed by the PR")
 
     @staticmethod
-    def _add_file_to_container(container: Container, file_path: Path, dest_path: Path):
+    def _put_files(
+        container: Container, files: dict[str, str | None], root: str = "/app/testbed"
+    ) -> None:
         """
-        Adds a file to the Docker container.
+        Overlays files inside the Docker container. All written files are uploaded as one
+        archive, missing parent directories are created on extraction.
 
         Parameters:
-            container (Container): Container to add the file to
-            file_path (Path): Path of the file to add
-            dest_path (Path): Destination path inside the container
-        """
-        # Create a tar archive
-        tar_stream = io.BytesIO()
-        with tarfile.open(fileobj=tar_stream, mode="w") as tar:
-            tar.add(file_path.as_posix(), arcname=dest_path.name)
-        tar_stream.seek(0)
-        try:
-            # Copy the tar archive to the container
-            container.put_archive(dest_path.parent.as_posix(), tar_stream.read())
-            logger.marker(f"File {file_path} added to container successfully")  # type: ignore[attr-defined]
-        except APIError as e:
-            logger.critical(f"Docker API error: {e}")
-            raise ExecutionError("Docker API error")
+            container (Container): Container to write the files to
+            files (dict[str, str | None]): Contents by path relative to the root, None deletes the file
+            root (str, optional): Directory inside the container the paths are relative to
+        """
+
+        # cargo detects changed sources by mtime, round up so that the files are newer than any earlier build
+        mtime = int(time.time()) + 1
+        written = {path: content for path, content in files.items() if content is not None}
+        if written:
+            tar_stream = io.BytesIO()
+            with tarfile.open(fileobj=tar_stream, mode="w") as tar:
+                for path, content in written.items():
+                    data = content.encode("utf-8")
+                    tar_info = tarfile.TarInfo(name=path)
+                    tar_info.size = len(data)
+                    tar_info.mode = 0o644
+                    tar_info.mtime = mtime
+                    tar.addfile(tar_info, io.BytesIO(data))
+            if not container.put_archive(root, tar_stream.getvalue()):
+                raise ExecutionError(f"Could not write {', '.join(written)} to container")
+
+        deleted = [path for path, content in files.items() if content is None]
+        if deleted:
+            exec_result = container.exec_run(
+                ["rm", "-f", "--", *deleted], workdir=root, stdout=True, stderr=True
+            )
+            if exec_result.exit_code != 0:
+                raise ExecutionError(f"Could not delete {', '.join(deleted)} in container")
 
-    def run_coverage_in_container(self, filename: str, patch: str) -> tuple[float | None, float | None]:
+    def _raise_if_cancelled(self) -> None:
+        """Raises if the service has been cancelled while a stage was running"""
+
+        if self._cancelled.is_set():
+            raise RunCancelledError()
+
+    def run_coverage_in_container(
+        self, filename: str, files: dict[str, str | None]
+    ) -> tuple[float | None, float | None]:
         container: Container | None = None
         try:
             logger.marker("Creating container...")  # type: ignore[attr-defined]
-            container = self._client.containers.create(
-                image=self._pr_data.image_tag,
-                command="/bin/sh -c 'sleep infinity'",  # keep the container running
-                tty=True,  # allocate a TTY for interactive use
-                detach=True,
-            )
-            container.start()
-            logger.marker(f"Container {container.short_id} started")  # type: ignore[attr-defined]
+            container = self._start_container()
 
-            # Create placeholder empty files for PRs that add new files
-            self._handle_newly_added_files(patch, container)
-
-            # Add the patch file to the container and apply it
-            self._add_file_and_apply_patch_in_container(
-                container, patch, True
-            )
-            
-            # Add retrieve_line_coverage.py to the container
-            self._add_file_to_container(
+            # Overlay the files of the PR and add retrieve_line_coverage.py to the container
+            self._overlay_golden_files(container, files)
+            self._put_files(
                 container,
-                Path(self._project_root, "retrieve_line_coverage.py"),
-                Path("/app", "retrieve_line_coverage.py")
+                {
+                    "retrieve_line_coverage.py": Path(
+                        self._project_root, "retrieve_line_coverage.py"
+                    ).read_text(encoding="utf-8")
+                },
+                "/app",
             )
             
             file_path_prefix = "/".join(filename.split("/")[: -1])
@@ -380,7 +865,12 @@ class DockerService:
             f"/bin/sh -c 'cd {path_to_file} && "
             "timeout 300s cargo llvm-cov test --json --output-path /app/testbed/coverage.json --ignore-run-fail --lib --bins '" 
             )
-            exec_result = container.exec_run(coverage_generation_command, stdout=True, stderr=True)
+            exec_result = container.exec_run(
+                coverage_generation_command,
+                stdout=True,
+                stderr=True,
+                environment=BuildFlavour.INSTRUMENTED.exec_environment,
+            )
             
             logger.marker("Retrieving line coverage...")  # type: ignore[attr-defined]
             file_coverage_retrieval_command: str = (
@@ -395,6 +885,7 @@ class DockerService:
                 f"python3 /app/retrieve_line_coverage.py'"
             )
             exec_result = container.exec_run(coverage_retrieval_command, stdout=True, stderr=True)
+            self._raise_if_cancelled()
             stdout_coverage = exec_result.output.decode()
             try:
                 stdout_file_coverage = float(stdout_file_coverage.strip())
@@ -408,78 +899,35 @@ class DockerService:
                         
             return stdout_file_coverage, stdout_coverage
 
+        except RunCancelledError:
+            raise
         except ImageNotFound as e:
             logger.critical(f"Docker image not found: {e}")
             raise ExecutionError("Docker image not found")
         except APIError as e:
+            self._raise_if_cancelled()
             logger.critical(f"Docker API error: {e}")
             raise ExecutionError("Docker API error")
         except Exception as e:
+            self._raise_if_cancelled()
             logger.critical(f"Unexpected error: {e}")
             raise ExecutionError("Unexpected Docker error")
         finally:
             # Cleanup
-            # os.remove(patch_file_path)
             if container is not None:
-                container.stop()
-                container.remove()
-                logger.info("[*] Container stopped and removed.")
-                
-    def run_linter(self, patch: str) -> TestResult:
-        """
-        Runs the linter inside a Docker container.
+                self._stop_container(container)
 
-        Parameters:
-            llm_response (LLMResponse): The LLM response containing the filename and imports
-            new_file_content (str): The content of the new file to be linted
 
-        Returns:
-            bool: True if the linter passed, False otherwise
-            str: The output from running the linter
-        """
-        container: Container | None = None
-        try:
-            logger.marker("Creating container for linter...")  # type: ignore[attr-defined]
-            container = self._client.containers.create(
-                image=self._pr_data.image_tag,
-                command="/bin/sh -c 'sleep infinity'",  # keep the container running
-                tty=True,  # allocate a TTY for interactive use
-                detach=True,
-            )
-            container.start()
-            logger.marker(f"Container {container.short_id} started")  # type: ignore[attr-defined]
+def _is_config_file(path: str) -> bool:
+    return any(path.endswith(cfg_name) for cfg_name in CONFIG_FILE_NAMES)
 
-            # Create placeholder empty files for PRs that add new files
-            self._handle_newly_added_files(patch, container)
 
-            # Add the new file content to the container
-            self._add_file_and_apply_patch_in_container(container, patch, True)
+def _is_scope_error(exit_code: int, output: str) -> bool:
+    return exit_code != 0 and any(error in output for error in _SCOPE_ERRORS)
 
-            logger.marker(f"Running linter")  # type: ignore[attr-defined]
-            lint_command: str = (
-                f"/bin/sh -c 'cd /app/testbed && "
-                f"cargo check'"
-            )
-            exec_result = container.exec_run(lint_command, stdout=True, stderr=True)
-            stdout: str = exec_result.output.decode()
-            lint_passed: bool = exec_result.exit_code == 0
-            stdout = "Exit Code: " + str(exec_result.exit_code) + "\n" + stdout
-            logger.info(f"[+] Linter result: {lint_passed}")
-            return lint_passed, stdout
 
-        except ImageNotFound as e:
-            logger.critical(f"Docker image not found: {e}")
-            raise ExecutionError("Docker image not found")
-        except APIError as e:
-            logger.critical(f"Docker API error: {e}")
-            raise ExecutionError("Docker API error")
-        except Exception as e:
-            logger.critical(f"Unexpected error: {e}")
-            raise ExecutionError("Unexpected")
-        
-        finally:
-            # Cleanup
-            if container is not None:
-                container.stop()
-                container.remove()
-                logger.info("[*] Container stopped and removed.")
\ No newline at end of file
+def _ran_tests(output: str, tests_to_run: list[str]) -> bool:
+    return all(
+        re.search(rf"^test \S*{re.escape(test)}\S* \.\.\. ", output, re.MULTILINE)
+        for test in tests_to_run
+    )
@@ -0,0 +1,166 @@
+import hashlib
+import logging
+from pathlib import Path
+
+from docker import DockerClient
+from docker.errors import APIError, ImageNotFound
+
+from webhook_handler.services.container_pool import ContainerPool
+from webhook_handler.services.workspace_index import WorkspaceIndex
+
+logger = logging.getLogger(__name__)
+
+# Label of all images built by the bot, used to find the images to evict
+CACHE_LABEL = "testgen.image-cache"
+
+# Dockerfile advancing a default branch image to a later commit
+INCREMENTAL_DOCKERFILE = "Dockerfile_incremental"
+
+
+def image_tag_for(
+    repo: str, dockerfile_path: Path, base_commit: str, toolchain_tag: str = ""
+) -> str:
+    """
+    Returns the content-addressed tag of an image, shared by all runs building the
+    same Dockerfile at the same commit.
+
+    Parameters:
+        repo (str): Name of the repository
+        dockerfile_path (Path): Path of the Dockerfile
+        base_commit (str): The commit the image is built at
+        toolchain_tag (str, optional): Tag of the toolchain image the Dockerfile builds from
+
+    Returns:
+        str: The image tag
+    """
+
+    dockerfile_hash = _dockerfile_hash(dockerfile_path, toolchain_tag)
+    return f"testgen-{repo.lower()}:{base_commit[:12]}-{dockerfile_hash}"
+
+
+def default_branch_tag_for(repo: str, dockerfile_path: Path, toolchain_tag: str = "") -> str:
+    """
+    Returns the tag pointing to the image of the latest default branch commit, later
+    default branch images are built on top of it.
+
+    Parameters:
+        repo (str): Name of the repository
+        dockerfile_path (Path): Path of the Dockerfile
+        toolchain_tag (str, optional): Tag of the toolchain image the Dockerfile builds from
+
+    Returns:
+        str: The image tag
+    """
+
+    dockerfile_hash = _dockerfile_hash(dockerfile_path, toolchain_tag)
+    return f"testgen-{repo.lower()}:default-branch-{dockerfile_hash}"
+
+
+def _dockerfile_hash(dockerfile_path: Path, toolchain_tag: str) -> str:
+    content = dockerfile_path.read_bytes() + toolchain_tag.encode()
+    # default branch images, and the PR images reusing them, may be built incrementally
+    incremental_path = dockerfile_path.with_name(INCREMENTAL_DOCKERFILE)
+    if incremental_path.is_file():
+        content += incremental_path.read_bytes()
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+class ImageCache:
+    """
+    Keeps built images for reuse across runs and evicts the least recently used
+    ones once their total size exceeds the disk budget. Docker records the last
+    time an image was tagged, so re-tagging an image marks it as used. Images with
+    several tags, such as the latest default branch image, cannot be removed.
+    """
+
+    def __init__(self, client: DockerClient, max_bytes: int) -> None:
+        self._client = client
+        self._max_bytes = max_bytes
+
+    def touch(self, tag: str) -> None:
+        """
+        Marks an image as recently used.
+
+        Parameters:
+            tag (str): The image tag
+        """
+
+        repository, _, version = tag.rpartition(":")
+        try:
+            self._client.images.get(tag).tag(repository, version)
+        except (ImageNotFound, APIError) as e:
+            logger.warning(f"Could not mark image {tag} as used: {e}")
+
+    def evict(self, keep: set[str] | None = None) -> None:
+        """
+        Removes the least recently used images until the cache fits the disk budget,
+        together with their pooled containers. Images in use by a run and base images
+        of other cached images are skipped.
+
+        Parameters:
+            keep (set[str], optional): Tags which must not be evicted
+        """
+
+        keep = keep or set()
+        try:
+            images = self._client.images.list(filters={"label": CACHE_LABEL})
+            disk_usage = {entry["Id"]: entry for entry in self._client.df().get("Images") or []}
+        except APIError as e:
+            logger.error(f"Could not list cached images: {e}")
+            return
+
+        # layers shared with other images (toolchain, clone, incremental bases) only free disk
+        # once their last image is gone, they are counted once and never subtracted
+        unique_bytes = {image.id: _unique_size(disk_usage.get(image.id, {})) for image in images}
+        shared_bytes = max(
+            (max(disk_usage.get(image.id, {}).get("SharedSize", 0), 0) for image in images), default=0
+        )
+        total_bytes = sum(unique_bytes.values()) + shared_bytes
+        layers = [tuple(image.attrs.get("RootFS", {}).get("Layers", [])) for image in images]
+
+        by_last_use = sorted(
+            images, key=lambda image: image.attrs.get("Metadata", {}).get("LastTagTime", "")
+        )
+        for image in by_last_use:
+            if total_bytes <= self._max_bytes:
+                return
+            if keep.intersection(image.tags):
+                continue
+            if any(ContainerPool.has_leased(tag) for tag in image.tags):
+                continue
+            image_layers = tuple(image.attrs.get("RootFS", {}).get("Layers", []))
+            if any(
+                len(other) > len(image_layers) and other[: len(image_layers)] == image_layers
+                for other in layers
+            ):
+                continue  # incremental images are built on top of it
+
+            # idle pooled containers would keep the image in use
+            for tag in image.tags:
+                ContainerPool.drain_idle(tag)
+            try:
+                self._client.images.remove(image=image.id)
+            except APIError as e:
+                logger.info(f"Skipping eviction of image {image.tags or image.short_id}: {e}")
+                continue
+            for tag in image.tags:
+                ContainerPool.drain_image(tag)
+                WorkspaceIndex.forget_image(tag)
+            layers.remove(image_layers)
+            total_bytes -= unique_bytes[image.id]
+            logger.info(f"Evicted image {image.tags or image.short_id} from image cache")
+
+
+def _unique_size(disk_usage: dict) -> int:
+    """
+    Returns the bytes only an image holds, as reported by `docker system df`.
+
+    Parameters:
+        disk_usage (dict): The image's entry of the disk usage report
+
+    Returns:
+        int: Size of the layers not shared with other images
+    """
+
+    # SharedSize is -1 if the daemon did not compute it
+    return disk_usage.get("Size", 0) - max(disk_usage.get("SharedSize", 0), 0)
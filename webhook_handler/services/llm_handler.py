@@ -5,7 +5,7 @@ from groq import Groq
 from openai import OpenAI
 
 from webhook_handler.helper import templates
-from webhook_handler.models import LLM, PipelineInputs, PromptType
+from webhook_handler.models import LLM, PipelineInputs, PromptType, RunBudget
 from webhook_handler.services.config import Config
 
 logger = logging.getLogger(__name__)
@@ -16,8 +16,9 @@ class LLMHandler:
     Used to interact with LLMs.
     """
 
-    def __init__(self, config: Config, data: PipelineInputs) -> None:
+    def __init__(self, config: Config, data: PipelineInputs, budget: RunBudget | None = None) -> None:
         self._pipeline_inputs = data
+        self._budget = budget
         self._pr_data = data.pr_data
         self._pr_diff_ctx = data.pr_diff_ctx
         self._openai_client = OpenAI(api_key=config.openai_key)
@@ -80,6 +81,7 @@ class LLMHandler:
                     messages=[{"role": "user", "content": prompt}],
                     temperature=temperature,
                 )
+                self._record_usage(response)
                 result = response.choices[0].message.content
                 assert isinstance(result, str), "Expected response to be a string"
                 return result.strip()
@@ -88,6 +90,7 @@ class LLMHandler:
                     model=model,
                     messages=[{"role": "user", "content": prompt}],
                 )
+                self._record_usage(response)
                 result = response.choices[0].message.content
                 assert isinstance(result, str), "Expected response to be a string"
                 return result.strip()
@@ -98,6 +101,7 @@ class LLMHandler:
                     max_tokens=700,
                     temperature=temperature,
                 )
+                self._record_usage(completion)
                 result = completion.choices[0].message.content
                 assert isinstance(result, str), "Expected response to be a string"
                 return result.strip()
@@ -112,6 +116,7 @@ class LLMHandler:
                         {"role": "user", "content": prompt},
                     ],
                 )
+                self._record_usage(response)
                 result = response.choices[0].message.content
                 assert isinstance(result, str), "Expected response to be a string"
                 return result.strip()
@@ -120,6 +125,18 @@ class LLMHandler:
         except:
             return ""
 
+    def _record_usage(self, response) -> None:
+        """
+        Charges the tokens used by a completion to the run budget.
+
+        Parameters:
+            response: Chat completion returned by the OpenAI or Groq client
+        """
+
+        usage = getattr(response, "usage", None)
+        if self._budget is not None and usage is not None:
+            self._budget.add_tokens(usage.total_tokens)
+
     def postprocess_response(self, response: str) -> tuple[str, list[str], str] | None:
         """
         Postprocess the response from the LLM.
@@ -0,0 +1,79 @@
+import logging
+import threading
+
+from webhook_handler.models import LLM
+from webhook_handler.services.docker_service import DockerService
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRace:
+    """
+    Coordinates the pipelines of several models running for the same PR. The first
+    model with a fail-to-pass test wins, the pipelines of all other models are cancelled.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._winner: LLM | None = None
+        self._docker_services: dict[LLM, DockerService] = {}
+
+    @property
+    def winner(self) -> LLM | None:
+        return self._winner
+
+    def register(self, model: LLM, docker_service: DockerService) -> None:
+        """
+        Registers the Docker service of a model, so that its containers can be killed once it lost.
+
+        Parameters:
+            model (LLM): The racing model
+            docker_service (DockerService): The Docker service used by the model's pipeline
+        """
+
+        with self._lock:
+            self._docker_services[model] = docker_service
+            lost = self._winner is not None and self._winner != model
+        if lost:
+            docker_service.cancel()
+
+    def try_win(self, model: LLM) -> bool:
+        """
+        Claims the win for a model and cancels all other models.
+
+        Parameters:
+            model (LLM): The model which generated a fail-to-pass test
+
+        Returns:
+            bool: True if the model won the race, False if another model was faster
+        """
+
+        with self._lock:
+            if self._winner is not None:
+                return self._winner == model
+            self._winner = model
+            losers = [
+                (loser, service)
+                for loser, service in self._docker_services.items()
+                if loser != model
+            ]
+
+        logger.success(f"Model {model} won the race, cancelling other models")  # type: ignore[attr-defined]
+        for loser, service in losers:
+            logger.info(f"Cancelling pipeline of model {loser}")
+            service.cancel()
+        return True
+
+    def has_lost(self, model: LLM) -> bool:
+        """
+        Checks whether another model already won the race.
+
+        Parameters:
+            model (LLM): The racing model
+
+        Returns:
+            bool: True if another model won, False otherwise
+        """
+
+        winner = self._winner
+        return winner is not None and winner != model
@@ -1,6 +1,6 @@
 import logging
+from pathlib import Path
 
-from webhook_handler.helper import git_diff
 from webhook_handler.models import PullRequestFileDiff
 from webhook_handler.services.gh_service import GitHubService
 from webhook_handler.services.local_diff_service import LocalDiffService
@@ -23,7 +23,9 @@ class PullRequestDiffContext:
             after = gh_service.fetch_file_version(head_commit, file_name)
             if before != after:
                 self._pr_file_diffs.append(
-                    PullRequestFileDiff(file_name, before, after)
+                    PullRequestFileDiff(
+                        file_name, before, after, removed=raw_file.get("status") == "removed"
+                    )
                 )
 
     @property
@@ -102,26 +104,34 @@ class PullRequestDiffContext:
             modified_functions.extend(pr_file_diff.get_modified_functions(patch))
         return patch, modified_functions
 
-    def get_updated_golden_code_patch(self, filename: str, content: str) -> str:
+    @property
+    def golden_files(self) -> dict[str, str | None]:
+        """
+        Returns the contents of the source code and config files after the PR.
+
+        Returns:
+            dict[str, str | None]: Content by file name, None if the PR deletes the file
+        """
+        return {
+            pr_file_diff.name: None if pr_file_diff.removed else pr_file_diff.after
+            for pr_file_diff in self.source_code_file_diffs + self.config_file_diffs
+        }
+
+    def get_updated_golden_files(self, filename: str, content: str) -> dict[str, str | None]:
         """
-        Returns the golden code patch for all files except the passed one.
+        Returns the contents of the source code and config files after the PR.
         It uses the provided content for the passed file instead of the original "after" content.
 
+        Parameters:
+            filename (str): The name of the file to replace
+            content (str): The content to use for the file
+
         Returns:
-            str: Updated diff between before and after code files
+            dict[str, str | None]: Content by file name, None if the PR deletes the file
         """
-        patch: list[str] = []
-        for pr_file_diff in self.source_code_file_diffs + self.config_file_diffs:
-            if filename == pr_file_diff.name:
-                diff = git_diff.unified_diff_with_function_context(
-                    pr_file_diff.before,
-                    content,
-                    pr_file_diff.name,
-                )
-            else:
-                diff = pr_file_diff.unified_code_diff()
-            patch.append(diff)
-        return "\n\n".join(patch) + "\n\n"
+        files = self.golden_files
+        files[filename] = content
+        return files
 
     def get_specific_file_diff(self, filename: str) -> PullRequestFileDiff | None:
         """
@@ -172,7 +182,12 @@ class PullRequestDiffContext:
                 # Only add if there's an actual difference
                 if before != after:
                     instance._pr_file_diffs.append(
-                        PullRequestFileDiff(filepath, before, after)
+                        PullRequestFileDiff(
+                            filepath,
+                            before,
+                            after,
+                            removed=not Path(local_service.repo_path, filepath).exists(),
+                        )
                     )
                     logger.debug(f"Added file diff for: {filepath}")
             except Exception as e:
@@ -0,0 +1,198 @@
+import codecs
+import contextlib
+import logging
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, ContextManager, TextIO
+
+from docker import APIClient
+from docker.models.containers import Container
+
+from webhook_handler.constants import EXEC_OUTPUT_TAIL_LINES
+from webhook_handler.models import ExecOutput
+
+logger = logging.getLogger(__name__)
+
+# Called with every line of output, returns True to abort the command
+type AbortMatcher = Callable[[str], bool]
+
+# Called with every line of output, returns the lines to keep in its place
+type LineTransform = Callable[[str], list[str]]
+
+# Kills the process tree of a streamed command. The pid file holds the pid of the
+# wrapping shell, the tree is collected before killing so that no orphan escapes.
+_KILL_TREE = """
+import os, signal, sys
+try:
+    root = int(open(sys.argv[1]).read())
+except (OSError, ValueError):
+    sys.exit(0)
+children = {}
+for entry in os.listdir("/proc"):
+    if not entry.isdigit():
+        continue
+    try:
+        with open("/proc/%s/stat" % entry) as stat:
+            ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        continue
+    children.setdefault(ppid, []).append(int(entry))
+tree, pending = [], [root]
+while pending:
+    pid = pending.pop()
+    tree.append(pid)
+    pending.extend(children.get(pid, []))
+for pid in tree:
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except OSError:
+        pass
+os.remove(sys.argv[1])
+"""
+
+# Seconds to wait for the exit code of a command once its output stream ended
+_EXIT_GRACE_SECONDS = 5
+
+
+class CompileErrorMatcher:
+    """
+    Abort matcher which fires on the first rustc error located in a given file, e.g.
+    a type error in the generated test. Compiling the rest of the workspace is wasted
+    once the file under test is known not to compile.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self._filename = filename
+        self._in_error = False
+
+    def __call__(self, line: str) -> bool:
+        stripped = line.strip()
+        if stripped.startswith("error"):
+            self._in_error = "could not compile" not in stripped
+        elif stripped.startswith("warning"):
+            self._in_error = False
+        elif self._in_error and stripped.startswith("-->"):
+            path = stripped[3:].strip().split(":", 1)[0]
+            return path == self._filename or path.endswith("/" + self._filename)
+        return False
+
+
+class StreamingExec:
+    """
+    Runs a command in a container and streams its output instead of buffering it.
+    The output is teed to a file and only its tail is kept in memory. An abort
+    matcher sees every line and can kill the command before it exits. A line transform
+    can rewrite the output before it is stored, e.g. to parse machine readable output.
+    """
+
+    def __init__(
+        self,
+        container: Container,
+        command: str,
+        environment: dict[str, str] | None = None,
+        output_path: Path | None = None,
+        abort_on: AbortMatcher | None = None,
+        transform: LineTransform | None = None,
+        tail_lines: int = EXEC_OUTPUT_TAIL_LINES,
+    ) -> None:
+        self._container = container
+        self._command = command
+        self._environment = environment
+        self._output_path = output_path
+        self._abort_on = abort_on
+        self._transform = transform
+        self._tail: deque[str] = deque(maxlen=tail_lines)
+        self._pid_file = f"/tmp/testgen-exec-{uuid.uuid4().hex}.pid"
+
+    def run(self) -> ExecOutput:
+        """
+        Runs the command until it exits or is aborted.
+
+        Returns:
+            ExecOutput: The exit code, the tail of the output and whether the command was aborted
+        """
+
+        api = self._container.client.api
+        exec_id = api.exec_create(
+            self._container.id,
+            [
+                "/bin/sh", "-c",
+                f"echo $$ > {self._pid_file}; {self._command}; "
+                f"status=$?; rm -f {self._pid_file}; exit $status",
+            ],
+            stdout=True,
+            stderr=True,
+            environment=self._environment,
+        )["Id"]
+
+        aborted = False
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        with self._open_output() as output_file:
+            # after an abort the stream is drained, it ends once the killed command's output is flushed
+            for chunk in api.exec_start(exec_id, stream=True):
+                lines = (pending + decoder.decode(chunk)).split("\n")
+                pending = lines.pop()
+                if self._consume(lines, output_file, aborted):
+                    aborted = True
+                    self._kill()
+            pending += decoder.decode(b"", final=True)
+            if pending:
+                self._consume([pending], output_file, aborted)
+
+            exit_code = self._exit_code(api, exec_id)
+            if output_file is not None:
+                output_file.write(f"\nExit Code: {exit_code}\n")
+        return ExecOutput(exit_code, "\n".join(self._tail), aborted)
+
+    def _consume(self, lines: list[str], output_file: TextIO | None, aborted: bool) -> bool:
+        """
+        Transforms complete lines, writes them to the output file, adds them to the tail
+        and passes them to the abort matcher.
+
+        Parameters:
+            lines (list[str]): The lines to add
+            output_file (TextIO | None): The file to write the lines to
+            aborted (bool): Whether the command has already been aborted
+
+        Returns:
+            bool: True if the matcher requested to abort the command
+        """
+
+        if self._transform is not None:
+            lines = [transformed for line in lines for transformed in self._transform(line)]
+        abort = False
+        for line in lines:
+            if output_file is not None:
+                output_file.write(line + "\n")
+            self._tail.append(line)
+            if not aborted and not abort and self._abort_on is not None and self._abort_on(line):
+                logger.info(f"Aborting command early on: {line.strip()}")
+                abort = True
+        return abort
+
+    def _kill(self) -> None:
+        """Kills the command and all processes it started"""
+
+        exec_result = self._container.exec_run(["python3", "-c", _KILL_TREE, self._pid_file])
+        if exec_result.exit_code != 0:
+            logger.warning(f"Could not abort command: {exec_result.output.decode()}")
+
+    @staticmethod
+    def _exit_code(api: APIClient, exec_id: str) -> int:
+        deadline = time.monotonic() + _EXIT_GRACE_SECONDS
+        while True:
+            state = api.exec_inspect(exec_id)
+            if not state["Running"] and state["ExitCode"] is not None:
+                return state["ExitCode"]
+            if time.monotonic() > deadline:
+                # the exit code was never recorded, report the command as killed
+                return 137
+            time.sleep(0.1)
+
+    def _open_output(self) -> ContextManager[TextIO | None]:
+        if self._output_path is None:
+            return contextlib.nullcontext()
+        return self._output_path.open("w", encoding="utf-8")
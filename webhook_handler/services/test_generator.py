@@ -1,19 +1,36 @@
 import logging
 import re
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable
 
-from webhook_handler.helper import general, git_diff, templates
+from webhook_handler.constants import SPECULATIVE_TEMPERATURE
+from webhook_handler.helper import compiler_messages, general, templates
 from webhook_handler.helper.custom_errors import *
 from webhook_handler.models import (LLM, GitHubEvent, LLMResponse,
-                                    PipelineInputs, PromptType, TestCoverage)
+                                    PipelineInputs, PipelineStage, PromptType,
+                                    RunBudget, TestCoverage,
+                                    VerificationOutcome)
 from webhook_handler.services import Config
 from webhook_handler.services.cst_builder import CSTBuilder
-from webhook_handler.services.docker_service import DockerService
+from webhook_handler.services.docker_service import (DockerService,
+                                                     SandboxResult)
 from webhook_handler.services.gh_service import GitHubService
 from webhook_handler.services.llm_handler import LLMHandler
+from webhook_handler.services.model_race import ModelRace
 
 logger = logging.getLogger(__name__)
 
+type Feedback = tuple[PromptType, str, str]  # (prompt_type, previous_test, failure_reason)
+
+# Prompt of the next LLM call for each way a candidate test can fail
+DEFAULT_TRANSITIONS: dict[VerificationOutcome, PromptType] = {
+    VerificationOutcome.LINT_FAILED: PromptType.LINTING_ISSUE,
+    VerificationOutcome.PASSED_BEFORE: PromptType.PASS_TO_PASS,
+    VerificationOutcome.ASSERTION_FAILED: PromptType.ASSERTION_ERROR,
+    VerificationOutcome.COMPILATION_FAILED: PromptType.COMPILATION_ERROR,
+}
+
 
 class TestGenerator:
     """
@@ -31,7 +48,12 @@ class TestGenerator:
         llm_handler: LLMHandler,
         i_attempt: int,
         model: LLM,
-        gh_event: GitHubEvent
+        gh_event: GitHubEvent,
+        on_stage: Callable[..., None] | None = None,
+        output_dir: Path | None = None,
+        race: ModelRace | None = None,
+        budget: RunBudget | None = None,
+        transitions: dict[VerificationOutcome, PromptType] | None = None,
     ):
         self._config = config
         self._pipeline_inputs = data
@@ -45,6 +67,11 @@ class TestGenerator:
         self._i_attempt = i_attempt
         self._model = model
         self._gh_event = gh_event
+        self._on_stage = on_stage
+        self._output_dir = output_dir or config.output_dir
+        self._race = race
+        self._budget = budget
+        self._transitions = {**DEFAULT_TRANSITIONS, **(transitions or {})}
         self._generation_dir: Path | None = None
 
     def generate(self) -> tuple[bool, Path | None]:
@@ -52,15 +79,44 @@ class TestGenerator:
         logger.marker("=============== Test Generation Started ==============")  # type: ignore[attr-defined]
         logger.marker("Attempt %d with model %s" % (self._i_attempt + 1, self._model))  # type: ignore[attr-defined]
 
-        curr_llm_attempt = 1
-        fail_2_pass, llm_response = self.run_workflow(curr_llm_attempt)
+        exhausted = self._budget.exhausted_by() if self._budget is not None else None
+        if exhausted is not None:
+            logger.critical(f"Reached {exhausted} before the first LLM call, skipping...")
+            logger.marker("=============== Test Generation Finished =============")  # type: ignore[attr-defined]
+            return False, None
+
+        self._docker_service.open_sandboxes(self._pr_diff_ctx.golden_files)
+        try:
+            if self._config.pipelined_generation:
+                fail_2_pass, llm_response = self.run_pipelined_workflow()
+            else:
+                fail_2_pass, llm_response = self.run_workflow(1)
+        finally:
+            self._docker_service.close_sandboxes()
 
         if fail_2_pass:
             logger.success("Fail-to-Pass test generated")  # type: ignore[attr-defined]
-            logger.marker("Running code coverage to verify usability of generated test")  # type: ignore[attr-defined]
-            coverage_passed, test_coverage = (
-                self._determine_test_usability(llm_response)
-            )
+            if self._race is not None and not self._race.try_win(self._model):
+                raise RunCancelledError(f"Model {self._race.winner} won the race")
+            if self._docker_service.supports_coverage:
+                logger.marker("Running code coverage to verify usability of generated test")  # type: ignore[attr-defined]
+                self._report_stage(PipelineStage.COVERAGE)
+                coverage_passed, test_coverage = (
+                    self._determine_test_usability(llm_response)
+                )
+            else:
+                # the test is kept, but it cannot be shown to improve coverage
+                message = (
+                    f"Coverage unsupported by the Rust {self._docker_service.toolchain_version} "
+                    "toolchain, test kept without coverage"
+                )
+                logger.warning(message)
+                self._report_stage(PipelineStage.COVERAGE, message=message)
+                assert self._generation_dir is not None
+                (self._generation_dir / "coverage_unsupported.txt").write_text(
+                    message, encoding="utf-8"
+                )
+                coverage_passed, test_coverage = False, None
             if coverage_passed:
                 logger.marker("[*] Handling commenting on PR")  # type: ignore[attr-defined]
                 filename, imports = llm_response.filename, llm_response.imports
@@ -84,12 +140,182 @@ class TestGenerator:
         failure_reason: str = "",
     ) -> tuple[bool, LLMResponse]:
         """
-        Runs the pipeline to generate a fail-to-pass test.
+        Runs the pipeline to generate a fail-to-pass test. Each failed candidate moves
+        the generation to the prompt given by the transitions for its verification
+        outcome, until a fail-to-pass test is found or the budget is exhausted.
 
         Returns:
             bool: True if a fail-to-pass test has been generated, False otherwise
         """
 
+        feedback: Feedback = (prompt_type, previous_test, failure_reason)
+        while True:
+            self._report_stage(
+                PipelineStage.LLM_CALL, model=self._model, llm_call=curr_llm_attempt
+            )
+            self._generation_dir, llm_response = self._generate_candidate(
+                curr_llm_attempt, *feedback
+            )
+            if llm_response is None:
+                return False, self._empty_response(curr_llm_attempt)
+
+            stop_reason = self._stop_reason(curr_llm_attempt)
+            outcome, details = self._verify_candidate(llm_response, stop_reason is None)
+            if outcome == VerificationOutcome.FAIL_TO_PASS:
+                return True, llm_response
+
+            stop_reason = stop_reason or self._stop_reason(curr_llm_attempt)
+            if stop_reason is not None:
+                self._log_stop(stop_reason)
+                return False, llm_response
+
+            feedback = self._transition(outcome, llm_response, details)
+            curr_llm_attempt += 1
+
+    def run_pipelined_workflow(self) -> tuple[bool, LLMResponse]:
+        """
+        Runs the pipeline to generate a fail-to-pass test, querying the next candidate
+        while the current one is verified. The next candidate is built from the latest
+        feedback available, the first speculative candidate is a second sample of the
+        initial prompt at a higher temperature. A query still in flight when the pipeline
+        stops is awaited, so that its tokens are charged to the budget.
+
+        Returns:
+            bool: True if a fail-to-pass test has been generated, False otherwise
+        """
+
+        feedback: Feedback = (PromptType.INITIAL, "", "")
+        llm_response = self._empty_response(1)
+
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-prefetch")
+        pending: Future | None = self._prefetch_candidate(executor, 1, feedback)
+        try:
+            curr_llm_attempt = 1
+            while pending is not None:
+                generation_dir, candidate = pending.result()
+                pending = None
+                if candidate is None:
+                    return False, self._empty_response(curr_llm_attempt)
+
+                stop_reason = self._stop_reason(curr_llm_attempt)
+                if stop_reason is None:
+                    temperature = (
+                        SPECULATIVE_TEMPERATURE if feedback[0] == PromptType.INITIAL else 0.0
+                    )
+                    pending = self._prefetch_candidate(
+                        executor, curr_llm_attempt + 1, feedback, temperature
+                    )
+
+                self._generation_dir, llm_response = generation_dir, candidate
+                outcome, details = self._verify_candidate(candidate, stop_reason is None)
+                if outcome == VerificationOutcome.FAIL_TO_PASS:
+                    return True, candidate
+                if stop_reason is None:
+                    feedback = self._transition(outcome, candidate, details)
+                else:
+                    self._log_stop(stop_reason)
+                curr_llm_attempt += 1
+            return False, llm_response
+        finally:
+            if pending is not None and pending.running():
+                logger.info("Waiting for the speculative LLM call to finish...")
+            # the speculative query cannot be aborted once sent, but its tokens are spent
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _prefetch_candidate(
+        self,
+        executor: ThreadPoolExecutor,
+        curr_llm_attempt: int,
+        feedback: Feedback,
+        temperature: float = 0.0,
+    ) -> Future:
+        """
+        Starts querying the model for a candidate test in the background. The stage is
+        reported from the calling thread, as the stage callback is not thread-safe.
+
+        Parameters:
+            executor (ThreadPoolExecutor): The executor to query the model in
+            curr_llm_attempt (int): The number of the LLM call
+            feedback (Feedback): The prompt type, previous test and failure reason of the call
+            temperature (float, optional): Temperature to query the model with
+
+        Returns:
+            Future: The generation directory and candidate test, see _generate_candidate
+        """
+
+        self._report_stage(
+            PipelineStage.LLM_CALL, model=self._model, llm_call=curr_llm_attempt
+        )
+        return executor.submit(
+            self._generate_candidate, curr_llm_attempt, *feedback, temperature
+        )
+
+    def _stop_reason(self, curr_llm_attempt: int) -> str | None:
+        """
+        Checks whether another LLM call may be made.
+
+        Parameters:
+            curr_llm_attempt (int): The number of the current LLM call
+
+        Returns:
+            str | None: The exhausted limit, or None if another call may be made
+        """
+
+        if curr_llm_attempt >= self._config.MAX_LLM_CALLS:
+            return f"max LLM calls ({self._config.MAX_LLM_CALLS})"
+        if self._budget is not None:
+            return self._budget.exhausted_by()
+        return None
+
+    def _log_stop(self, stop_reason: str) -> None:
+        usage = f" ({self._budget.summary()})" if self._budget is not None else ""
+        logger.critical(f"Reached {stop_reason}{usage}, stopping generation...")
+        logger.marker("=============== Test Generation Finished =============")  # type: ignore[attr-defined]
+
+    def _transition(
+        self, outcome: VerificationOutcome, llm_response: LLMResponse, details: str
+    ) -> Feedback:
+        """
+        Determines the prompt of the next LLM call from the outcome of a candidate.
+
+        Parameters:
+            outcome (VerificationOutcome): The verification outcome of the candidate
+            llm_response (LLMResponse): The candidate test
+            details (str): Failure output of the candidate
+
+        Returns:
+            Feedback: The prompt type, previous test and failure reason of the next LLM call
+        """
+
+        prompt_type = self._transitions[outcome]
+        logger.info(f"Retrying with {prompt_type} prompt...")
+        if self._budget is not None:
+            logger.info(f"Budget used so far: {self._budget.summary()}")
+        return prompt_type, general.build_response_test(llm_response), details
+
+    def _generate_candidate(
+        self,
+        curr_llm_attempt: int,
+        prompt_type: PromptType,
+        previous_test: str = "",
+        failure_reason: str = "",
+        temperature: float = 0.0,
+    ) -> tuple[Path, LLMResponse | None]:
+        """
+        Queries the model for a candidate test.
+
+        Parameters:
+            curr_llm_attempt (int): The number of the LLM call
+            prompt_type (PromptType): The type of prompt to build
+            previous_test (str, optional): The previous test, for non-initial prompts
+            failure_reason (str, optional): The failure of the previous test
+            temperature (float, optional): Temperature to query the model with
+
+        Returns:
+            Path: The generation directory of the candidate
+            LLMResponse | None: The candidate test, or None if the model did not return a test
+        """
+
         logger.marker("Current LLM call %s" % (curr_llm_attempt))  # type: ignore[attr-defined]
 
         prompt = self._llm_handler.build_prompt(
@@ -100,15 +326,13 @@ class TestGenerator:
             logger.critical("Prompt exceeds limits, skipping...")
             raise ExecutionError("Prompt is too long.")
 
-        assert self._config.output_dir is not None
-        self._generation_dir = Path(
-            self._config.output_dir, f"llm_call_{curr_llm_attempt}"
-        )
-        self._generation_dir.mkdir(parents=True, exist_ok=True)
-        (self._generation_dir / "prompt.txt").write_text(prompt, encoding="utf-8")
+        assert self._output_dir is not None
+        generation_dir = Path(self._output_dir, f"llm_call_{curr_llm_attempt}")
+        generation_dir.mkdir(parents=True, exist_ok=True)
+        (generation_dir / "prompt.txt").write_text(prompt, encoding="utf-8")
         logger.marker(  # type: ignore[attr-defined]
             "New prompt written to %s"
-            % (self._generation_dir / f"prompt_{curr_llm_attempt}.txt")
+            % (generation_dir / f"prompt_{curr_llm_attempt}.txt")
         )
 
         # print("Mocking response for debugging...")
@@ -117,31 +341,25 @@ class TestGenerator:
         # )
         logger.info("Querying LLM...")
         response = self._llm_handler.query_model(
-            prompt, model=self._model, temperature=0.0
+            prompt, model=self._model, temperature=temperature
         )
         if not response:
             logger.critical("Failed to query model")
             raise Exception("Failed to query model")
 
         logger.success("LLM response received")  # type: ignore[attr-defined]
-        (self._generation_dir / "raw_model_response.txt").write_text(
+        (generation_dir / "raw_model_response.txt").write_text(
             response, encoding="utf-8"
         )
         postprocess_response = self._llm_handler.postprocess_response(response)
         if postprocess_response is None:
             logger.info("Model did not return a test, skipping...")
             # self._handle_commenting()
-            return False, LLMResponse(
-                filename="",
-                imports=[],
-                test_code="",
-                test_name="",
-                curr_llm_cal=curr_llm_attempt,
-            )
+            return generation_dir, None
 
         response_filename, imports, new_test = postprocess_response
 
-        (self._generation_dir / f"generated_test.txt").write_text(
+        (generation_dir / "generated_test.txt").write_text(
             new_test, encoding="utf-8"
         )
 
@@ -152,83 +370,99 @@ class TestGenerator:
         match = re.search(test_name_pattern, new_test)
         if not match:
             logger.error("Could not extract test name from generated test")
-            return False, LLMResponse(
-                filename="",
-                imports=[],
-                test_code="",
-                test_name="",
-                curr_llm_cal=curr_llm_attempt,
-            )
+            return generation_dir, None
 
-        test_to_run: str = match.group(1)
-
-        llm_response = LLMResponse(
+        return generation_dir, LLMResponse(
             filename=filename,
             imports=imports,
             test_code=new_test,
-            test_name=test_to_run,
+            test_name=match.group(1),
             curr_llm_cal=curr_llm_attempt,
         )
+
+    def _verify_candidate(
+        self, llm_response: LLMResponse, can_retry: bool
+    ) -> tuple[VerificationOutcome, str]:
+        """
+        Lints the candidate test and runs it before and after the PR.
+
+        Parameters:
+            llm_response (LLMResponse): The candidate test
+            can_retry (bool): Whether further LLM calls are left. If not, linting issues
+                do not stop the verification
+
+        Returns:
+            VerificationOutcome: The outcome of the verification
+            str: Failure output relevant to the outcome
+        """
+
+        filename, new_test, imports, test_to_run = (
+            llm_response.filename,
+            llm_response.test_code,
+            llm_response.imports,
+            llm_response.test_name,
+        )
+        self._report_stage(PipelineStage.LINT)
         lint_passed, lint_out = self.check_for_linting_issues(llm_response)
 
         if not lint_passed:
             logger.warning("Linting issues found in generated test")
-            if curr_llm_attempt < self._config.MAX_LLM_CALLS:
-                logger.info("Retrying with LINTING_ISSUE prompt...")
-                full_test = general.build_response_test(llm_response)
-                return self.run_workflow(
-                    curr_llm_attempt + 1, PromptType.LINTING_ISSUE, full_test, lint_out
-                )
-            else:
-                logger.critical("Max LLM calls reached, continuing execution...")
+            if can_retry:
+                return VerificationOutcome.LINT_FAILED, lint_out
+            logger.critical("No LLM calls left, continuing execution...")
 
+        self._report_stage(PipelineStage.PRE_PR)
         test_passed_before = self.run_test_pre_pr(
             filename, new_test, imports, test_to_run
         )
 
         if test_passed_before:
             logger.warning("No Fail-to-Pass test generated")
-            if curr_llm_attempt < self._config.MAX_LLM_CALLS:
-                logger.info("Retrying with PASS_TO_PASS prompt...")
-                full_test = general.build_response_test(llm_response)
-                return self.run_workflow(
-                    curr_llm_attempt + 1, PromptType.PASS_TO_PASS, full_test
-                )
+            return VerificationOutcome.PASSED_BEFORE, ""
 
-            logger.critical("Max LLM calls reached, continuing execution...")
-            logger.marker("=============== Test Generation Finished =============")  # type: ignore[attr-defined]
-            return False, llm_response
-
-        test_passed_after, after_out = self.run_test_post_pr(
+        self._report_stage(PipelineStage.POST_PR)
+        test_passed_after, after_out, after_errors = self.run_test_post_pr(
             filename, new_test, imports, test_to_run
         )
 
-        fail_2_pass = (not test_passed_before) and test_passed_after
+        if test_passed_after:
+            return VerificationOutcome.FAIL_TO_PASS, ""
+
+        logger.info("No Fail-to-Pass test generated")  # type: ignore[attr-defined]
+        if "test result: FAILED." in after_out:
+            logger.marker("Test failed due to assertion error")  # type: ignore[attr-defined]
+            return VerificationOutcome.ASSERTION_FAILED, general.retrieve_output_test_failure(after_out)
+        logger.marker("Test failed due to compilation/runtime error")  # type: ignore[attr-defined]
+        return VerificationOutcome.COMPILATION_FAILED, after_errors
+
+    @staticmethod
+    def _empty_response(curr_llm_attempt: int) -> LLMResponse:
+        return LLMResponse(
+            filename="",
+            imports=[],
+            test_code="",
+            test_name="",
+            curr_llm_cal=curr_llm_attempt,
+        )
 
-        if fail_2_pass:
-            return True, llm_response
-        else:
-            logger.info("No Fail-to-Pass test generated")  # type: ignore[attr-defined]
-            if curr_llm_attempt < self._config.MAX_LLM_CALLS:
-                is_assertion_error = "test result: FAILED." in after_out
-                full_test = general.build_response_test(llm_response)
-                if is_assertion_error:
-                    logger.marker("Test failed due to assertion error, retrying...")  # type: ignore[attr-defined]
-                    failures = general.retrieve_output_test_failure(after_out)
-                    return self.run_workflow(
-                        curr_llm_attempt + 1, PromptType.ASSERTION_ERROR, full_test, failures
-                    )
-                else:
-                    logger.marker("Test failed due to compilation/runtime error, retrying...")  # type: ignore[attr-defined]
-                    errors = general.retrieve_output_errors(after_out)
-                    return self.run_workflow(
-                        curr_llm_attempt + 1,
-                        PromptType.COMPILATION_ERROR,
-                        full_test,
-                        errors,
-                    )
-            logger.marker("=============== Test Generation Finished =============")  # type: ignore[attr-defined]
-            return False, llm_response
+    def _report_stage(self, stage: PipelineStage, **fields) -> None:
+        """
+        Notifies the stage callback, if any, that a stage has been reached.
+        Stops the pipeline if another model already won the race.
+
+        Parameters:
+            stage (PipelineStage): The stage that has been reached
+            **fields: Further details about the stage
+        """
+
+        if self._race is not None and self._race.has_lost(self._model):
+            raise RunCancelledError(f"Model {self._race.winner} won the race")
+        if self._on_stage is None:
+            return
+        try:
+            self._on_stage(stage, **fields)
+        except Exception as e:
+            logger.error(f"Failed to report stage {stage}: {e}")
 
     def check_for_linting_issues(self, llm_response: LLMResponse) -> tuple[bool, str]:
         repo_path = self._config.local_repo_path or self._config.cloned_repo_dir
@@ -261,14 +495,14 @@ class TestGenerator:
                 f"File {filename} should exist in head commit but does not"
             )
 
-        golden_code_patch: str = self._pr_diff_ctx.get_updated_golden_code_patch(
-            filename, new_file_content
+        lint_passed, stdout, diagnostics = self._docker_service.run_linter_in_sandbox(
+            filename, new_file_content, file_content, self._generation_dir / "lint.txt"
         )
 
-        lint_passed, stdout = self._docker_service.run_linter(golden_code_patch)
-        (self._generation_dir / "lint.txt").write_text(stdout, encoding="utf-8")
-
-        linting_errors = general.retrieve_output_errors(stdout)
+        linting_errors = compiler_messages.summarize_errors(
+            diagnostics, stdout, filename,
+            compiler_messages.changed_line_ranges(file_content, new_file_content),
+        )
         return lint_passed, linting_errors
 
     def run_test_pre_pr(
@@ -297,16 +531,15 @@ class TestGenerator:
             logger.marker(f"File {filename} does not exist in base commit")  # type: ignore[attr-defined]
             new_file_content = self._cst_builder._create_test_block(new_test, imports)
 
-        test_passed, stdout = self._run_test(
-            filename, file_content, new_file_content, [test_to_run], True
+        test_passed, _, _ = self._run_test(
+            filename, file_content, new_file_content, [test_to_run], True,
+            self._generation_dir / "before.txt",
         )
-
-        (self._generation_dir / "before.txt").write_text(stdout, encoding="utf-8")
         return test_passed
 
     def run_test_post_pr(
         self, filename: str, new_test: str, imports: list[str], test_to_run: str
-    ) -> tuple[bool, str]:
+    ) -> tuple[bool, str, str]:
         repo_path = self._config.local_repo_path or self._config.cloned_repo_dir
         if not repo_path:
             raise DataMissingError(
@@ -332,18 +565,22 @@ class TestGenerator:
                 f"File {filename} should exist in head commit but does not"
             )
 
-        test_passed, stdout = self._run_test(
-            filename, file_content, new_file_content, [test_to_run], False
+        test_passed, stdout, diagnostics = self._run_test(
+            filename, file_content, new_file_content, [test_to_run], False,
+            self._generation_dir / "after.txt",
+        )
+        errors = compiler_messages.summarize_errors(
+            diagnostics, stdout, filename,
+            compiler_messages.changed_line_ranges(file_content, new_file_content),
         )
 
-        (self._generation_dir / "after.txt").write_text(stdout, encoding="utf-8")
         new_test_file = f"#{filename}\n{new_file_content}"
 
         (self._generation_dir / "new_file_content.rs").write_text(
             new_test_file, encoding="utf-8"
         )
 
-        return test_passed, stdout
+        return test_passed, stdout, errors
 
     def _run_test(
         self,
@@ -352,39 +589,31 @@ class TestGenerator:
         new_file_content: str,
         test_to_run: list[str],
         is_pre_pr: bool,
-    ) -> tuple[bool, str]:
+        output_path: Path,
+    ) -> SandboxResult:
         if is_pre_pr:
-            model_test_patch = (
-                git_diff.unified_diff(
-                    old_file_content,
-                    new_file_content,
-                    fromfile=filename,
-                    tofile=filename,
-                )
-                + "\n\n"
-            )
             if old_file_content:
                 logger.marker("Running test in pre-PR codebase...")  # type: ignore[attr-defined]
-                return self._docker_service.run_test_in_container(
-                    model_test_patch, test_to_run, False
+                return self._docker_service.run_test_in_sandbox(
+                    filename, new_file_content, old_file_content, test_to_run, False, output_path
                 )
             else:
                 logger.marker("File did not exist in pre-PR codebase, cannot run test...")  # type: ignore[attr-defined]
+                output_path.write_text(
+                    "Empty stdout because file did not exist in pre-PR codebase", encoding="utf-8"
+                )
                 return (
                     False,
                     "Empty stdout because file did not exist in pre-PR codebase",
+                    [],
                 )
 
         elif not is_pre_pr and old_file_content:
             logger.marker("Running test in post-PR codebase...")  # type: ignore[attr-defined]
-            # The golden code patch must be equal to all other files the test was not generated for
-            # For the file the test was generated for, we need to modify the patch to
-            # include the new test as well
-            golden_code_patch: str = self._pr_diff_ctx.get_updated_golden_code_patch(
-                filename, new_file_content
-            )
-            return self._docker_service.run_test_in_container(
-                golden_code_patch, test_to_run, True
+            # The post-PR sandbox has the golden code patch applied, only the file
+            # the test was generated for is swapped to include the new test
+            return self._docker_service.run_test_in_sandbox(
+                filename, new_file_content, old_file_content, test_to_run, True, output_path
             )
         else:
             raise ExecutionError(
@@ -424,17 +653,14 @@ class TestGenerator:
 
         # We first want to run code coverage in a container only with the golden patch to evaluate it before the auto-generated test
         logger.marker("Running code coverage with golden patch only...")  # type: ignore[attr-defined]
-        golden_code_patch = self._pr_diff_ctx.golden_code_patch
         file_line_coverage_without, suite_line_coverage_without = self._docker_service.run_coverage_in_container(
-            filename, golden_code_patch
+            filename, self._pr_diff_ctx.golden_files
         )
 
         logger.marker("Running code coverage with golden patch and generated test...")  # type: ignore[attr-defined]
-        golden_code_patch: str = self._pr_diff_ctx.get_updated_golden_code_patch(
-            filename, new_file_content
-        )
+        golden_files = self._pr_diff_ctx.get_updated_golden_files(filename, new_file_content)
         file_line_coverage_with, suite_line_coverage_with = self._docker_service.run_coverage_in_container(
-            filename, golden_code_patch
+            filename, golden_files
         )
         test_coverage = TestCoverage(
             file_line_coverage_with=file_line_coverage_with,
@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+
+from docker import DockerClient
+from docker.errors import APIError, BuildError, ImageNotFound
+
+from webhook_handler.constants import IMAGE_BUILD_FAILURE_TTL
+from webhook_handler.helper.custom_errors import *
+from webhook_handler.services.build_coordinator import BuildCoordinator
+
+logger = logging.getLogger(__name__)
+
+TOOLCHAIN_DOCKERFILE = "Dockerfile_toolchain"
+TOOLCHAIN_REPOSITORY = "testgen-toolchain"
+
+# Build arguments of the toolchain image of each Rust version used by the repository Dockerfiles
+TOOLCHAINS: dict[str, dict[str, str]] = {
+    "1.89": {"rust_image": "rust:1.89-slim-bullseye"},
+    "1.50": {"rust_image": "rust:1.50.0", "use_debian_archive": "true"},
+}
+
+# First Rust version with a stable -C instrument-coverage, older toolchains cannot run cargo llvm-cov
+COVERAGE_MIN_VERSION = (1, 60)
+
+# Repository Dockerfiles declare their toolchain as default of the toolchain_image build argument
+_TOOLCHAIN_ARG = re.compile(rf"^ARG toolchain_image={TOOLCHAIN_REPOSITORY}:(\S+)$", re.MULTILINE)
+
+
+def toolchain_version_of(dockerfile_path: Path) -> str | None:
+    """
+    Returns the toolchain version a repository Dockerfile builds from.
+
+    Parameters:
+        dockerfile_path (Path): Path of the repository Dockerfile
+
+    Returns:
+        str | None: The toolchain version, None if the Dockerfile does not use a toolchain image
+    """
+
+    match = _TOOLCHAIN_ARG.search(dockerfile_path.read_text(encoding="utf-8"))
+    return match.group(1) if match else None
+
+
+def supports_coverage(version: str | None) -> bool:
+    """
+    Checks whether a toolchain can measure line coverage with cargo llvm-cov.
+
+    Parameters:
+        version (str | None): The toolchain version, None if the Dockerfile does not use a toolchain image
+
+    Returns:
+        bool: True if coverage can be measured, False otherwise
+    """
+
+    if version is None:
+        return True
+    major, minor = (int(part) for part in version.split(".")[:2])
+    return (major, minor) >= COVERAGE_MIN_VERSION
+
+
+def toolchain_tag_for(project_root: Path, version: str) -> str:
+    """
+    Returns the tag of the toolchain image of a version. The tag changes with the toolchain
+    Dockerfile, so that repository images are rebuilt on top of a changed toolchain.
+
+    Parameters:
+        project_root (Path): Root directory of the bot
+        version (str): The toolchain version
+
+    Returns:
+        str: The image tag
+    """
+
+    dockerfile = Path(project_root, "dockerfiles", TOOLCHAIN_DOCKERFILE).read_bytes()
+    return f"{TOOLCHAIN_REPOSITORY}:{version}-{hashlib.sha256(dockerfile).hexdigest()[:12]}"
+
+
+def ensure_toolchain_image(
+    client: DockerClient, project_root: Path, version: str, rebuild: bool = False
+) -> str:
+    """
+    Builds the toolchain image of a version unless it exists. The image is also tagged
+    with the plain version, which the repository Dockerfiles use when built by hand.
+
+    Parameters:
+        client (DockerClient): The Docker client
+        project_root (Path): Root directory of the bot
+        version (str): The toolchain version
+        rebuild (bool, optional): Whether to build the image even if it exists
+
+    Returns:
+        str: Tag of the toolchain image
+
+    Raises:
+        ExecutionError: If the version is unknown or the build failed
+    """
+
+    if version not in TOOLCHAINS:
+        raise ExecutionError(f"Unknown toolchain version {version}")
+    tag = toolchain_tag_for(project_root, version)
+
+    def build() -> None:
+        if not rebuild:
+            try:
+                client.images.get(tag)
+                return
+            except ImageNotFound:
+                pass
+        logger.marker(f"Building toolchain image {tag}...")  # type: ignore[attr-defined]
+        try:
+            client.images.build(
+                path=Path(project_root, "dockerfiles").as_posix(),
+                tag=tag,
+                dockerfile=TOOLCHAIN_DOCKERFILE,
+                buildargs=TOOLCHAINS[version],
+                network_mode="host",
+                pull=rebuild,
+                rm=True,
+            )
+        except BuildError as e:
+            build_log = "\n".join(
+                chunk["stream"].rstrip() for chunk in e.build_log if "stream" in chunk
+            )
+            logger.critical(f"Build failed for toolchain image '{tag}':\n{build_log}")
+            raise ExecutionError("Toolchain image build failed")
+        except APIError as e:
+            logger.critical(f"Docker API error: {e}")
+            raise ExecutionError("Docker API error")
+        client.images.get(tag).tag(TOOLCHAIN_REPOSITORY, version)
+        logger.success(f"Toolchain image '{tag}' built successfully")  # type: ignore[attr-defined]
+
+    BuildCoordinator.build_once(tag, build, IMAGE_BUILD_FAILURE_TTL)
+    return tag
@@ -0,0 +1,141 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import PurePosixPath
+
+from docker.models.containers import Container
+
+from webhook_handler.helper.custom_errors import *
+from webhook_handler.models import BuildFlavour, CargoTarget
+from webhook_handler.models.cargo_target import LIB_KINDS
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_ROOT = PurePosixPath("/app/testbed")
+
+# Indexes kept in memory, post-PR sandboxes add one per overlay
+MAX_INDEXES = 64
+
+METADATA_COMMAND = (
+    "/bin/sh -c 'cd /app/testbed && cargo metadata --no-deps --format-version 1 --offline'"
+)
+
+
+class WorkspaceIndex:
+    """
+    Maps the source files of a cargo workspace to the package and target they are
+    compiled into, so that cargo commands can be scoped to the code under test.
+    The index of an image is built once from `cargo metadata` and shared by all runs.
+    Containers with files of a PR overlaid get their own index, keyed by the overlay.
+    The least recently used indexes are dropped beyond MAX_INDEXES.
+    """
+
+    _indexes: OrderedDict[str, "WorkspaceIndex"] = OrderedDict()
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, packages: list[dict]) -> None:
+        # (package directory, package name, targets as (kind, name, source path))
+        self._packages: list[tuple[PurePosixPath, str, list[tuple[str, str, PurePosixPath]]]] = []
+        for package in packages:
+            package_dir = self._relative(PurePosixPath(package["manifest_path"]).parent)
+            targets = [
+                (target["kind"][0], target["name"], self._relative(PurePosixPath(target["src_path"])))
+                for target in package["targets"]
+                if target["kind"]
+            ]
+            self._packages.append((package_dir, package["name"], targets))
+        # most specific package first, workspace roots can be packages themselves
+        self._packages.sort(key=lambda package: len(package[0].parts), reverse=True)
+
+    @classmethod
+    def for_image(cls, image_tag: str, container: Container, overlay_key: str = "") -> "WorkspaceIndex":
+        """
+        Returns the index of an image, building it in the container on first use.
+
+        Parameters:
+            image_tag (str): The image of the container
+            container (Container): A running container of the image
+            overlay_key (str, optional): Identifies the files overlaid in the container, empty if none
+
+        Returns:
+            WorkspaceIndex: The index of the workspace
+
+        Raises:
+            ExecutionError: If cargo metadata fails
+        """
+
+        key = f"{image_tag}#{overlay_key}" if overlay_key else image_tag
+        with cls._indexes_lock:
+            index = cls._indexes.get(key)
+            if index is not None:
+                cls._indexes.move_to_end(key)
+        if index is not None:
+            return index
+
+        exec_result = container.exec_run(
+            METADATA_COMMAND, stdout=True, stderr=False,
+            environment=BuildFlavour.PLAIN.exec_environment,
+        )
+        if exec_result.exit_code != 0:
+            raise ExecutionError("cargo metadata failed")
+        index = cls(json.loads(exec_result.output.decode())["packages"])
+        with cls._indexes_lock:
+            cls._indexes[key] = index
+            while len(cls._indexes) > MAX_INDEXES:
+                cls._indexes.popitem(last=False)
+        return index
+
+    @classmethod
+    def forget_image(cls, image_tag: str) -> None:
+        """
+        Drops the indexes of an image, e.g. once it has been evicted.
+
+        Parameters:
+            image_tag (str): The image whose indexes to drop
+        """
+
+        with cls._indexes_lock:
+            for key in [key for key in cls._indexes if key.split("#", 1)[0] == image_tag]:
+                del cls._indexes[key]
+
+    def target_of(self, filename: str) -> CargoTarget | None:
+        """
+        Finds the target a source file is compiled into.
+
+        Parameters:
+            filename (str): Path of the file, relative to the workspace root
+
+        Returns:
+            CargoTarget | None: The target, or None if the file belongs to no package
+        """
+
+        path = PurePosixPath(filename)
+        for package_dir, package, targets in self._packages:
+            if not path.is_relative_to(package_dir):
+                continue
+            for kind, name, src_path in targets:
+                if src_path == path:
+                    return CargoTarget(package, kind, name)
+
+            # otherwise the file is a module of the target with the closest source directory
+            owners = [
+                (kind, name, src_path)
+                for kind, name, src_path in targets
+                if path.is_relative_to(src_path.parent)
+            ]
+            if not owners:
+                return CargoTarget(package)
+            depth = max(len(src_path.parts) for _, _, src_path in owners)
+            owners = [owner for owner in owners if len(owner[2].parts) == depth]
+            libs = [owner for owner in owners if owner[0] in LIB_KINDS]
+            if libs:
+                return CargoTarget(package, libs[0][0], libs[0][1])
+            if len(owners) == 1:
+                return CargoTarget(package, owners[0][0], owners[0][1])
+            return CargoTarget(package)
+        return None
+
+    @staticmethod
+    def _relative(path: PurePosixPath) -> PurePosixPath:
+        return path.relative_to(WORKSPACE_ROOT) if path.is_relative_to(WORKSPACE_ROOT) else path
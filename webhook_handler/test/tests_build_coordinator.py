@@ -0,0 +1,45 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.helper.custom_errors import *
+from webhook_handler.services.build_coordinator import BuildCoordinator
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_build_coordinator
+
+class TestBuildCoordinator(SimpleTestCase):
+    def test_concurrent_runs_share_one_build(self):
+        started, release = threading.Event(), threading.Event()
+        builds: list[str] = []
+
+        def build() -> None:
+            builds.append("build")
+            started.set()
+            release.wait(5)
+
+        owner = threading.Thread(target=BuildCoordinator.build_once, args=("img:shared", build, 0))
+        owner.start()
+        self.assertTrue(started.wait(5))
+        waiter = threading.Thread(target=BuildCoordinator.build_once, args=("img:shared", build, 0))
+        waiter.start()
+        release.set()
+        owner.join(5)
+        waiter.join(5)
+
+        self.assertEqual(builds, ["build"])
+        self.assertEqual(BuildCoordinator.builds_in_flight(), 0)
+
+    def test_failed_build_is_not_retried_within_ttl(self):
+        def fail() -> None:
+            raise ExecutionError("docker build failed")
+
+        with self.assertRaises(ExecutionError):
+            BuildCoordinator.build_once("img:broken", fail, 60)
+        build = mock.Mock()
+        with self.assertRaisesRegex(ExecutionError, "failed recently"):
+            BuildCoordinator.build_once("img:broken", build, 60)
+
+        build.assert_not_called()
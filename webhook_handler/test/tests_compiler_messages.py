@@ -0,0 +1,147 @@
+import json
+
+from django.test import SimpleTestCase
+
+from webhook_handler.helper import compiler_messages
+from webhook_handler.helper.compiler_messages import DiagnosticCollector
+
+
+def _span(file_name: str, line: int, is_primary: bool = True, **fields) -> dict:
+    return {
+        "file_name": file_name,
+        "line_start": line,
+        "line_end": line,
+        "column_start": 5,
+        "is_primary": is_primary,
+        "label": None,
+        "text": [{"text": "    let x: u32 = \"a\";"}],
+        "expansion": None,
+        **fields,
+    }
+
+
+def _message(level: str = "error", spans: list[dict] | None = None, **fields) -> dict:
+    return {
+        "level": level,
+        "message": "mismatched types",
+        "code": {"code": "E0308"} if level == "error" else None,
+        "spans": spans if spans is not None else [_span("src/lib.rs", 12)],
+        "children": [],
+        "rendered": f"{level}: mismatched types\n  --> src/lib.rs:12:5\n",
+        **fields,
+    }
+
+
+def _compiler_message(message: dict) -> str:
+    return json.dumps({"reason": "compiler-message", "message": message})
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_compiler_messages
+
+class TestParseDiagnostic(SimpleTestCase):
+    def test_parses_error(self):
+        diagnostic = compiler_messages.parse_diagnostic(_message())
+
+        self.assertTrue(diagnostic.is_error)
+        self.assertEqual(diagnostic.code, "E0308")
+        self.assertEqual(diagnostic.spans[0].file_name, "src/lib.rs")
+        self.assertEqual(diagnostic.spans[0].text, "let x: u32 = \"a\";")
+
+    def test_resolves_macro_expansion_to_call_site(self):
+        expanded = _span(
+            "/rustc/library/core/src/macros/mod.rs", 40,
+            expansion={"span": _span("tests/parser.rs", 7)},
+        )
+
+        diagnostic = compiler_messages.parse_diagnostic(_message(spans=[expanded]))
+
+        self.assertEqual(diagnostic.spans[0].file_name, "tests/parser.rs")
+        self.assertEqual(diagnostic.spans[0].line_start, 7)
+
+    def test_collects_suggestions_in_notes(self):
+        child = {
+            "level": "help",
+            "message": "consider importing",
+            "spans": [{"suggested_replacement": "use crate::Parser;"}],
+        }
+
+        diagnostic = compiler_messages.parse_diagnostic(_message(children=[child]))
+
+        self.assertEqual(diagnostic.notes, ("help: consider importing: `use crate::Parser;`",))
+
+
+class TestDiagnosticCollector(SimpleTestCase):
+    def test_collects_errors_and_keeps_rendered_output(self):
+        collector = DiagnosticCollector()
+
+        lines = collector(_compiler_message(_message()))
+
+        self.assertEqual(len(collector.diagnostics), 1)
+        self.assertEqual(lines, ["error: mismatched types", "  --> src/lib.rs:12:5", ""])
+
+    def test_skips_warnings(self):
+        collector = DiagnosticCollector()
+
+        collector(_compiler_message(_message(level="warning")))
+
+        self.assertEqual(collector.diagnostics, [])
+
+    def test_drops_other_cargo_messages(self):
+        collector = DiagnosticCollector()
+
+        self.assertEqual(collector(json.dumps({"reason": "compiler-artifact"})), [])
+        self.assertEqual(collector("test parser::parses ... ok"), ["test parser::parses ... ok"])
+
+
+class TestSummarizeErrors(SimpleTestCase):
+    def setUp(self) -> None:
+        self.in_test = compiler_messages.parse_diagnostic(_message(spans=[_span("src/lib.rs", 12)]))
+        self.in_file = compiler_messages.parse_diagnostic(_message(spans=[_span("src/lib.rs", 80)]))
+        self.elsewhere = compiler_messages.parse_diagnostic(_message(spans=[_span("src/main.rs", 3)]))
+
+    def test_keeps_errors_within_test_lines(self):
+        summary = compiler_messages.summarize_errors(
+            [self.in_test, self.in_file, self.elsewhere], "", "src/lib.rs", [(10, 20)]
+        )
+
+        self.assertIn("src/lib.rs:12:5", summary)
+        self.assertNotIn("src/lib.rs:80", summary)
+        self.assertNotIn("src/main.rs", summary)
+
+    def test_falls_back_to_errors_in_file(self):
+        summary = compiler_messages.summarize_errors(
+            [self.in_file, self.elsewhere], "", "src/lib.rs", [(10, 20)]
+        )
+
+        self.assertIn("src/lib.rs:80:5", summary)
+        self.assertNotIn("src/main.rs", summary)
+
+
+class TestChangedLineRanges(SimpleTestCase):
+    def test_finds_injected_lines(self):
+        original = "use a;\n\nfn f() {}\n"
+        new = "use a;\nuse b;\n\nfn f() {}\n\n#[test]\nfn t() {}\n"
+
+        self.assertEqual(compiler_messages.changed_line_ranges(original, new), [(2, 2), (5, 7)])
+
+    def test_unchanged_file(self):
+        self.assertEqual(compiler_messages.changed_line_ranges("fn f() {}\n", "fn f() {}\n"), [])
+
+    def test_skips_errors_between_imports_and_test(self):
+        original = "use a;\n\n#[test]\nfn existing() { broken(); }\n"
+        new = (
+            "use a;\nuse b;\n\n#[test]\nfn existing() { broken(); }\n"
+            "\n#[test]\nfn injected() { also_broken(); }\n"
+        )
+        line_ranges = compiler_messages.changed_line_ranges(original, new)
+        in_existing = compiler_messages.parse_diagnostic(_message(spans=[_span("src/lib.rs", 5)]))
+        in_injected = compiler_messages.parse_diagnostic(_message(spans=[_span("src/lib.rs", 8)]))
+
+        summary = compiler_messages.summarize_errors(
+            [in_existing, in_injected], "", "src/lib.rs", line_ranges
+        )
+
+        self.assertEqual(line_ranges, [(2, 2), (6, 8)])
+        self.assertNotIn("src/lib.rs:5:5", summary)
+        self.assertIn("src/lib.rs:8:5", summary)
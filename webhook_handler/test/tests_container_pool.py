@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.helper.custom_errors import *
+from webhook_handler.services.container_pool import ContainerPool
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_container_pool
+
+class TestContainerPool(SimpleTestCase):
+    def test_drained_pool_is_replaced(self):
+        client = mock.Mock()
+        pool = ContainerPool.for_image(client, "img:pooled", 0)
+        ContainerPool.drain_image("img:pooled")
+
+        with self.assertRaises(ExecutionError):
+            pool.acquire()
+        self.assertIsNot(ContainerPool.for_image(client, "img:pooled", 0), pool)
+        client.containers.create.assert_not_called()
+        ContainerPool.drain_image("img:pooled")
+
+    def test_pool_grows_to_largest_requested_size(self):
+        pool = ContainerPool.for_image(mock.Mock(), "img:sized", 0)
+
+        self.assertIs(ContainerPool.for_image(mock.Mock(), "img:sized", 2), pool)
+        self.assertEqual(pool._size, 2)
+        ContainerPool.drain_image("img:sized")
+
+    def test_discarded_container_is_not_pooled(self):
+        pool = ContainerPool.for_image(mock.Mock(), "img:discard", 2)
+        container = mock.Mock()
+
+        pool.discard(container)
+
+        container.remove.assert_called_once_with(force=True)
+        self.assertEqual(pool._idle, [])
+        ContainerPool.drain_image("img:discard")
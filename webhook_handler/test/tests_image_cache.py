@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from docker.errors import APIError
+
+from webhook_handler.services.container_pool import ContainerPool
+from webhook_handler.services.image_cache import ImageCache
+
+
+def _image(tag: str, last_tag_time: str, layers: list[str] | None = None) -> mock.Mock:
+    image = mock.Mock(id=f"sha256:{tag}", tags=[tag], short_id=tag)
+    image.attrs = {
+        "Metadata": {"LastTagTime": last_tag_time},
+        "RootFS": {"Layers": layers if layers is not None else ["toolchain", tag]},
+    }
+    return image
+
+
+def _client(images: list[mock.Mock], size: int = 100, shared_size: int = 60) -> mock.Mock:
+    client = mock.Mock()
+    client.images.list.return_value = images
+    client.df.return_value = {
+        "Images": [{"Id": image.id, "Size": size, "SharedSize": shared_size} for image in images]
+    }
+    return client
+
+
+def _removed(client: mock.Mock) -> list[str]:
+    return [call.kwargs["image"] for call in client.images.remove.call_args_list]
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_image_cache
+
+class TestImageCache(SimpleTestCase):
+    def test_evicts_least_recently_used_until_within_budget(self):
+        client = _client([
+            _image("repo:new", "2026-10-03"),
+            _image("repo:old", "2026-10-01"),
+            _image("repo:mid", "2026-10-02"),
+        ])
+
+        # 3 x 40 unique bytes + 60 shared bytes counted once
+        ImageCache(client, max_bytes=110).evict()
+
+        self.assertEqual(_removed(client), ["sha256:repo:old", "sha256:repo:mid"])
+
+    def test_shared_layers_are_counted_once(self):
+        client = _client([_image("repo:old", "2026-10-01"), _image("repo:new", "2026-10-02")])
+
+        ImageCache(client, max_bytes=140).evict()
+
+        client.images.remove.assert_not_called()
+
+    def test_keeps_requested_and_in_use_images(self):
+        client = _client([
+            _image("repo:old", "2026-10-01"),
+            _image("repo:in-use", "2026-10-02"),
+            _image("repo:mid", "2026-10-03"),
+        ])
+
+        def remove(image: str) -> None:
+            if image == "sha256:repo:in-use":
+                raise APIError("image is in use")
+
+        client.images.remove.side_effect = remove
+
+        ImageCache(client, max_bytes=110).evict(keep={"repo:old"})
+
+        self.assertEqual(_removed(client), ["sha256:repo:in-use", "sha256:repo:mid"])
+
+    def test_skips_base_of_incremental_image(self):
+        client = _client([
+            _image("repo:base", "2026-10-01", ["toolchain", "clone"]),
+            _image("repo:child", "2026-10-02", ["toolchain", "clone", "fetch"]),
+        ])
+
+        ImageCache(client, max_bytes=0).evict()
+
+        self.assertEqual(_removed(client), ["sha256:repo:child"])
+
+    def test_failed_removal_keeps_pool(self):
+        pool = ContainerPool.for_image(mock.Mock(), "repo:kept", 0)
+        client = _client([_image("repo:kept", "2026-10-01")])
+        client.images.remove.side_effect = APIError("image has dependent child images")
+
+        ImageCache(client, max_bytes=0).evict()
+
+        self.assertIs(ContainerPool.for_image(mock.Mock(), "repo:kept", 0), pool)
+        ContainerPool.drain_image("repo:kept")
+
+    def test_skips_image_with_leased_containers(self):
+        pool = ContainerPool.for_image(mock.Mock(), "repo:leased", 0)
+        pool.acquire()
+        client = _client([_image("repo:leased", "2026-10-01")])
+
+        ImageCache(client, max_bytes=0).evict()
+
+        client.images.remove.assert_not_called()
+        ContainerPool.drain_image("repo:leased")
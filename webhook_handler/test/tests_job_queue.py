@@ -0,0 +1,43 @@
+import threading
+
+from django.test import TestCase
+
+from webhook_handler.jobs import PRIORITY_LOW, PRIORITY_NORMAL, JobQueue
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_job_queue
+
+class TestJobQueue(TestCase):
+    def test_rejects_jobs_beyond_capacity(self):
+        job_queue = JobQueue(worker_count=1, max_queue_size=2)
+
+        self.assertTrue(job_queue.submit("1", lambda: None))
+        self.assertTrue(job_queue.submit("2", lambda: None))
+        self.assertFalse(job_queue.submit("3", lambda: None))
+        self.assertEqual(job_queue.stats()["queued"], 2)
+
+    def test_runs_by_priority_then_order(self):
+        job_queue = JobQueue(worker_count=1, max_queue_size=10)
+        order: list[str] = []
+        done = threading.Event()
+        job_queue.submit("warm", lambda: order.append("warm"), PRIORITY_LOW)
+        job_queue.submit("pr-1", lambda: order.append("pr-1"), PRIORITY_NORMAL)
+        job_queue.submit("pr-2", lambda: order.append("pr-2"), PRIORITY_NORMAL)
+        job_queue.submit("last", done.set, PRIORITY_LOW)
+
+        job_queue.start()
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(order, ["pr-1", "pr-2", "warm"])
+
+    def test_counts_failed_jobs(self):
+        job_queue = JobQueue(worker_count=1, max_queue_size=10)
+        job_queue.submit("fails", lambda: 1 / 0)
+        job_queue.start()
+
+        job_queue._queue.join()
+
+        stats = job_queue.stats()
+        self.assertEqual(stats["processed"], 1)
+        self.assertEqual(stats["failed"], 1)
@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from webhook_handler.jobs import job_store
+from webhook_handler.jobs.job_store import WORKER_ID, BotJob
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_job_store
+
+class TestBotJobRecovery(TestCase):
+    def _job(self, **fields) -> BotJob:
+        fields = {"head_sha": "a" * 40, **fields}
+        return BotJob.objects.create(
+            execution_id="glean_7", owner="octo", repo="glean", pr_number=7, payload={}, **fields
+        )
+
+    def test_orphaned_includes_unclaimed_and_dead_workers(self):
+        unclaimed = self._job()
+        dead = self._job(claimed_by="host:1:0", head_sha="c" * 40)
+        self._job(claimed_by=WORKER_ID, head_sha="d" * 40)
+        self._job(status=BotJob.Status.COMPLETED, head_sha="e" * 40)
+
+        with mock.patch.object(job_store, "_is_alive", lambda worker_id: worker_id == WORKER_ID):
+            orphaned = BotJob.orphaned()
+
+        self.assertEqual({job.pk for job in orphaned}, {unclaimed.pk, dead.pk})
+
+    def test_claim_takes_over_dead_worker(self):
+        job = self._job(claimed_by="host:1:0")
+
+        with mock.patch.object(job_store, "_is_alive", return_value=False):
+            self.assertTrue(job.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.claimed_by, WORKER_ID)
+
+    def test_claim_respects_live_worker(self):
+        job = self._job(claimed_by="host:1:0")
+
+        with mock.patch.object(job_store, "_is_alive", return_value=True):
+            self.assertFalse(job.claim())
+
+    def test_claim_fails_for_finished_job(self):
+        job = self._job(status=BotJob.Status.COMPLETED)
+
+        self.assertFalse(job.claim())
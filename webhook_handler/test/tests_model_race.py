@@ -0,0 +1,110 @@
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.bot_runner import BotRunner
+from webhook_handler.helper.custom_errors import *
+from webhook_handler.models import LLM, PipelineStage
+from webhook_handler.services import ModelRace, TestGenerator
+
+
+def _runner(on_stage=None) -> BotRunner:
+    # the race only needs a prepared environment, not a payload
+    runner = BotRunner.__new__(BotRunner)
+    runner._config = SimpleNamespace(
+        setup_output_dir=lambda curr_attempt, model: Path("out", model.name),
+        output_dir=None,
+        pass_generation_dir=None,
+    )
+    runner._on_stage = on_stage
+    runner._logger = mock.Mock()
+    runner._pipeline_inputs = mock.Mock()
+    runner._budget = mock.Mock()
+    return runner
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_model_race
+
+class TestModelRace(SimpleTestCase):
+    def test_first_model_wins_and_cancels_others(self):
+        race = ModelRace()
+        services = {model: mock.Mock() for model in (LLM.GPT4o, LLM.LLAMA, LLM.QWEN3)}
+        for model, service in services.items():
+            race.register(model, service)
+
+        self.assertTrue(race.try_win(LLM.LLAMA))
+        self.assertFalse(race.try_win(LLM.GPT4o))
+
+        self.assertEqual(race.winner, LLM.LLAMA)
+        services[LLM.LLAMA].cancel.assert_not_called()
+        services[LLM.GPT4o].cancel.assert_called_once()
+        services[LLM.QWEN3].cancel.assert_called_once()
+        self.assertTrue(race.has_lost(LLM.GPT4o))
+        self.assertFalse(race.has_lost(LLM.LLAMA))
+
+    def test_model_registered_after_the_win_is_cancelled(self):
+        race = ModelRace()
+        race.try_win(LLM.GPT4o)
+        service = mock.Mock()
+
+        race.register(LLM.LLAMA, service)
+
+        service.cancel.assert_called_once()
+
+    def test_loser_stops_at_next_stage(self):
+        race = ModelRace()
+        race.try_win(LLM.GPT4o)
+        on_stage = mock.Mock()
+        generator = TestGenerator(
+            mock.Mock(), mock.Mock(), False, mock.Mock(), mock.Mock(), mock.Mock(), mock.Mock(),
+            i_attempt=0, model=LLM.LLAMA, gh_event=mock.Mock(), on_stage=on_stage, race=race,
+        )
+
+        with self.assertRaises(RunCancelledError):
+            generator._report_stage(PipelineStage.LINT)
+        on_stage.assert_not_called()
+
+
+class TestRaceModels(SimpleTestCase):
+    def _race(self, runner: BotRunner, pipeline) -> bool:
+        with mock.patch.object(BotRunner, "prepare_environment"), \
+                mock.patch("webhook_handler.bot_runner.LLMHandler"), \
+                mock.patch.object(BotRunner, "_run_generator", side_effect=pipeline, autospec=True):
+            return runner.race_models([LLM.GPT4o, LLM.LLAMA])
+
+    def test_winner_cancels_the_losers(self):
+        on_stage = mock.Mock()
+        runner = _runner(on_stage)
+        services = {LLM.GPT4o: mock.Mock(), LLM.LLAMA: mock.Mock()}
+        cancelled = threading.Event()
+        services[LLM.LLAMA].cancel.side_effect = cancelled.set
+        registered = threading.Barrier(2)
+
+        def pipeline(self, curr_attempt, model, output_dir, config, llm_handler, report_stage, race):
+            race.register(model, services[model])
+            registered.wait(timeout=5)
+            report_stage(PipelineStage.LLM_CALL, model=model)
+            if model == LLM.GPT4o:
+                return race.try_win(model)
+            # the losing pipeline runs until its containers are killed
+            return not cancelled.wait(timeout=5)
+
+        self.assertTrue(self._race(runner, pipeline))
+
+        self.assertTrue(cancelled.is_set())
+        services[LLM.GPT4o].cancel.assert_not_called()
+        self.assertEqual(runner._config.output_dir, Path("out", LLM.GPT4o.name))
+        self.assertEqual(on_stage.call_count, 2)
+
+    def test_every_model_failing(self):
+        runner = _runner()
+
+        def pipeline(self, curr_attempt, model, output_dir, config, llm_handler, report_stage, race):
+            return False
+
+        self.assertFalse(self._race(runner, pipeline))
+        self.assertIsNone(runner._config.output_dir)
@@ -0,0 +1,115 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.constants import SPECULATIVE_TEMPERATURE
+from webhook_handler.models import LLM, PromptType, VerificationOutcome
+from webhook_handler.services import TestGenerator
+
+
+class FakeLLMHandler:
+    """Records the prompts of all LLM calls and answers each with a new test"""
+
+    def __init__(self, delays: dict[int, float] | None = None) -> None:
+        self.calls: list[tuple[PromptType, str, float]] = []
+        self.queried = threading.Event()  # set once a speculative call has been sent
+        self.finished = 0
+        self._delays = delays or {}
+        self._lock = threading.Lock()
+
+    def build_prompt(self, prompt_type, previous_test, failure_reason) -> str:
+        with self._lock:
+            self.calls.append((prompt_type, failure_reason, 0.0))
+        return f"{prompt_type} {failure_reason}"
+
+    def query_model(self, prompt, model, temperature) -> str:
+        with self._lock:
+            call = len(self.calls)
+            prompt_type, failure_reason, _ = self.calls[-1]
+            self.calls[-1] = (prompt_type, failure_reason, temperature)
+            if call > 1:
+                self.queried.set()
+        time.sleep(self._delays.get(call, 0))
+        with self._lock:
+            self.finished += 1
+        return f"test {call}"
+
+    def postprocess_response(self, response) -> tuple[str, list[str], str]:
+        call = response.split()[-1]
+        return "src/lib.rs", [], f"#[test]\nfn test_{call}() {{}}"
+
+
+def _generator(llm_handler: FakeLLMHandler, output_dir: Path, max_llm_calls: int) -> TestGenerator:
+    data = mock.Mock()
+    data.pr_diff_ctx.get_absolute_file_path.return_value = "src/lib.rs"
+    return TestGenerator(
+        SimpleNamespace(MAX_LLM_CALLS=max_llm_calls), data, False, mock.Mock(), mock.Mock(),
+        mock.Mock(), llm_handler, i_attempt=0, model=LLM.MOCK, gh_event=mock.Mock(),
+        output_dir=output_dir,
+    )
+
+
+def _verifier(outcomes: list[tuple[VerificationOutcome, str]]):
+    verified: list[str] = []
+
+    def verify(llm_response, can_retry):
+        verified.append(llm_response.test_name)
+        return outcomes[len(verified) - 1]
+
+    return verify, verified
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_pipelined_generation
+
+class TestPipelinedWorkflow(SimpleTestCase):
+    def setUp(self) -> None:
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+
+    def test_prefetch_uses_latest_feedback(self):
+        llm_handler = FakeLLMHandler()
+        generator = _generator(llm_handler, Path(self.output_dir.name), 3)
+        verify, verified = _verifier([
+            (VerificationOutcome.COMPILATION_FAILED, "error[E0308]"),
+            (VerificationOutcome.ASSERTION_FAILED, "assertion failed"),
+            (VerificationOutcome.PASSED_BEFORE, ""),
+        ])
+
+        with mock.patch.object(generator, "_verify_candidate", side_effect=verify):
+            fail_2_pass, llm_response = generator.run_pipelined_workflow()
+
+        self.assertFalse(fail_2_pass)
+        self.assertEqual(llm_response.test_name, "test_3")
+        self.assertEqual(verified, ["test_1", "test_2", "test_3"])
+        self.assertEqual(llm_handler.calls, [
+            (PromptType.INITIAL, "", 0.0),
+            # sent while the first candidate is verified, a second sample of the initial prompt
+            (PromptType.INITIAL, "", SPECULATIVE_TEMPERATURE),
+            # sent while the second candidate is verified, the first one has been verified
+            (PromptType.COMPILATION_ERROR, "error[E0308]", 0.0),
+        ])
+
+    def test_awaits_prefetch_when_stopping_early(self):
+        llm_handler = FakeLLMHandler(delays={2: 0.2})
+        generator = _generator(llm_handler, Path(self.output_dir.name), 3)
+        verify, verified = _verifier([(VerificationOutcome.FAIL_TO_PASS, "")])
+
+        def verify_while_querying(llm_response, can_retry):
+            # the verification outlasts the start of the speculative call
+            self.assertTrue(llm_handler.queried.wait(timeout=5))
+            return verify(llm_response, can_retry)
+
+        with mock.patch.object(generator, "_verify_candidate", side_effect=verify_while_querying):
+            fail_2_pass, llm_response = generator.run_pipelined_workflow()
+
+        self.assertTrue(fail_2_pass)
+        self.assertEqual(llm_response.test_name, "test_1")
+        self.assertEqual(verified, ["test_1"])
+        # the speculative call finished before the run returned, its tokens are charged
+        self.assertEqual(llm_handler.finished, 2)
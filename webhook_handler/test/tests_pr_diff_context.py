@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.services.pr_diff_context import PullRequestDiffContext
+
+
+def _diff_context(files: dict[str, tuple[str, str, str]]) -> PullRequestDiffContext:
+    """Creates a diff context from (status, before, after) by file name"""
+
+    gh_service = mock.Mock()
+    gh_service.fetch_pr_files.return_value = [
+        {"filename": name, "status": status} for name, (status, _, _) in files.items()
+    ]
+    gh_service.fetch_file_version.side_effect = lambda commit, name: files[name][1 if commit == "base" else 2]
+    return PullRequestDiffContext("base", "head", gh_service)
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_pr_diff_context
+
+class TestGoldenFiles(SimpleTestCase):
+    def test_emptied_file_is_overlaid_empty(self):
+        ctx = _diff_context({"src/lib.rs": ("modified", "mod parser;\n", "")})
+
+        self.assertEqual(ctx.golden_files, {"src/lib.rs": ""})
+
+    def test_removed_file_is_deleted(self):
+        ctx = _diff_context({
+            "src/parser.rs": ("removed", "fn parse() {}\n", ""),
+            "Cargo.toml": ("modified", "[package]\n", "[package]\nedition = \"2021\"\n"),
+        })
+
+        self.assertEqual(
+            ctx.golden_files,
+            {"src/parser.rs": None, "Cargo.toml": "[package]\nedition = \"2021\"\n"},
+        )
@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from webhook_handler.jobs.job_store import WORKER_ID, BotJob
+from webhook_handler.models import PullRequestData
+from webhook_handler.webhook import _register_job
+
+
+def _pr_data(head_commit: str = "a" * 40, number: str = "7") -> PullRequestData:
+    return PullRequestData(
+        number=number,
+        title="Fix parser",
+        description="",
+        url="",
+        diff_url="",
+        base_branch="main",
+        base_commit="b" * 40,
+        head_branch="fix",
+        head_commit=head_commit,
+        owner="octo",
+        repo="glean",
+    )
+
+
+def _push_data(after: str = "f" * 40) -> PullRequestData:
+    return PullRequestData.from_push_payload({
+        "ref": "refs/heads/main",
+        "after": after,
+        "repository": {"name": "glean", "url": "", "owner": {"login": "octo"}},
+    })
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_register_job
+
+class TestRegisterJob(TestCase):
+    def test_creates_job(self):
+        job, _ = _register_job("delivery-1", _pr_data(), {})
+
+        self.assertIsNotNone(job)
+        self.assertEqual(job.status, BotJob.Status.QUEUED)
+        self.assertEqual(job.claimed_by, WORKER_ID)
+
+    def test_drops_repeated_delivery(self):
+        _register_job("delivery-1", _pr_data(), {})
+
+        job, message = _register_job("delivery-1", _pr_data("c" * 40), {})
+
+        self.assertIsNone(job)
+        self.assertIn("delivery-1 already received", message)
+
+    def test_drops_known_head_commit(self):
+        _register_job("delivery-1", _pr_data(), {})
+
+        job, message = _register_job("delivery-2", _pr_data(), {})
+
+        self.assertIsNone(job)
+        self.assertIn("already processed", message)
+        self.assertEqual(BotJob.objects.count(), 1)
+
+    def test_reruns_failed_head_commit(self):
+        failed, _ = _register_job("delivery-1", _pr_data(), {})
+        failed.finish(BotJob.Status.FAILED, "boom")
+
+        job, _ = _register_job("delivery-2", _pr_data(), {})
+
+        self.assertIsNotNone(job)
+
+    def test_supersedes_queued_job_of_older_head(self):
+        old, _ = _register_job("delivery-1", _pr_data("a" * 40), {})
+
+        new, _ = _register_job("delivery-2", _pr_data("c" * 40), {})
+
+        old.refresh_from_db()
+        self.assertIsNotNone(new)
+        self.assertEqual(old.status, BotJob.Status.SUPERSEDED)
+
+    def test_does_not_supersede_other_pr(self):
+        other, _ = _register_job("delivery-1", _pr_data("a" * 40, number="8"), {})
+
+        _register_job("delivery-2", _pr_data("c" * 40), {})
+
+        other.refresh_from_db()
+        self.assertEqual(other.status, BotJob.Status.QUEUED)
+
+    def test_concurrent_delivery_for_same_head_is_dropped(self):
+        _register_job("delivery-1", _pr_data(), {})
+
+        # a concurrent request passes the existence check, the constraint still rejects it
+        with mock.patch.object(BotJob, "COALESCED_STATUSES", ()):
+            job, message = _register_job("delivery-2", _pr_data(), {})
+
+        self.assertIsNone(job)
+        self.assertIn("already processed", message)
+
+    def test_constraint_only_covers_coalesced_statuses(self):
+        job, _ = _register_job("delivery-1", _pr_data(), {})
+        duplicate = dict(
+            execution_id=job.execution_id, owner=job.owner, repo=job.repo,
+            pr_number=job.pr_number, head_sha=job.head_sha, payload={},
+        )
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BotJob.objects.create(**duplicate)
+        BotJob.objects.create(status=BotJob.Status.FAILED, **duplicate)
+
+
+class TestRegisterWarmImageJob(TestCase):
+    def test_drops_repeated_push_delivery(self):
+        _register_job("push-1", _push_data(), {}, BotJob.Kind.WARM_IMAGE)
+
+        job, message = _register_job("push-1", _push_data("c" * 40), {}, BotJob.Kind.WARM_IMAGE)
+
+        self.assertIsNone(job)
+        self.assertIn("push-1 already received", message)
+
+    def test_drops_commit_already_warmed(self):
+        _register_job("push-1", _push_data(), {}, BotJob.Kind.WARM_IMAGE)
+
+        job, _ = _register_job("push-2", _push_data(), {}, BotJob.Kind.WARM_IMAGE)
+
+        self.assertIsNone(job)
+
+    def test_supersedes_only_older_warm_jobs(self):
+        pr_job, _ = _register_job("delivery-1", _pr_data(), {})
+        old, _ = _register_job("push-1", _push_data("c" * 40), {}, BotJob.Kind.WARM_IMAGE)
+
+        new, _ = _register_job("push-2", _push_data("d" * 40), {}, BotJob.Kind.WARM_IMAGE)
+
+        old.refresh_from_db()
+        pr_job.refresh_from_db()
+        self.assertEqual(new.execution_id, "glean_dddddddddddd")
+        self.assertEqual(old.status, BotJob.Status.SUPERSEDED)
+        self.assertEqual(pr_job.status, BotJob.Status.QUEUED)
@@ -0,0 +1,30 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.models import RunBudget
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_run_budget
+
+class TestRunBudget(SimpleTestCase):
+    def test_unlimited_budget_is_never_exhausted(self):
+        budget = RunBudget()
+        budget.add_tokens(10**9)
+
+        self.assertIsNone(budget.exhausted_by())
+
+    def test_reports_first_exhausted_limit(self):
+        budget = RunBudget(max_tokens=100, max_container_seconds=10)
+        budget.add_container_seconds(12)
+        self.assertEqual(budget.exhausted_by(), "container budget of 10s")
+
+        budget.add_tokens(100)
+        self.assertEqual(budget.exhausted_by(), "token budget of 100 tokens")
+
+    def test_time_budget(self):
+        budget = RunBudget(max_seconds=60, started_at=0.0)
+
+        with mock.patch("webhook_handler.models.run_budget.time.monotonic", return_value=61.0):
+            self.assertEqual(budget.exhausted_by(), "time budget of 60s")
@@ -0,0 +1,97 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.services import streaming_exec
+from webhook_handler.services.streaming_exec import CompileErrorMatcher, StreamingExec
+
+# Output of cargo test with a type error in the generated test and one in another crate
+CARGO_OUTPUT = """\
+   Compiling glean-core v64.0.0 (/app/testbed/glean-core)
+warning: unused variable: `x`
+  --> glean-core/src/metrics/mod.rs:10:9
+   |
+10 |     let x = 1;
+   |         ^ help: if this is intentional, prefix it with an underscore: `_x`
+error[E0308]: mismatched types
+  --> glean-core/src/lib.rs:120:22
+   |
+120 |     let count: u32 = "a";
+   |                ---   ^^^ expected `u32`, found `&str`
+error: could not compile `glean-core` (lib test) due to 1 previous error
+"""
+
+
+def _container(chunks: list[bytes], states: list[dict] | None = None) -> mock.Mock:
+    container = mock.Mock()
+    api = container.client.api
+    api.exec_create.return_value = {"Id": "exec"}
+    api.exec_start.return_value = iter(chunks)
+    api.exec_inspect.side_effect = states or [{"Running": False, "ExitCode": 0}]
+    container.exec_run.return_value = mock.Mock(exit_code=0, output=b"")
+    return container
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_streaming_exec
+
+class TestCompileErrorMatcher(SimpleTestCase):
+    def test_fires_on_error_in_file(self):
+        matcher = CompileErrorMatcher("src/lib.rs")
+
+        fired = [line for line in CARGO_OUTPUT.splitlines() if matcher(line)]
+
+        self.assertEqual(fired, ["  --> glean-core/src/lib.rs:120:22"])
+
+    def test_ignores_warnings_and_other_files(self):
+        matcher = CompileErrorMatcher("src/metrics/mod.rs")
+
+        self.assertFalse(any(matcher(line) for line in CARGO_OUTPUT.splitlines()))
+
+
+class TestStreamingExec(SimpleTestCase):
+    def test_keeps_tail_and_writes_full_output(self):
+        container = _container([b"one\ntw", b"o\nthree\n", b"four"])
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = Path(directory, "out.txt")
+
+            result = StreamingExec(container, "cargo test", output_path=output_path, tail_lines=2).run()
+
+            self.assertEqual(output_path.read_text(), "one\ntwo\nthree\nfour\n\nExit Code: 0\n")
+        self.assertEqual(result.output, "three\nfour")
+        self.assertEqual(result.exit_code, 0)
+        self.assertFalse(result.aborted)
+
+    def test_aborts_on_compile_error(self):
+        container = _container(
+            [CARGO_OUTPUT.encode()], [{"Running": False, "ExitCode": 137}]
+        )
+
+        result = StreamingExec(
+            container, "cargo test", abort_on=CompileErrorMatcher("src/lib.rs")
+        ).run()
+
+        self.assertTrue(result.aborted)
+        self.assertEqual(result.exit_code, 137)
+        container.exec_run.assert_called_once()
+        self.assertIn("could not compile", result.output)
+
+    def test_exit_code_after_grace_period(self):
+        api = mock.Mock()
+        api.exec_inspect.return_value = {"Running": True, "ExitCode": None}
+
+        with mock.patch.object(streaming_exec, "_EXIT_GRACE_SECONDS", 0), \
+                mock.patch.object(streaming_exec.time, "sleep"):
+            self.assertEqual(StreamingExec._exit_code(api, "exec"), 137)
+
+    def test_exit_code_once_recorded(self):
+        api = mock.Mock()
+        api.exec_inspect.side_effect = [
+            {"Running": True, "ExitCode": None},
+            {"Running": False, "ExitCode": 101},
+        ]
+
+        with mock.patch.object(streaming_exec.time, "sleep"):
+            self.assertEqual(StreamingExec._exit_code(api, "exec"), 101)
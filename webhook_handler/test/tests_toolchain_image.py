@@ -0,0 +1,75 @@
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.models import LLM, LLMResponse, PipelineStage
+from webhook_handler.services import TestGenerator
+from webhook_handler.services.toolchain_image import (COVERAGE_MIN_VERSION,
+                                                      supports_coverage,
+                                                      toolchain_version_of)
+
+DOCKERFILE_DIR = Path(__file__).resolve().parents[2] / "dockerfiles"
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_toolchain_image
+
+class TestToolchainVersion(SimpleTestCase):
+    def test_reads_version_of_repository_dockerfiles(self):
+        self.assertEqual(toolchain_version_of(DOCKERFILE_DIR / "Dockerfile_grcov"), "1.89")
+        self.assertEqual(toolchain_version_of(DOCKERFILE_DIR / "Dockerfile_grcov_old"), "1.50")
+
+    def test_dockerfile_without_toolchain_image(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dockerfile = Path(directory, "Dockerfile")
+            dockerfile.write_text("FROM rust:1.89\n", encoding="utf-8")
+
+            self.assertIsNone(toolchain_version_of(dockerfile))
+
+
+class TestSupportsCoverage(SimpleTestCase):
+    def test_versions_from_instrument_coverage_on(self):
+        self.assertEqual(COVERAGE_MIN_VERSION, (1, 60))
+        self.assertFalse(supports_coverage("1.50"))
+        self.assertFalse(supports_coverage("1.59.0"))
+        self.assertTrue(supports_coverage("1.60"))
+        self.assertTrue(supports_coverage("1.89"))
+        self.assertTrue(supports_coverage("2.0"))
+
+    def test_dockerfile_without_toolchain_image(self):
+        self.assertTrue(supports_coverage(None))
+
+
+class TestCoverageUnsupported(SimpleTestCase):
+    def test_keeps_test_without_coverage(self):
+        on_stage = mock.Mock()
+        docker_service = mock.Mock(supports_coverage=False, toolchain_version="1.50")
+        config = SimpleNamespace(pipelined_generation=False, output_dir=None)
+        generator = TestGenerator(
+            config, mock.Mock(), False, mock.Mock(), mock.Mock(), docker_service, mock.Mock(),
+            i_attempt=0, model=LLM.MOCK, gh_event=mock.Mock(), on_stage=on_stage,
+        )
+        llm_response = LLMResponse(
+            filename="src/lib.rs", imports=[], test_code="fn t() {}", test_name="t", curr_llm_cal=1
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            def run_workflow(curr_llm_attempt):
+                generator._generation_dir = Path(directory)
+                return True, llm_response
+
+            with mock.patch.object(generator, "run_workflow", side_effect=run_workflow), \
+                    mock.patch.object(generator, "_determine_test_usability") as determine_usability, \
+                    mock.patch.object(generator, "_create_augmented_test") as create_augmented_test:
+                result = generator.generate()
+
+            message = Path(directory, "coverage_unsupported.txt").read_text(encoding="utf-8")
+
+        self.assertEqual(result, (True, Path(directory)))
+        self.assertIn("Rust 1.50", message)
+        determine_usability.assert_not_called()
+        create_augmented_test.assert_called_once_with(llm_response, None, False)
+        on_stage.assert_called_once_with(PipelineStage.COVERAGE, message=message)
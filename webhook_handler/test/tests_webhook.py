@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase
+
+from webhook_handler import webhook
+from webhook_handler.jobs.job_store import BotJob
+
+SECRET = "webhook-secret"
+
+
+def _request(payload_path: str, event: str = "pull_request"):
+    with open(os.path.join(os.path.dirname(__file__), payload_path), "rb") as f:
+        body = f.read()
+    signature = hmac.new(SECRET.encode(), msg=body, digestmod=hashlib.sha256).hexdigest()
+    return RequestFactory().post(
+        "/",
+        data=body,
+        content_type="application/json",
+        headers={
+            "X-GitHub-Event": event,
+            "X-GitHub-Delivery": "delivery-1",
+            "X-Hub-Signature-256": f"sha256={signature}",
+        },
+    )
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_webhook
+
+class TestGithubWebhook(SimpleTestCase):
+    def setUp(self) -> None:
+        raw_log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(raw_log_dir.cleanup)
+        config = SimpleNamespace(github_webhook_secret=SECRET, webhook_raw_log_dir=raw_log_dir.name)
+        for target, value in (
+            ("get_webhook_config", config),
+            ("get_job_queue", mock.Mock()),
+        ):
+            patcher = mock.patch.object(webhook, target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.job = mock.Mock()
+
+    def test_enqueues_job_without_validating_the_pr(self):
+        with mock.patch.object(webhook, "_register_job", return_value=(self.job, "Job registered")) as register_job, \
+                mock.patch.object(webhook, "_enqueue_job", return_value=True) as enqueue_job, \
+                mock.patch.object(webhook, "BotRunner") as bot_runner:
+            response = webhook.github_webhook(_request("test_data/glean/pr_3226.json"))
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.content)["status"], "accepted")
+        register_job.assert_called_once()
+        enqueue_job.assert_called_once_with(self.job, mock.ANY)
+        # the linked issue and the diff are checked by the job, not by the handler
+        bot_runner.assert_not_called()
+
+    def test_rejects_job_if_queue_is_full(self):
+        with mock.patch.object(webhook, "_register_job", return_value=(self.job, "Job registered")), \
+                mock.patch.object(webhook, "_enqueue_job", return_value=False), \
+                mock.patch.object(webhook, "BotRunner") as bot_runner:
+            response = webhook.github_webhook(_request("test_data/glean/pr_3226.json"))
+
+        self.assertEqual(response.status_code, 503)
+        self.job.finish.assert_called_once_with(BotJob.Status.REJECTED, "Job queue is full")
+        bot_runner.assert_not_called()
+
+    def test_duplicate_delivery_is_not_enqueued(self):
+        with mock.patch.object(webhook, "_register_job", return_value=(None, "Duplicate delivery")), \
+                mock.patch.object(webhook, "_enqueue_job") as enqueue_job:
+            response = webhook.github_webhook(_request("test_data/glean/pr_3226.json"))
+
+        self.assertEqual(response.status_code, 200)
+        enqueue_job.assert_not_called()
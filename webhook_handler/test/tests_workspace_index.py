@@ -0,0 +1,75 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from webhook_handler.models import CargoTarget
+from webhook_handler.services import workspace_index
+from webhook_handler.services.workspace_index import WorkspaceIndex
+
+
+def _package(name: str, manifest_dir: str, *targets: tuple[str, str]) -> dict:
+    return {
+        "name": name,
+        "manifest_path": f"/app/testbed/{manifest_dir}/Cargo.toml".replace("//", "/"),
+        "targets": [
+            {"kind": [kind], "name": name, "src_path": f"/app/testbed/{src_path}".replace("//", "/")}
+            for kind, src_path in targets
+        ],
+    }
+
+
+#
+# RUN With: python manage.py test webhook_handler.test.tests_workspace_index
+
+class TestWorkspaceIndex(SimpleTestCase):
+    def setUp(self) -> None:
+        self.index = WorkspaceIndex([
+            _package("root", "", ("lib", "src/lib.rs"), ("bin", "src/main.rs")),
+            _package("parser", "crates/parser", ("lib", "crates/parser/src/lib.rs"),
+                     ("test", "crates/parser/tests/parse.rs")),
+        ])
+
+    def test_maps_target_source_file(self):
+        self.assertEqual(
+            self.index.target_of("crates/parser/tests/parse.rs"), CargoTarget("parser", "test", "parser")
+        )
+
+    def test_maps_module_to_library_of_most_specific_package(self):
+        self.assertEqual(
+            self.index.target_of("crates/parser/src/ast.rs"), CargoTarget("parser", "lib", "parser")
+        )
+        self.assertEqual(self.index.target_of("src/cli.rs"), CargoTarget("root", "lib", "root"))
+
+    def test_overlaid_containers_get_their_own_index(self):
+        def container(*packages: dict) -> mock.Mock:
+            exec_result = mock.Mock(exit_code=0, output=json.dumps({"packages": list(packages)}).encode())
+            return mock.Mock(**{"exec_run.return_value": exec_result})
+
+        base = container(_package("root", "", ("lib", "src/lib.rs")))
+        overlaid = container(
+            _package("root", "", ("lib", "src/lib.rs")), _package("new", "crates/new", ("lib", "crates/new/src/lib.rs"))
+        )
+
+        WorkspaceIndex.for_image("img:indexed", base)
+        index = WorkspaceIndex.for_image("img:indexed", overlaid, "pr-overlay")
+
+        self.assertEqual(index.target_of("crates/new/src/lib.rs"), CargoTarget("new", "lib", "new"))
+        self.assertEqual(
+            WorkspaceIndex.for_image("img:indexed", overlaid).target_of("crates/new/src/lib.rs"), CargoTarget("root")
+        )
+
+    def test_keeps_most_recently_used_indexes(self):
+        exec_result = mock.Mock(exit_code=0, output=json.dumps({"packages": []}).encode())
+        container = mock.Mock(**{"exec_run.return_value": exec_result})
+
+        with mock.patch.object(workspace_index, "MAX_INDEXES", 2):
+            first = WorkspaceIndex.for_image("img:lru", container, "first")
+            WorkspaceIndex.for_image("img:lru", container, "second")
+            WorkspaceIndex.for_image("img:lru", container, "first")
+            WorkspaceIndex.for_image("img:lru", container, "third")
+
+        self.assertIs(WorkspaceIndex._indexes.get("img:lru#first"), first)
+        self.assertNotIn("img:lru#second", WorkspaceIndex._indexes)
+        WorkspaceIndex.forget_image("img:lru")
+        self.assertFalse([key for key in WorkspaceIndex._indexes if key.startswith("img:lru")])
@@ -1,7 +1,8 @@
 from django.urls import include, path
 
-from webhook_handler.webhook import github_webhook
+from webhook_handler.webhook import github_webhook, job_queue_status
 
 urlpatterns = [
     path("", github_webhook, name="github_webhook"),
+    path("queue/", job_queue_status, name="job_queue_status"),
 ]
@@ -3,19 +3,67 @@ import hmac
 import json
 import logging
 import threading
+from datetime import datetime
 from pathlib import Path
 
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       transaction)
 from django.http import (HttpRequest, HttpResponse, HttpResponseForbidden,
                          HttpResponseNotAllowed, JsonResponse)
 from django.views.decorators.csrf import csrf_exempt
 
-from webhook_handler.constants import USED_MODELS
+from webhook_handler.constants import ACCEPTED_PR_ACTIONS, USED_MODELS
+from webhook_handler.models import PipelineStage, PullRequestData
 
 from .bot_runner import BotRunner
+from .jobs import PRIORITY_LOW, JobQueue
+from .jobs.job_store import WORKER_ID, BotJob
+from .services import DockerService
 from .services.config import Config
 
 bootstrap = logging.getLogger("bootstrap")
 
+_job_queue: JobQueue | None = None
+_job_queue_lock = threading.Lock()
+
+_webhook_config: Config | None = None
+_webhook_config_lock = threading.Lock()
+
+
+def get_webhook_config() -> Config:
+    """
+    Returns the process-wide config of the webhook request path, building it on first use.
+    Runs get their own config, the webhook only reads the secret, the log directory and the queue settings.
+
+    Returns:
+        Config: The config
+    """
+
+    global _webhook_config
+    with _webhook_config_lock:
+        if _webhook_config is None:
+            _webhook_config = Config()
+    return _webhook_config
+
+
+def get_job_queue(config: Config) -> JobQueue:
+    """
+    Returns the process-wide job queue, starting its workers on first use.
+
+    Parameters:
+        config (Config): The config providing worker count and queue size
+
+    Returns:
+        JobQueue: The job queue
+    """
+
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(config.worker_count, config.max_queued_jobs)
+            _job_queue.start()
+    return _job_queue
+
 
 #################### Webhook ####################
 @csrf_exempt
@@ -30,8 +78,8 @@ def github_webhook(request: HttpRequest) -> HttpResponse | JsonResponse:
         django.http.HttpResponse: The HTTP response
     """
 
-    # 1) Initialize config
-    config = Config()
+    # 1) Load config
+    config = get_webhook_config()
     bootstrap.info("Received GitHub webhook event")
 
     # 2) Allow HEAD for health checks
@@ -55,8 +103,10 @@ def github_webhook(request: HttpRequest) -> HttpResponse | JsonResponse:
         bootstrap.critical("Empty payload")
         return HttpResponseForbidden("Empty payload")
 
-    # 6) Pull request event check
+    # 6) Pull request event check, pushes to the default branch warm the image of the new commit
     event = request.headers.get("X-GitHub-Event")
+    if event == "push":
+        return _handle_push(payload, config, request.headers.get("X-GitHub-Delivery"))
     if event != "pull_request":
         bootstrap.critical("Webhook event must be pull request")
         return JsonResponse(
@@ -66,61 +116,324 @@ def github_webhook(request: HttpRequest) -> HttpResponse | JsonResponse:
 
     # 7) Pull request action check
     pr_number = payload["number"]
-    if payload.get("action") != "opened":
-        bootstrap.critical(f"[#{pr_number}] Pull request action must be OPENED")
+    if payload.get("action") not in ACCEPTED_PR_ACTIONS:
+        message = f"Pull request action must be one of {', '.join(ACCEPTED_PR_ACTIONS)}"
+        bootstrap.critical(f"[#{pr_number}] {message}")
+        return JsonResponse({"status": "success", "message": message}, status=200)
+
+    # 8) Save payload
+    pr_data = PullRequestData.from_payload(payload)
+    payload_path = Path(
+        config.webhook_raw_log_dir,
+        f"{pr_data.repo}_{pr_number}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+    )
+    with open(payload_path, "w") as f:
+        json.dump(payload, f, indent=4)
+    bootstrap.info(f"[#{pr_number}] Payload saved to {payload_path}")
+
+    # 9) Persist job unless it duplicates a known delivery or PR head, PR validation is the first stage of the job
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    job, message = _register_job(delivery_id, pr_data, payload)
+    if job is None:
+        bootstrap.info(f"[#{pr_number}] {message}")
+        return JsonResponse({"status": "success", "message": message}, status=200)
+
+    # 10) Enqueue Runner
+    if not _enqueue_job(job, get_job_queue(config)):
+        job.finish(BotJob.Status.REJECTED, "Job queue is full")
         return JsonResponse(
-            {"status": "success", "message": "Pull request action must be OPENED"},
-            status=200,
+            {"status": "rejected", "message": "Job queue is full"}, status=503
         )
 
-    # 8) Check for PR validity
-    bootstrap.info(f"[#{pr_number}] Validating PR...")
-    runner = BotRunner(payload, config, post_comment=True)
-    message, valid = runner.is_valid_pr()
-    if not valid:
-        bootstrap.critical(f"[#{pr_number}] {message}")
+    return JsonResponse({"status": "accepted", "message": message}, status=202)
+
+
+def _handle_push(payload: dict, config: Config, delivery_id: str | None) -> JsonResponse:
+    """
+    Enqueues a low priority build of the image of a commit pushed to the default
+    branch, so that PRs branching from it find a prebuilt image.
+
+    Parameters:
+        payload (dict): The push payload
+        config (Config): The config providing the job queue settings
+        delivery_id (str | None): The X-GitHub-Delivery header
+
+    Returns:
+        django.http.JsonResponse: The HTTP response
+    """
+
+    repository = payload["repository"]
+    if payload.get("deleted") or payload.get("ref") != f"refs/heads/{repository['default_branch']}":
+        message = "Push event must update the default branch"
+        bootstrap.info(f"[{repository['name']}] {message}")
         return JsonResponse({"status": "success", "message": message}, status=200)
 
-    # 9) Setup PR related directories
-    pr_id = runner._pr_data.id
-    config.setup_pr_related_dirs(pr_id, payload)
+    pr_data = PullRequestData.from_push_payload(payload)
+    job, message = _register_job(delivery_id, pr_data, payload, BotJob.Kind.WARM_IMAGE)
+    if job is None:
+        bootstrap.info(f"[{pr_data.repo}] {message}")
+        return JsonResponse({"status": "success", "message": message}, status=200)
+
+    if not _enqueue_job(job, get_job_queue(config)):
+        job.finish(BotJob.Status.REJECTED, "Job queue is full")
+        return JsonResponse(
+            {"status": "rejected", "message": "Job queue is full"}, status=503
+        )
+
+    message = f"Warming image of commit {pr_data.head_commit[:12]}"
+    bootstrap.info(f"[{pr_data.repo}] {message}")
+    return JsonResponse({"status": "accepted", "message": message}, status=202)
+
+
+def _run_warm_image_job(job_pk: int) -> None:
+    """
+    Runs a persisted image warming job, building the image of a default branch commit.
+
+    Parameters:
+        job_pk (int): Primary key of the job
+    """
 
-    def _execute_runner_in_background():
+    close_old_connections()
+    job = BotJob.objects.get(pk=job_pk)
+    pr_data = PullRequestData.from_push_payload(job.payload)
+    if not job.start():
+        bootstrap.info(f"[{pr_data.repo}] Job {job.pk} superseded or finished, skipping")
+        return
+
+    try:
+        config = Config()
         try:
-            bootstrap.info(f"[#{pr_number}] Starting runner execution...")
-            generation_completed = False
-            for model in USED_MODELS:
+            docker_service = DockerService(
+                config.root_dir, pr_data, image_cache_bytes=config.image_cache_bytes
+            )
+        except FileNotFoundError:
+            message = "No Dockerfile for repository, skipping image warming"
+            bootstrap.info(f"[{pr_data.repo}] {message}")
+            job.finish(BotJob.Status.REJECTED, message)
+            return
+
+        docker_service.build_default_branch_image()
+        message = f"Image of commit {pr_data.head_commit[:12]} warmed"
+        bootstrap.info(f"[{pr_data.repo}] {message}")
+        job.finish(BotJob.Status.COMPLETED, message)
+    except Exception as e:
+        job.finish(BotJob.Status.FAILED, str(e))
+        bootstrap.critical(f"[{pr_data.repo}] Failed to warm image of commit {pr_data.head_commit[:12]}: {e}")
+    finally:
+        close_old_connections()
+
+
+def _register_job(
+    delivery_id: str | None,
+    pr_data: PullRequestData,
+    payload: dict,
+    kind: BotJob.Kind = BotJob.Kind.PULL_REQUEST,
+) -> tuple[BotJob | None, str]:
+    """
+    Creates the job for a delivery. Repeated deliveries and deliveries for a PR
+    head which is already queued, running or done are dropped. Queued jobs for
+    an older head of the same PR are superseded by the new job. Image warming
+    jobs are handled alike, the default branch taking the place of the PR.
+
+    Parameters:
+        delivery_id (str | None): The X-GitHub-Delivery header
+        pr_data (PullRequestData): The PR or pushed commit of the delivery
+        payload (dict): The webhook payload
+        kind (BotJob.Kind, optional): The kind of job to create
+
+    Returns:
+        BotJob | None: The new job, or None if the delivery was dropped
+        str: Message to deliver to client
+    """
+
+    if kind == BotJob.Kind.WARM_IMAGE:
+        pr_number, execution_id = 0, f"{pr_data.repo}_{pr_data.head_commit[:12]}"
+        log_prefix = f"[{pr_data.repo}]"
+    else:
+        pr_number, execution_id = int(pr_data.number), f"{pr_data.repo}_{pr_data.number}"
+        log_prefix = f"[#{pr_data.number}]"
+    pr_jobs = BotJob.objects.filter(
+        owner=pr_data.owner, repo=pr_data.repo, pr_number=pr_number, kind=kind
+    )
+    try:
+        with transaction.atomic():
+            if delivery_id and BotJob.objects.filter(delivery_id=delivery_id).exists():
+                return None, f"Delivery {delivery_id} already received"
+
+            if pr_jobs.filter(
+                head_sha=pr_data.head_commit, status__in=BotJob.COALESCED_STATUSES
+            ).exists():
+                return None, f"Head commit {pr_data.head_commit[:12]} already processed"
+
+            superseded = (
+                pr_jobs.filter(status=BotJob.Status.QUEUED)
+                .exclude(head_sha=pr_data.head_commit)
+                .update(
+                    status=BotJob.Status.SUPERSEDED,
+                    message=f"Superseded by head commit {pr_data.head_commit[:12]}",
+                )
+            )
+            if superseded:
+                bootstrap.info(
+                    f"{log_prefix} Superseded {superseded} queued job(s) for older head commits"
+                )
+
+            job = BotJob.objects.create(
+                kind=kind,
+                delivery_id=delivery_id,
+                execution_id=execution_id,
+                owner=pr_data.owner,
+                repo=pr_data.repo,
+                pr_number=pr_number,
+                head_sha=pr_data.head_commit,
+                payload=payload,
+                stage=PipelineStage.RECEIVED,
+                claimed_by=WORKER_ID,
+            )
+    except IntegrityError:
+        # a concurrent request created a job with the same delivery ID or for the same PR head
+        if delivery_id and BotJob.objects.filter(delivery_id=delivery_id).exists():
+            return None, f"Delivery {delivery_id} already received"
+        return None, f"Head commit {pr_data.head_commit[:12]} already processed"
+
+    return job, "Payload is being processed..."
+
+
+def start_job_workers() -> None:
+    """
+    Starts the worker pool and re-queues all jobs left unfinished by a previous process.
+    """
+
+    job_queue = get_job_queue(get_webhook_config())
+    try:
+        orphaned_jobs = BotJob.orphaned()
+    except DatabaseError as e:
+        bootstrap.critical(f"Could not load unfinished jobs: {e}")
+        return
+
+    for job in orphaned_jobs:
+        if not job.claim():
+            continue
+        bootstrap.info(
+            f"[{job.execution_id}] Recovering job {job.pk} at stage {job.stage}"
+        )
+        if not _enqueue_job(job, job_queue):
+            BotJob.objects.filter(pk=job.pk).update(claimed_by="")
+
+
+def _enqueue_job(job: BotJob, job_queue: JobQueue) -> bool:
+    """
+    Submits a persisted job to the worker pool.
+
+    Parameters:
+        job (BotJob): The job to run
+        job_queue (JobQueue): The queue to submit to
+
+    Returns:
+        bool: True if the job was enqueued, False if the queue is full
+    """
+
+    job_id = f"{job.execution_id}#{job.pk}"
+    if job.kind == BotJob.Kind.WARM_IMAGE:
+        return job_queue.submit(
+            job_id, lambda job_pk=job.pk: _run_warm_image_job(job_pk), PRIORITY_LOW
+        )
+    return job_queue.submit(job_id, lambda job_pk=job.pk: _run_job(job_pk))
+
+
+def _run_job(job_pk: int) -> None:
+    """
+    Runs a persisted job. Models which already finished in an earlier run of
+    the job are skipped, so that a recovered job resumes where it stopped.
+
+    Parameters:
+        job_pk (int): Primary key of the job
+    """
+
+    close_old_connections()
+    job = BotJob.objects.get(pk=job_pk)
+    pr_number = job.pr_number
+    if not job.start():
+        bootstrap.info(f"[#{pr_number}] Job {job.pk} superseded or finished, skipping")
+        return
+
+    config: Config | None = None
+    runner: BotRunner | None = None
+    try:
+        config = Config()
+        runner = BotRunner(job.payload, config, post_comment=True, on_stage=job.record_stage)
+        config.setup_pr_related_dirs(runner._pr_data.id, job.payload)
+
+        if job.run_count > 1:
+            bootstrap.info(
+                f"[#{pr_number}] Resuming job, models already tried: {job.models_tried}"
+            )
+
+        if job.stage == PipelineStage.RECEIVED:
+            bootstrap.info(f"[#{pr_number}] Validating PR...")
+            message, valid = runner.is_valid_pr()
+            if not valid:
+                bootstrap.critical(f"[#{pr_number}] {message}")
+                job.finish(BotJob.Status.REJECTED, message)
+                return
+            job.record_stage(PipelineStage.VALIDATED, message=message)
+
+        bootstrap.info(f"[#{pr_number}] Starting runner execution...")
+        generation_completed = False
+        models = [model for model in USED_MODELS if model not in job.models_tried]
+        if config.race_models:
+            generation_completed = runner.race_models(models)
+            job.models_tried = [*job.models_tried, *models]
+            job.save(update_fields=["models_tried", "updated_at"])
+        else:
+            for model in models:
+                generation_completed = runner.execute_runner(0, model)
+                job.models_tried = [*job.models_tried, model]
+                job.save(update_fields=["models_tried", "updated_at"])
                 if generation_completed:
                     break
-                generation_completed = runner.execute_runner(0, model)
 
-            completed_message = (
-                "Test generated successfully"
-                if generation_completed
-                else "No test generated"
-            )
-            bootstrap.info(f"[#{pr_number}] Pipeline execution completed")
-            bootstrap.info(f"[#{pr_number}] {completed_message}")
-        except:
-            bootstrap.critical(f"[#{pr_number}] Pipeline execution failed")
-        finally:
+        completed_message = (
+            "Test generated successfully"
+            if generation_completed
+            else "No test generated"
+        )
+        job.record_stage(PipelineStage.FINISHED)
+        job.finish(BotJob.Status.COMPLETED, completed_message)
+        bootstrap.info(f"[#{pr_number}] Pipeline execution completed")
+        bootstrap.info(f"[#{pr_number}] {completed_message}")
+    except Exception as e:
+        job.finish(BotJob.Status.FAILED, str(e))
+        bootstrap.exception(f"[#{pr_number}] Pipeline execution failed: {e}")
+    finally:
+        if config is not None:
             config._teardown()
-            bootstrap.info(f"[#{pr_number}] Resources cleaned up")
+        bootstrap.info(f"[#{pr_number}] Resources cleaned up")
+        close_old_connections()
 
-    # 10) Save payload
-    payload_path = Path(
-        config.webhook_raw_log_dir,
-        f"{runner._pr_data.repo}_{pr_number}_{config.execution_timestamp}.json",
-    )
-    with open(payload_path, "w") as f:
-        json.dump(payload, f, indent=4)
-    bootstrap.info(f"[#{pr_number}] Payload saved to {payload_path}")
 
-    # 11) Execute Runner
-    thread = threading.Thread(target=_execute_runner_in_background, daemon=True)
-    thread.start()
+def job_queue_status(request: HttpRequest) -> HttpResponse | JsonResponse:
+    """
+    Reports queue depth and in-flight jobs of the worker pool. Only staff users
+    may see the queue, it exposes the PRs being processed.
 
-    return JsonResponse({"status": "accepted", "message": message}, status=202)
+    Parameters:
+        request (django.http.HttpRequest): The HTTP request
+
+    Returns:
+        django.http.HttpResponse: The queue statistics, or an error response
+    """
+
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"], "Request method must be GET")
+    if not request.user.is_staff:
+        return HttpResponseForbidden("Queue status is only available to staff users")
+
+    with _job_queue_lock:
+        job_queue = _job_queue
+    if job_queue is None:
+        return JsonResponse({"status": "unavailable", "message": "Job workers not started"}, status=503)
+    return JsonResponse(job_queue.stats(), status=200)
 
 
 def _verify_signature(request: HttpRequest, github_webhook_secret) -> bool: